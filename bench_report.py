@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Benchmark: time generate_html_report() on synthetic trackers of growing size.
+
+Per-row time should stay roughly flat from 1k to 200k rows (linear scaling).
+Each size starts cold in a fresh output directory.  The "rerun" column
+regenerates after changing 1% of the rows, the way the next run of the
+tracker would: with the row cache and report files from the first run on
+disk, but nothing left in memory.  Such a rerun keeps deals.json and the
+dept/ shards as the base and only writes the changed rows to changes.json,
+so what is left is reading and keying every row (about 60 us/row): 1.3 s
+against 7.2 s cold at 20k rows, 6.0 s against 39 s at 100k.
+
+Usage:
+    python bench_report.py              # 1k, 10k, 50k, 100k, 200k rows
+    python bench_report.py 1000 5000    # custom sizes
+"""
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+import rebelsavings
+from rebelsavings import DEALS_JSON_FILENAME, HDStatus, generate_html_report
+
+SIZES = [1_000, 10_000, 50_000, 100_000, 200_000]
+DEPARTMENTS = ["Tools", "Electrical", "Plumbing", "Bath", "Outdoors",
+               "Lighting", "Hardware", "Paint", ""]
+STATUSES = [HDStatus.PENNY_NEW, HDStatus.PENNY, HDStatus.NOT_PENNY,
+            HDStatus.CLEARANCE, HDStatus.OUT_OF_STOCK, HDStatus.BLOCKED, ""]
+
+
+def make_deals(n, seed=0):
+    rng = random.Random(seed)
+    start = datetime.datetime(2026, 1, 1)
+    deals = []
+    for i in range(n):
+        internet_no = 300000000 + i
+        added = start + datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 21))
+        updated = added + datetime.timedelta(minutes=rng.randint(0, 60 * 24 * 7))
+        deals.append({
+            "name": f"Synthetic Item {i} & Co. 3/4 in. \"Deluxe\" <{rng.random():.6f}>",
+            "price": f"${rng.randint(1, 50000) / 100:.2f}",
+            "url": f"https://www.homedepot.com/p/Synthetic-Item-{i}/{internet_no}",
+            "image": f"https://images.thdstatic.com/productImages/{i}/svn/item-64_100.jpg",
+            "original_timestamp": added.strftime("%Y-%m-%d %H:%M:%S"),
+            "hd_status": rng.choice(STATUSES),
+            "updated_at": updated.strftime("%Y-%m-%d %H:%M:%S") if rng.random() < 0.8 else "",
+            "sku": str(1000000 + i) if rng.random() < 0.7 else "",
+            "department": rng.choice(DEPARTMENTS),
+        })
+    return deals
+
+
+def main():
+    sizes = [int(a) for a in sys.argv[1:]] or SIZES
+    results = []
+    for n in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            out_path = os.path.join(tmp, "index.html")
+            deals = make_deals(n)
+            rebelsavings._row_cache = None
+            t0 = time.perf_counter()
+            generate_html_report(deals, out_path, thumbnails=False)
+            elapsed = time.perf_counter() - t0
+            for d in deals[::100]:
+                d["hd_status"] = HDStatus.PENNY_NEW
+            rebelsavings._row_cache = None
+            t0 = time.perf_counter()
+            generate_html_report(deals, out_path, thumbnails=False)
+            rerun = time.perf_counter() - t0
+            size = os.path.getsize(os.path.join(tmp, DEALS_JSON_FILENAME))
+            results.append((n, elapsed, rerun, size))
+
+    print(f"\n{'rows':>8} {'seconds':>9} {'us/row':>8} {'rerun s':>9} {'JSON MB':>8}")
+    for n, elapsed, rerun, size in results:
+        print(f"{n:>8} {elapsed:>9.3f} {elapsed / n * 1e6:>8.1f} "
+              f"{rerun:>9.3f} {size / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
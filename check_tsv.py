@@ -1,9 +1,13 @@
 #!/usr/bin/env python3
 """Diagnostic: check how many rows the TSV reader loads vs total lines."""
+import re
 import sys
+import zlib
 
 FIELDNAMES = ["name", "price", "url", "image", "original_timestamp", "hd_status",
-              "updated_at", "padding"]
+              "updated_at", "sku", "department", "padding"]
+# Same layout as rebelsavings.pad_row(): padding column ends with "#" + CRC32
+ROW_CRC_RE = re.compile(r'^(.*)\t *#([0-9a-f]{8})$')
 
 tsv_path = sys.argv[1] if len(sys.argv) > 1 else "rebel_final_report.tsv"
 
@@ -12,6 +16,9 @@ loaded = 0
 skipped_empty = 0
 skipped_header = 0
 short_rows = 0  # rows with fewer than 7 fields
+crc_ok = 0
+crc_bad = 0
+crc_missing = 0
 field_counts = {}
 
 with open(tsv_path, "r", encoding="utf-8") as f:
@@ -19,6 +26,14 @@ with open(tsv_path, "r", encoding="utf-8") as f:
     print(f"Header fields: {len(header.strip().split(chr(9)))}")
     for line_num, row in enumerate(f, start=2):
         total_lines += 1
+        match = ROW_CRC_RE.match(row.rstrip("\r\n"))
+        if match is None:
+            crc_missing += 1
+        elif zlib.crc32(match.group(1).encode("utf-8")) == int(match.group(2), 16):
+            crc_ok += 1
+        else:
+            crc_bad += 1
+            print(f"  Line {line_num}: CRC mismatch: {row[:60]}...")
         parts = row.strip().split("\t")
         parts = [p.strip() for p in parts]
         n_fields = len(parts)
@@ -40,6 +55,7 @@ print(f"Loaded: {loaded}")
 print(f"Skipped (empty): {skipped_empty}")
 print(f"Skipped (header): {skipped_header}")
 print(f"Short rows (<7 fields): {short_rows}")
+print(f"CRC ok / mismatch / missing: {crc_ok} / {crc_bad} / {crc_missing}")
 print(f"\nField count distribution:")
 for k in sorted(field_counts.keys()):
     print(f"  {k} fields: {field_counts[k]} rows")
@@ -1,4 +1,10 @@
+import contextlib
 import datetime
+import fnmatch
+import gzip
+import hashlib
+import html
+import json
 import logging
 import re
 import requests
@@ -8,7 +14,11 @@ import sys
 import time
 import os
 import argparse
+import base64
+import io
 import random
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import quote_plus
 
 import undetected_chromedriver as uc
@@ -21,13 +31,31 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+try:
+    from PIL import Image, features as pil_features
+    HAS_PIL = True
+except ImportError:
+    HAS_PIL = False
+
 TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
 ROW_SIZE = 1000  # Target bytes per line
 FIELDNAMES = ["name", "price", "url", "image", "original_timestamp", "hd_status",
               "updated_at", "sku", "department", "padding"]
 NEWLINE = '\n'
+# Every record ends its padding column with "#" + CRC32 (8 hex digits) of
+# the data fields, so torn/overwritten rows can be located and repaired.
+_ROW_CRC_RE = re.compile(rb'^(.*)\t *#([0-9a-f]{8})$')
 TSV_FILENAME = "rebel_final_report.tsv"
 BACKUP_TSV_FILENAME = "rebel_final_report_backup.tsv"
+# repair_tsv() appends the original bytes of every row it replaces here
+# (next to the TSV) instead of discarding them.
+DAMAGED_ROWS_SUFFIX = ".damaged"
 DEFAULT_ZIP = "94538"
 REBEL_SAVINGS_DEAL_URL = "https://www.rebelsavings.com/home-depot?zip={zip}"
 
@@ -292,6 +320,1884 @@ class HDStatus:
     BLOCKED = 'blocked'
 
 
+# Statuses worth a trip to the store (report pages get them as PENNY_STATUSES)
+PENNY_STATUSES = (HDStatus.PENNY_NEW, HDStatus.PENNY, HDStatus.PENNY_CANDIDATE)
+# Statuses meaning HD showed the item at $0.01
+PENNY_PRICE_STATUSES = (HDStatus.PENNY_NEW, HDStatus.PENNY, HDStatus.PENNY_OLD)
+
+
+# ── Report page assets ──────────────────────────────────────────────
+# index.html is a static shell: the FB tab, the scanner, and an empty HD
+# table that report.js fills from deals.json.  The CSS/JS below are
+# written to assets/ under content-hashed names and shared by every page.
+DEALS_JSON_FILENAME = "deals.json"
+REPORT_ASSETS_DIR = "assets"      # shared CSS/JS for every report page
+REPORT_DEPT_DIR = "dept"          # per-department pages + data shards
+PENNY_PAGE_SLUG = "penny-statuses"
+# The scanner's SKU lookup is split into content-hashed shards by the
+# SKU's trailing digits (store SKUs share long leading prefixes like
+# "100", the trailing digits are evenly spread); the scanner fetches
+# only the shards for SKUs it reads.
+SKU_SHARD_DIR = "skus"
+SKU_SHARD_DIGITS = 2
+# BK-tree over all tracked SKUs (skus/tree.<hash>.json), which the scanner
+# loads on its first miss to suggest near matches for misread digits.
+# The tree is cached under REPORT_CACHE_DIR and only new SKUs are
+# inserted on later runs.
+SKU_TREE_CACHE_FILENAME = "sku_tree.json"
+# UPC -> Store SKU map for the scanner's barcode path, sharded the same way.
+# upc_skus.tsv (next to the tracker TSV) collects UPCs read from HD product
+# pages in Phase 2; FB posts naming exactly one SKU and one UPC fill gaps.
+UPC_SHARD_DIR = "upcs"
+UPC_MAP_FILENAME = "upc_skus.tsv"
+FB_REPORT_FILENAME = "fb_deals.html"  # written by fb_scraper.py
+REPORT_MANIFEST_FILENAME = "report_manifest.json"
+REPORT_SW_FILENAME = "sw.js"      # offline cache, at the root so it covers dept/
+# Every row changed since the base report (see REPORT_REBASE_FRACTION).
+# Written by each report, and during Phase 2 (at most every
+# CHANGES_PUSH_MINUTES) for open pages to patch in place.  See
+# write_changes_feed.
+CHANGES_FILENAME = "changes.json"
+CHANGES_PUSH_MINUTES = 10
+# Script-free phone page listing only PENNY_STATUSES rows.  Rows are
+# dropped from the end (candidates first) to keep it under its budget.
+PENNY_MOBILE_FILENAME = "penny.html"
+PENNY_MOBILE_BUDGET_KB = 50
+# Max gzip size in KB per report artifact, by fnmatch pattern (first match
+# wins).  Override with --size-budget PATTERN=KB.  deals.json (and the
+# department shards, which are subsets of it) carry every row at ~72 bytes
+# gzip each, so they are budgeted for about 100k rows; today's tracker is
+# under 1k rows (~50 KB).
+REPORT_SIZE_BUDGETS_KB = {
+    PENNY_MOBILE_FILENAME: PENNY_MOBILE_BUDGET_KB,
+    DEALS_JSON_FILENAME: 8192,
+    f"{REPORT_DEPT_DIR}/*.json": 8192,
+    "*.html": 100,
+    "*.css": 30,
+    "*.js": 100,
+    "*.json": 1024,
+}
+COMPRESS_WORKERS = min(8, os.cpu_count() or 1)  # zlib/brotli release the GIL
+# Column order of each row in deals.json: the deal fields shown in the HD
+# table (same column order), then typed sort keys precomputed by
+# _deal_record so the browser sorts without parsing cell text, then the
+# row's stable key (_deal_key), which report.js uses as its element id.
+DEALS_JSON_FIELDS = ["image", "name", "sku", "department", "price",
+                     "hd_status", "updated_at", "original_timestamp", "url"]
+DEALS_JSON_SORT_KEYS = ["price_cents", "status_rank", "updated_epoch",
+                        "added_epoch"]
+DEALS_JSON_COLUMNS = DEALS_JSON_FIELDS + DEALS_JSON_SORT_KEYS + ["key"]
+# Rendered deals.json row fragments, keyed by a hash of the row's fields,
+# so regenerating the report only re-renders rows that changed.  Bump the
+# version whenever the output of _deal_record or _report_sort_key changes.
+REPORT_CACHE_DIR = ".report_cache"
+ROW_CACHE_FILENAME = "rows.json"
+ROW_CACHE_VERSION = 7
+# The last full report (deals.json and the dept/ shards, with their search
+# and filter indexes) is the "base".  It stays as is until more than
+# REPORT_REBASE_FRACTION of its rows have changed; until then a rerun only
+# writes the changed rows to changes.json, which every page applies on
+# load.  REPORT_BASE_FILENAME records the base's rows; see _report_delta.
+REPORT_BASE_FILENAME = "report_base.json"
+REPORT_REBASE_FRACTION = 0.1
+# Digest of each department shard's rows (plus its ?v= version and the
+# time it was written); a shard whose rows are unchanged is not rebuilt,
+# rewritten or recompressed.  penny.html is tracked the same way.
+DEPT_SHARD_CACHE_FILENAME = "dept_shards.json"
+# Parsed fb_deals.tsv and the rendered Facebook tab rows, reused until the
+# TSV changes (the FB scraper runs far less often than the report).  Bump
+# the version whenever _render_fb_row's output changes.
+FB_CACHE_FILENAME = "fb_tab.json"
+FB_CACHE_VERSION = 1
+# Product image thumbnails: each image URL is downloaded once and shrunk
+# to the table's 70px width (and 140px for high-DPI screens).  Files are
+# named by a hash of the source image, so they are reused across runs
+# and shared by rows with the same picture.
+REPORT_THUMB_DIR = "thumbs"
+THUMB_SIZES = (70, 140)
+THUMB_CACHE_FILENAME = "thumbs.json"   # {url: {"thumb", "at"}} under REPORT_CACHE_DIR
+THUMB_RETRY_HOURS = 24                 # wait before retrying a failed download
+THUMB_WORKERS = 8
+# Summary tab: aggregates computed while the report is generated and
+# embedded in index.html as a small JSON, so the page never scans rows.
+# Phase 2 runs come from phase2_log.tsv, parsed incrementally (only the
+# lines appended since the last report) via a cache under REPORT_CACHE_DIR.
+PHASE2_LOG_FILENAME = "phase2_log.tsv"
+PHASE2_LOG_CACHE_FILENAME = "phase2_log.json"
+DASHBOARD_DAYS = 30     # days of "new pennies per day"
+DASHBOARD_RUNS = 30     # most recent Phase 2 runs
+
+_REPORT_CSS = """
+body { font-family: Arial, sans-serif; background: #f0f2f5; padding: 20px; }
+h2 { color: #333; margin-bottom: 5px; }
+.tabs { display: flex; gap: 0; margin-bottom: 0; }
+.tab { padding: 12px 24px; cursor: pointer; border: 1px solid #ddd;
+        border-bottom: none; border-radius: 8px 8px 0 0; background: #e8e8e8;
+        font-weight: bold; font-size: 15px; color: #555; user-select: none; }
+.tab:hover { background: #f5f5f5; }
+.tab.active { background: white; color: #333; border-bottom: 2px solid white;
+               margin-bottom: -1px; position: relative; z-index: 1; }
+.tab.hd.active { color: #f96302; }
+.tab.fb.active { color: #1877f2; }
+.tab-content { display: none; border: 1px solid #ddd; border-radius: 0 8px 8px 8px;
+                background: white; padding: 0; }
+.tab-content.active { display: block; }
+table { width: 100%; border-collapse: collapse; background: white; }
+th, td { padding: 10px 12px; border: 1px solid #eee; text-align: left; vertical-align: middle; }
+th { color: white; font-weight: bold; position: sticky; top: 0; z-index: 2; }
+.hd-table th { background: #f96302; cursor: pointer; user-select: none; }
+.hd-table th:hover { background: #e05800; }
+.hd-table th .arrow { font-size: 10px; margin-left: 4px; }
+.fb-table th { background: #1877f2; }
+tr:nth-child(even) { background-color: #f9f9f9; }
+/* HD table: fixed row height so the virtual scroller can compute the
+   visible window from scrollTop (ROW_HEIGHT in the JS must match). */
+.hd-scroll { max-height: calc(100vh - 170px); overflow-y: auto; }
+.hd-table tbody tr { height: 72px; background: white; }
+.hd-table tbody tr.alt { background: #f9f9f9; }
+.hd-table tbody tr.live { background: #fff8e1; }
+.hd-table tbody tr.target { outline: 2px solid #f96302; outline-offset: -2px; }
+.live-status { color: #e67e22; font-size: 13px; margin-left: 8px; }
+.hd-table td { padding: 6px 12px; line-height: 18px; }
+.hd-table tr.spacer, .hd-table tr.spacer td { padding: 0; border: 0; background: none; }
+.hd-table img { height: 56px; }
+.clamp { display: -webkit-box; -webkit-line-clamp: 3; -webkit-box-orient: vertical;
+         overflow: hidden; }
+.loading { color: #888; font-style: italic; }
+.dept-index { max-width: 640px; }
+.dept-index th { background: #f96302; }
+.dashboard { padding: 12px 16px; }
+.dashboard h3 { margin: 16px 0 6px; color: #333; }
+.dashboard table { width: auto; }
+.dashboard th { background: #555; position: static; }
+.dashboard td.num { text-align: right; }
+.dashboard .bar { display: inline-block; height: 10px; background: #f96302;
+                  border-radius: 2px; vertical-align: middle; }
+img { width: 70px; height: auto; border-radius: 4px; object-fit: cover; }
+.penny_new { color: #27ae60; font-weight: bold; }
+.penny { color: #3498db; font-weight: bold; }
+.penny_old { color: #7f8c8d; font-weight: bold; font-style: italic; }
+.not_penny { color: #e74c3c; font-weight: bold; }
+.penny_candidate { color: #f39c12; font-weight: bold; }
+.clearance { color: #2ecc71; font-weight: bold; }
+.error { color: #8e44ad; font-weight: bold; }
+.failure { color: #95a5a6; font-style: italic; }
+.out_of_stock { color: #7f8c8d; font-weight: bold; font-style: italic; }
+.blocked { color: #c0392b; font-weight: bold; text-decoration: underline; }
+.unchecked { color: #3498db; font-style: italic; }
+.sku { font-weight: bold; color: #e67e22; }
+.dept { color: #555; font-size: 13px; }
+.upc { font-weight: bold; color: #27ae60; }
+.snippet { max-width: 300px; overflow: hidden; text-overflow: ellipsis;
+            white-space: nowrap; font-size: 13px; color: #555; }
+.date { white-space: nowrap; color: #888; }
+.fb-img { max-width: 120px; max-height: 90px; }
+a { color: #1877f2; text-decoration: none; }
+a:hover { text-decoration: underline; }
+.meta { color: #888; font-size: 13px; margin: 4px 0 12px 0; }
+.reset-btn { background: #f96302; color: white; border: none; padding: 6px 14px;
+              border-radius: 4px; cursor: pointer; font-size: 13px; margin-left: 12px; }
+.reset-btn:hover { background: #e05800; }
+.hd-search { width: 320px; max-width: 100%; padding: 7px 10px; margin: 0 0 10px 0;
+             border: 1px solid #ccc; border-radius: 4px; font-size: 14px; }
+.search-count { color: #888; font-size: 13px; margin-left: 8px; }
+.chip-row { display: flex; flex-wrap: wrap; gap: 4px; margin: 0 0 6px 0; }
+.chip { border: 1px solid #ccc; border-radius: 14px; background: white;
+        padding: 3px 10px; font-size: 12px; cursor: pointer; }
+.chip span { color: #888; font-weight: normal; }
+.chip.on { background: #fdebd0; border-color: #f96302; }
+/* Scanner tab */
+.scanner-container { max-width: 800px; margin: 0 auto; padding: 20px; }
+.drop-zone { border: 3px dashed #ccc; border-radius: 12px; padding: 40px 20px;
+               text-align: center; cursor: pointer; transition: all 0.3s;
+               background: #fafafa; margin-bottom: 20px; }
+.drop-zone:hover, .drop-zone.dragover { border-color: #f96302; background: #fff5ee; }
+.drop-zone p { margin: 8px 0; color: #666; }
+.drop-zone .icon { font-size: 48px; }
+.scanner-btn { background: #f96302; color: white; border: none; padding: 10px 20px;
+                 border-radius: 6px; cursor: pointer; font-size: 14px; margin: 5px; }
+.scanner-btn:hover { background: #e05800; }
+.scanner-btn:disabled { background: #ccc; cursor: not-allowed; }
+.preview-wrap { position: relative; display: inline-block; margin: 10px 0;
+                touch-action: none; cursor: crosshair; }
+.scanner-preview { max-width: 100%; max-height: 300px; border-radius: 8px;
+                     display: none; user-select: none; -webkit-user-drag: none; }
+.crop-box { position: absolute; display: none; pointer-events: none;
+            border: 2px dashed #f96302; background: rgba(249, 99, 2, 0.12); }
+.crop-hint { font-size: 12px; color: #999; margin: 0 0 6px 0; display: none; }
+.scanner-progress { display: none; margin: 15px 0; }
+.scanner-progress .bar { height: 6px; background: #eee; border-radius: 3px; overflow: hidden; }
+.scanner-progress .fill { height: 100%; background: #f96302; transition: width 0.3s; width: 0%; }
+.scanner-progress .label { font-size: 13px; color: #888; margin-top: 4px; }
+.scan-timing { font-size: 13px; color: #666; margin-top: 8px; }
+.batch-item { display: flex; align-items: center; gap: 10px; font-size: 13px; margin: 4px 0; }
+.batch-item .name { width: 180px; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; }
+.batch-item .bar { flex: 1; height: 6px; background: #eee; border-radius: 3px; overflow: hidden; }
+.batch-item .fill { height: 100%; width: 0%; background: #f96302; transition: width 0.3s; }
+.batch-item .state { width: 150px; color: #888; }
+.sku-result .sku-src { font-size: 12px; color: #888; margin-top: 2px; }
+.live-wrap { display: none; margin: 10px 0; }
+.live-view { position: relative; display: inline-block; max-width: 100%; }
+.live-view video { display: block; max-width: 100%; max-height: 360px;
+                   border-radius: 8px; background: #000; }
+.live-guide { position: absolute; border: 2px dashed #f96302; pointer-events: none; }
+.live-wrap.penny video { outline: 4px solid #2196f3; }
+.live-scan-status { font-size: 13px; color: #666; margin-top: 4px; }
+.scanner-results { margin-top: 20px; }
+.scanner-results h3 { margin-bottom: 10px; }
+.sku-result { padding: 12px 16px; margin: 8px 0; border-radius: 8px; border: 1px solid #eee; }
+.sku-result.match { background: #e8f5e9; border-color: #4caf50; }
+.sku-result.penny-match { background: #e3f2fd; border-color: #2196f3; }
+.sku-result.no-match { background: #fff3e0; border-color: #ff9800; }
+.sku-result .sku-num { font-weight: bold; font-size: 16px; font-family: monospace; }
+.sku-result .sku-status { font-size: 13px; margin-top: 4px; }
+.sku-result .sku-near { font-size: 13px; margin-top: 6px; }
+.sku-result .sku-near div { margin: 2px 0 0 12px; }
+.ocr-text { background: #f5f5f5; padding: 12px; border-radius: 6px; font-family: monospace;
+              font-size: 12px; max-height: 200px; overflow-y: auto; white-space: pre-wrap;
+              margin: 10px 0; display: none; }
+.toggle-link { color: #1877f2; cursor: pointer; font-size: 13px; }
+"""
+
+_REPORT_JS = """
+function switchTab(tab) {
+    document.querySelectorAll('.tab-content').forEach(el => el.classList.remove('active'));
+    document.querySelectorAll('.tab').forEach(el => el.classList.remove('active'));
+    document.getElementById('tab-' + tab).classList.add('active');
+    document.querySelector('.tab.' + tab).classList.add('active');
+    if (tab === 'hd') renderWindow(true);
+    if (tab === 'summary') renderDashboard();
+}
+
+// ── Summary tab ──────────────────────────────────────────────────────
+// The generator embeds precomputed aggregates as JSON (#dashboard-data);
+// this only lays them out, it never looks at the deal rows.
+function renderDashboard() {
+    const box = document.getElementById('dashboard');
+    const data = document.getElementById('dashboard-data');
+    if (!box || !data || box.childElementCount) return;
+    const D = JSON.parse(data.textContent);
+    const label = s => esc(s.toUpperCase().replace(/_/g, ' '));
+    const bar = (n, max) =>
+        `<span class="bar" style="width:${max ? Math.round(n / max * 120) : 0}px"></span>`;
+
+    let h = '<h3>Items by status and department</h3><table><thead><tr><th>Department</th>'
+        + D.statuses.map(s => `<th>${label(s)}</th>`).join('')
+        + '<th>Total</th></tr></thead><tbody>';
+    const totals = D.statuses.map(() => 0);
+    for (const [dept, ...counts] of D.counts) {
+        counts.forEach((n, i) => { totals[i] += n; });
+        h += `<tr><td>${esc(dept)}</td>`
+            + counts.map((n, i) => `<td class="num ${esc(D.statuses[i])}">${n || ''}</td>`).join('')
+            + `<td class="num">${counts.reduce((a, b) => a + b, 0)}</td></tr>`;
+    }
+    h += '<tr><td><b>All</b></td>'
+        + totals.map(n => `<td class="num"><b>${n}</b></td>`).join('')
+        + `<td class="num"><b>${totals.reduce((a, b) => a + b, 0)}</b></td></tr></tbody></table>`;
+
+    h += '<h3>Average days from Added to penny</h3><p>' + (D.days_to_penny === null
+        ? 'No pennies yet.'
+        : `${D.days_to_penny} days (${D.days_to_penny_n} items)`) + '</p>';
+
+    const maxDay = Math.max(0, ...D.pennies_per_day.map(([, n]) => n));
+    h += '<h3>New pennies per day</h3>' + (D.pennies_per_day.length
+        ? '<table><tbody>' + D.pennies_per_day.map(([day, n]) =>
+            `<tr><td>${esc(day)}</td><td class="num">${n}</td><td>${bar(n, maxDay)}</td></tr>`).join('')
+          + '</tbody></table>'
+        : '<p>None in this period.</p>');
+
+    h += '<h3>Phase 2 runs</h3>' + (D.runs.length
+        ? '<table><thead><tr><th>Started</th><th>Queued</th><th>Checked</th><th>Blocked</th>'
+          + '<th>Block rate</th></tr></thead><tbody>'
+          + D.runs.slice().reverse().map(([started, queued, checked, blocked]) => {
+                const rate = checked ? blocked / checked : 0;
+                return `<tr><td>${esc(started)}</td><td class="num">${queued}</td>`
+                    + `<td class="num">${checked}</td><td class="num">${blocked}</td>`
+                    + `<td>${checked ? Math.round(rate * 100) + '% ' + bar(rate, 1) : '—'}</td></tr>`;
+            }).join('') + '</tbody></table>'
+        : '<p>No phase2_log.tsv runs found.</p>');
+    box.innerHTML = h;
+}
+
+// ── HD table ─────────────────────────────────────────────────────────
+// Rows are fetched from deals.json and only the rows inside the scroll
+// window are in the DOM (virtual scroll), so load and sort time stay flat
+// as the tracker grows.  ROWS holds the rows of deals.json (the base
+// report) followed by the rows changes.json changed or added since;
+// `defaultOrder` is the generator's default order and `view` the current
+// display order (sorted, then filtered by the search box), both as
+// indices into ROWS.
+const COL = {IMAGE: 0, NAME: 1, SKU: 2, DEPT: 3, PRICE: 4, STATUS: 5,
+             UPDATED: 6, ADDED: 7, URL: 8,
+             // typed sort keys precomputed by the generator
+             PRICE_CENTS: 9, STATUS_RANK: 10, UPDATED_EPOCH: 11, ADDED_EPOCH: 12,
+             KEY: 13};
+const ROW_HEIGHT = 72;  // px, must match `.hd-table tbody tr` height
+const OVERSCAN = 8;     // extra rows rendered above/below the window
+let BASE = {rows: []};  // deals.json as fetched
+let ROWS = [];
+let SEARCH = {tokens: [], postings: []};
+let defaultOrder = [];
+let defaultPos = null;  // Int32Array: ROWS index -> position in defaultOrder, or -1
+let staleRows = null;   // Uint8Array: base rows changed or dropped since deals.json
+let view = [];
+let viewPos = null;     // Int32Array: ROWS index -> position in view, or -1
+let rowByKey = null;    // Map: row key -> ROWS index
+let targetRow = -1;     // row addressed by #row-<key>, outlined
+let searchMask = null;  // Uint8Array over ROWS, null = no search
+let lastRange = null;
+
+const hdScroll = document.getElementById('hd-scroll');
+const hdBody = document.querySelector('#hd-table tbody');
+
+function esc(s) {
+    return String(s == null ? '' : s).replace(/[&<>"']/g, c => (
+        {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c]));
+}
+
+function rowHtml(pos) {
+    const i = view[pos];
+    const r = ROWS[i];
+    const status = r[COL.STATUS] || 'unchecked';
+    const cls = (pos % 2 ? 'alt' : '') + (liveRows.has(i) ? ' live' : '')
+        + (i === targetRow ? ' target' : '');
+    return `<tr id="row-${esc(r[COL.KEY])}" data-key="${esc(r[COL.KEY])}" data-sku="${esc(r[COL.SKU])}"
+        data-idx="${i}"${cls ? ` class="${cls.trim()}"` : ''}>
+        <td>${imageHtml(r[COL.IMAGE])}</td>
+        <td><div class="clamp">${esc(r[COL.NAME])}</div></td>
+        <td class="sku">${esc(r[COL.SKU])}</td>
+        <td class="dept">${esc(r[COL.DEPT])}</td>
+        <td>${esc(r[COL.PRICE])}</td>
+        <td class="${esc(status)}">${esc(status.toUpperCase())}</td>
+        <td>${esc(r[COL.UPDATED])}</td>
+        <td>${esc(r[COL.ADDED])}</td>
+        <td><a href="${esc(r[COL.URL])}" target="_blank">Link</a></td>
+    </tr>`;
+}
+
+// Local thumbnails ("thumbs/<hash>-70.webp") are relative to the report
+// root and have a 140px sibling for high-DPI screens; anything else is a
+// hotlinked image URL.
+function imageHtml(src) {
+    if (!src) return '';
+    if (/^[a-z]+:/i.test(src)) return `<img src="${esc(src)}" loading="lazy">`;
+    const lo = REPORT_ROOT + src;
+    const hi = lo.replace(/-70\\.(webp|jpg)$/, '-140.$1');
+    return `<img src="${esc(lo)}" srcset="${esc(hi)} 2x" loading="lazy">`;
+}
+
+function spacerHtml(height) {
+    return height > 0
+        ? `<tr class="spacer" style="height:${height}px"><td colspan="9"></td></tr>`
+        : '';
+}
+
+function renderWindow(force) {
+    const top = hdScroll.scrollTop;
+    const first = Math.max(0, Math.floor(top / ROW_HEIGHT) - OVERSCAN);
+    const last = Math.min(view.length,
+        Math.ceil((top + hdScroll.clientHeight) / ROW_HEIGHT) + OVERSCAN);
+    if (!force && lastRange && lastRange[0] === first && lastRange[1] === last) return;
+    lastRange = [first, last];
+    let html = spacerHtml(first * ROW_HEIGHT);
+    for (let pos = first; pos < last; pos++) html += rowHtml(pos);
+    html += spacerHtml((view.length - last) * ROW_HEIGHT);
+    hdBody.innerHTML = html;
+}
+
+let scrollPending = false;
+hdScroll.addEventListener('scroll', () => {
+    if (scrollPending) return;
+    scrollPending = true;
+    requestAnimationFrame(() => { scrollPending = false; renderWindow(false); });
+}, {passive: true});
+window.addEventListener('resize', () => renderWindow(true));
+
+// Offline cache (sw.js at the report root): repeat visits load from
+// cache, which matters inside stores with poor signal.
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register(REPORT_ROOT + 'sw.js').catch(() => {});
+    });
+}
+
+function defaultView() {
+    return defaultOrder.slice();
+}
+
+function scrollToPos(pos) {
+    hdScroll.scrollTop = Math.max(0, pos * ROW_HEIGHT - hdScroll.clientHeight / 2);
+    renderWindow(true);
+}
+
+// Rows are addressed by their stable key (a hash of the item name, see
+// _deal_key): <tr id="row-<key>">, report#row-<key> links, and the
+// scraper's GitHub Pages click-through.  Since rows outside the scroll
+// window are not in the DOM, revealRowByKey scrolls the row in first
+// (clearing a search that hides it); both lookups are O(1).  Returns
+// null until the rows have loaded, then whether the row exists.
+window.revealRowByKey = function(key) {
+    if (!rowByKey) return null;
+    const i = rowByKey.get(key);
+    if (i === undefined) return false;
+    if (viewPos[i] < 0) {
+        // Hidden by the search box or a filter chip: clear both.
+        hdSearch.value = '';
+        for (const facet in FACETS) activeFilters[facet].clear();
+        computeFilterBits();
+        renderChips();
+        applySearch();
+    }
+    targetRow = i;
+    scrollToPos(viewPos[i]);
+    return true;
+};
+
+function revealHashRow() {
+    const m = location.hash.match(/^#row-([0-9a-f]+)$/);
+    if (!m || !ROWS.length) return;
+    if (!document.getElementById('tab-hd').classList.contains('active')) switchTab('hd');
+    window.revealRowByKey(m[1]);
+}
+window.addEventListener('hashchange', revealHashRow);
+
+// Current rows in the default order, for the scraper's tracker check.
+window.reportRows = function() {
+    return defaultOrder.map(i => ROWS[i]);
+};
+
+Promise.all([
+    fetch(DATA_URL).then(resp => {
+        if (!resp.ok) throw new Error('HTTP ' + resp.status);
+        return resp.json();
+    }),
+    // Rows changed since deals.json was written; without them (e.g. a
+    // failed request) the page still shows the base report.
+    CHANGES_URL && fetch(REPORT_ROOT + CHANGES_URL)
+        .then(resp => resp.ok ? resp.json() : null)
+        .catch(() => null),
+])
+    .then(([data, feed]) => {
+        BASE = data;
+        SEARCH = data.search || SEARCH;
+        applyChanges(feed, true);
+        revealHashRow();
+    })
+    .catch(err => {
+        hdBody.innerHTML = `<tr><td colspan="9" class="loading">
+            Could not load ${esc(DATA_URL)}: ${esc(err.message)}</td></tr>`;
+    });
+
+// Column sorting state
+let currentSortCol = -1;
+let currentSortDir = 0; // 0=default, 1=asc, 2=desc
+
+function clearArrows() {
+    document.querySelectorAll('#hd-table thead th .arrow').forEach(
+        arrow => { arrow.textContent = ''; });
+}
+
+// Sort keys per table column, built once per column on its first sort:
+// a Float64Array (NaN = missing) for numeric columns, lowercase strings
+// ('' = missing) for text columns.  Comparisons then never touch the DOM
+// or parse text.
+const NUMERIC_SORT = {
+    [COL.SKU]: r => r[COL.SKU] ? Number(r[COL.SKU]) : null,
+    [COL.PRICE]: r => r[COL.PRICE_CENTS],
+    [COL.STATUS]: r => r[COL.STATUS_RANK],
+    [COL.UPDATED]: r => r[COL.UPDATED_EPOCH],
+    [COL.ADDED]: r => r[COL.ADDED_EPOCH],
+};
+let sortKeys = {};
+
+function columnKeys(col) {
+    if (sortKeys[col]) return sortKeys[col];
+    const numeric = NUMERIC_SORT[col];
+    let keys;
+    if (numeric) {
+        keys = new Float64Array(ROWS.length);
+        ROWS.forEach((r, i) => {
+            const v = numeric(r);
+            keys[i] = v == null ? NaN : v;
+        });
+    } else {
+        keys = ROWS.map(r => String(r[col] || '').toLowerCase());
+    }
+    return (sortKeys[col] = keys);
+}
+
+// Index order for `col`; missing keys go last in either direction and
+// ties keep the default order.
+function sortedView(col, sign) {
+    const keys = columnKeys(col);
+    const missing = keys instanceof Float64Array
+        ? i => keys[i] !== keys[i]   // NaN
+        : i => keys[i] === '';
+    return defaultView().sort((a, b) => {
+        const ma = missing(a), mb = missing(b);
+        if (ma || mb) return ma === mb ? defaultPos[a] - defaultPos[b] : (ma ? 1 : -1);
+        const ka = keys[a], kb = keys[b];
+        return ka < kb ? -sign : ka > kb ? sign : defaultPos[a] - defaultPos[b];
+    });
+}
+
+function sortTable(col) {
+    // Cycle: default → asc → desc → default
+    if (currentSortCol === col) {
+        currentSortDir = (currentSortDir + 1) % 3;
+    } else {
+        currentSortCol = col;
+        currentSortDir = 1; // start with asc
+    }
+    clearArrows();
+
+    if (currentSortDir === 0) {
+        // Reset to default order
+        currentSortCol = -1;
+    } else {
+        const headers = document.querySelectorAll('#hd-table thead th');
+        const arrow = headers[col].querySelector('.arrow');
+        if (arrow) arrow.textContent = currentSortDir === 1 ? ' ▲' : ' ▼';
+    }
+    refreshView();
+}
+
+function resetSort() {
+    currentSortCol = -1;
+    currentSortDir = 0;
+    clearArrows();
+    refreshView();
+}
+
+// Rebuild `view` from the sort state and the search mask, then redraw
+// from the top (or in place, with keepScroll).
+function refreshView(keepScroll) {
+    const order = currentSortDir === 0
+        ? defaultView()
+        : sortedView(currentSortCol, currentSortDir === 1 ? 1 : -1);
+    view = searchMask || filterBits
+        ? order.filter(i => (!searchMask || searchMask[i])
+                            && (!filterBits || (filterBits[i >> 5] >>> (i & 31)) & 1))
+        : order;
+    viewPos = new Int32Array(ROWS.length).fill(-1);
+    view.forEach((i, pos) => { viewPos[i] = pos; });
+    hdCount.textContent = searchMask || filterBits
+        ? `${view.length} of ${defaultOrder.length} match` : '';
+    if (!keepScroll) hdScroll.scrollTop = 0;
+    renderWindow(true);
+}
+
+// ── Search ───────────────────────────────────────────────────────────
+// deals.json carries an inverted index: sorted tokens (from name, SKU and
+// department) with delta-encoded row ids.  Each query word is a prefix;
+// all words must match (AND).  A keystroke costs a binary search plus the
+// matching postings, not a scan of every row's text.
+const hdSearch = document.getElementById('hd-search');
+const hdCount = document.getElementById('hd-search-count');
+
+function firstTokenAtLeast(term) {
+    const tokens = SEARCH.tokens;
+    let lo = 0, hi = tokens.length;
+    while (lo < hi) {
+        const mid = (lo + hi) >> 1;
+        if (tokens[mid] < term) lo = mid + 1; else hi = mid;
+    }
+    return lo;
+}
+
+function prefixMatches(term) {
+    const hit = new Uint8Array(ROWS.length);
+    const tokens = SEARCH.tokens;
+    for (let k = firstTokenAtLeast(term);
+         k < tokens.length && tokens[k].startsWith(term); k++) {
+        let id = 0;
+        for (const delta of SEARCH.postings[k]) {
+            id += delta;
+            if (!staleRows[id]) hit[id] = 1;
+        }
+    }
+    for (const [id, rowTokens] of liveTokens) {
+        if (rowTokens.some(t => t.startsWith(term))) hit[id] = 1;
+    }
+    return hit;
+}
+
+function applySearch(keepScroll) {
+    const terms = hdSearch.value.toLowerCase().match(/[a-z0-9]+/g);
+    searchMask = null;
+    for (const term of terms || []) {
+        const hit = prefixMatches(term);
+        if (searchMask) {
+            for (let i = 0; i < hit.length; i++) searchMask[i] &= hit[i];
+        } else {
+            searchMask = hit;
+        }
+    }
+    refreshView(keepScroll);
+}
+
+hdSearch.addEventListener('input', () => applySearch());
+
+// ── Filter chips ─────────────────────────────────────────────────────
+// deals.json carries one bitset per status and per department (bit i =
+// row i, packed in 32-bit words).  Chips in a facet are OR'ed and facets
+// are AND'ed, a word at a time, into filterBits, which refreshView
+// combines with the search; no row text is read.
+const hdFilters = document.getElementById('hd-filters');
+const FACETS = {status: COL.STATUS, department: COL.DEPT};
+let FILTERS = {};         // facet -> value -> {count, bits: Uint32Array}
+const activeFilters = {status: new Set(), department: new Set()};
+let filterBits = null;    // Uint32Array over ROWS, null = no chip on
+
+function wordCount() {
+    return (ROWS.length + 31) >> 5;
+}
+
+function decodeBits(b64) {
+    const bytes = atob(b64);
+    const words = new Uint32Array(wordCount());
+    for (let k = 0; k < bytes.length; k++) {
+        words[k >> 2] |= bytes.charCodeAt(k) << ((k & 3) << 3);
+    }
+    return words;
+}
+
+function loadFilters(filters) {
+    FILTERS = {};
+    for (const facet in FACETS) {
+        FILTERS[facet] = {};
+        for (const [value, [count, b64]] of Object.entries((filters || {})[facet] || {})) {
+            FILTERS[facet][value] = {count, bits: decodeBits(b64)};
+        }
+        for (const value of activeFilters[facet]) {
+            if (!FILTERS[facet][value]) activeFilters[facet].delete(value);
+        }
+    }
+    computeFilterBits();
+    renderChips();
+}
+
+function computeFilterBits() {
+    filterBits = null;
+    for (const facet in FACETS) {
+        if (!activeFilters[facet].size) continue;
+        const any = new Uint32Array(wordCount());
+        for (const value of activeFilters[facet]) {
+            const bits = FILTERS[facet][value].bits;
+            for (let w = 0; w < bits.length; w++) any[w] |= bits[w];
+        }
+        if (filterBits) {
+            for (let w = 0; w < any.length; w++) filterBits[w] &= any[w];
+        } else {
+            filterBits = any;
+        }
+    }
+}
+
+function chipLabel(facet, value) {
+    return facet === 'status' ? value.toUpperCase().replace(/_/g, ' ')
+                              : (value || 'No department');
+}
+
+function renderChips() {
+    let html = '';
+    for (const facet in FACETS) {
+        const chips = Object.entries(FILTERS[facet] || {}).filter(([, f]) => f.count);
+        if (chips.length < 2) continue;
+        html += '<div class="chip-row">' + chips.map(([value, f]) =>
+            `<button type="button" class="chip${activeFilters[facet].has(value) ? ' on' : ''}"
+                data-facet="${facet}" data-value="${esc(value)}"><b${facet === 'status'
+                ? ` class="${esc(value)}"` : ''}>${esc(chipLabel(facet, value))}</b>
+                <span>${f.count}</span></button>`).join('') + '</div>';
+    }
+    if (filterBits) html += '<button type="button" class="chip" data-clear="1">Clear filters</button>';
+    hdFilters.innerHTML = html;
+}
+
+hdFilters.addEventListener('click', event => {
+    const chip = event.target.closest('.chip');
+    if (!chip) return;
+    if (chip.dataset.clear) {
+        for (const facet in FACETS) activeFilters[facet].clear();
+    } else {
+        const selected = activeFilters[chip.dataset.facet];
+        const value = chip.dataset.value;
+        if (selected.has(value)) selected.delete(value); else selected.add(value);
+    }
+    computeFilterBits();
+    renderChips();
+    refreshView();
+});
+
+// Move row i from oldRow's status/department sets to row's (either may be
+// null, for a row added or dropped by changes.json).
+function updateRowFacets(i, oldRow, row) {
+    const words = wordCount();
+    for (const facet in FACETS) {
+        const col = FACETS[facet], sets = FILTERS[facet];
+        if (!sets) continue;
+        const old = oldRow && sets[oldRow[col]];
+        if (old) {
+            old.bits[i >> 5] &= ~(1 << (i & 31));
+            old.count--;
+        }
+        if (!row) continue;
+        let f = sets[row[col]];
+        if (!f) f = sets[row[col]] = {count: 0, bits: new Uint32Array(words)};
+        if (f.bits.length < words) {
+            const grown = new Uint32Array(words);
+            grown.set(f.bits);
+            f.bits = grown;
+        }
+        f.bits[i >> 5] |= 1 << (i & 31);
+        f.count++;
+    }
+}
+
+// ── Live updates ─────────────────────────────────────────────────────
+// changes.json lists every row changed or added since deals.json was
+// written (each with the version of the feed it appeared in and, per
+// page, how many unchanged rows come before it in the default order)
+// and the keys of rows dropped since.  The page applies it on load; while
+// Phase 2 runs, the scraper republishes it, and polls revalidate against
+// the HTTP cache, so an unchanged feed costs a 304.
+const CHANGES_POLL_MS = 60000;
+const liveStatus = document.getElementById('live-status');
+let liveTokens = [];      // [row id, tokens] for rows from the feed
+let liveRows = new Set(); // row ids changed since load, highlighted
+let changesVersion = 0;   // version of the feed applied
+let loadedVersion = 0;    // ... and of the one the page loaded with
+let loadedKeys = new Set(); // keys of that feed's rows
+let changesEtag = null;
+
+// Rebuild ROWS, the filter sets and the default order from the base
+// report plus every change in `feed`.  Starting over from the base also
+// undoes changes that have since been reverted.
+function applyChanges(feed, initial) {
+    if (feed && feed.base !== BASE_VERSION) {
+        liveStatus.textContent = 'A newer report is available — reload the page.';
+        if (!initial) return false;
+        feed = null;
+    }
+    ROWS = BASE.rows.slice();
+    const baseCount = ROWS.length;
+    rowByKey = new Map(ROWS.map((r, i) => [r[COL.KEY], i]));
+    loadFilters(BASE.filters);
+    staleRows = new Uint8Array(baseCount);
+    for (const key of (feed && feed.dropped) || []) {
+        const i = rowByKey.get(key);
+        if (i === undefined) continue;
+        staleRows[i] = 1;
+        rowByKey.delete(key);
+        updateRowFacets(i, ROWS[i], null);
+    }
+    if (initial) {
+        loadedVersion = feed ? feed.version : 0;
+        loadedKeys = new Set(((feed && feed.rows) || []).map(([, r]) => r[COL.KEY]));
+    }
+    const inserts = [];   // [unchanged rows before it, ROWS index]
+    liveTokens = [];
+    liveRows = new Set();
+    for (const [version, row, anchors] of (feed && feed.rows) || []) {
+        const before = anchors[CHANGES_SCOPE];
+        if (before === undefined) continue;
+        const i = ROWS.length;
+        ROWS.push(row);
+        rowByKey.set(row[COL.KEY], i);
+        updateRowFacets(i, null, row);
+        liveTokens.push([i, [row[COL.NAME], row[COL.SKU], row[COL.DEPT]]
+            .join(' ').toLowerCase().match(/[a-z0-9]+/g) || []]);
+        if (version > loadedVersion && !initial) liveRows.add(i);
+        inserts.push([before, i]);
+    }
+    // Rows back at their base value since load
+    for (const key of loadedKeys) {
+        const i = rowByKey.get(key);
+        if (i !== undefined && i < baseCount) liveRows.add(i);
+    }
+    // Feed rows come in the default order, so `before` only goes up.
+    defaultOrder = [];
+    let k = 0, kept = 0;
+    for (let i = 0; i < baseCount; i++) {
+        if (staleRows[i]) continue;
+        while (k < inserts.length && inserts[k][0] <= kept) defaultOrder.push(inserts[k++][1]);
+        defaultOrder.push(i);
+        kept++;
+    }
+    while (k < inserts.length) defaultOrder.push(inserts[k++][1]);
+    defaultPos = new Int32Array(ROWS.length).fill(-1);
+    defaultOrder.forEach((i, pos) => { defaultPos[i] = pos; });
+    const stale = new Uint8Array(ROWS.length);
+    stale.set(staleRows);
+    staleRows = stale;
+    changesVersion = feed ? feed.version : 0;
+    sortKeys = {};
+    computeFilterBits();
+    renderChips();
+    applySearch(!initial);
+    if (liveRows.size) {
+        liveStatus.textContent = `Live: ${liveRows.size} updated since load (${feed.updated})`;
+    }
+    return true;
+}
+
+function pollChanges() {
+    if (document.hidden || !BASE.rows.length) return Promise.resolve(true);
+    return fetch(REPORT_ROOT + CHANGES_URL.split('?')[0], {cache: 'no-cache'})
+        .then(resp => {
+            if (!resp.ok) return null;
+            const etag = resp.headers.get('ETag');
+            if (etag && etag === changesEtag) return null;
+            changesEtag = etag;
+            return resp.json();
+        })
+        .then(feed => feed && feed.version !== changesVersion
+            ? applyChanges(feed, false) : true)
+        .catch(() => true);
+}
+
+if (CHANGES_URL) {
+    const loop = () => pollChanges().then(more => {
+        if (more) setTimeout(loop, CHANGES_POLL_MS);
+    });
+    setTimeout(loop, CHANGES_POLL_MS);
+    document.addEventListener('visibilitychange', () => {
+        if (!document.hidden) pollChanges();
+    });
+}
+"""
+
+_SCANNER_JS = """
+(function() {
+    const dropZone = document.getElementById('dropZone');
+    const fileInput = document.getElementById('fileInput');
+    const cameraBtn = document.getElementById('cameraBtn');
+    const cameraInput = document.getElementById('cameraInput');
+    const preview = document.getElementById('scannerPreview');
+    const progress = document.getElementById('scannerProgress');
+    const progressFill = document.getElementById('progressFill');
+    const progressLabel = document.getElementById('progressLabel');
+    const results = document.getElementById('scannerResults');
+    const ocrTextEl = document.getElementById('ocrText');
+    const toggleOcr = document.getElementById('toggleOcr');
+    const scanTiming = document.getElementById('scanTiming');
+    const previewWrap = document.getElementById('previewWrap');
+    const cropBox = document.getElementById('cropBox');
+    const cropHint = document.getElementById('cropHint');
+    const cropScanBtn = document.getElementById('cropScanBtn');
+    const batchList = document.getElementById('batchList');
+    const liveBtn = document.getElementById('liveBtn');
+    const liveWrap = document.getElementById('liveWrap');
+    const liveVideo = document.getElementById('liveVideo');
+    const liveGuide = document.getElementById('liveGuide');
+    const liveStatus = document.getElementById('liveStatus');
+    const liveHits = document.getElementById('liveHits');
+
+    // ── OCR engine ──────────────────────────────────────────────────
+    // Tesseract.js and its English model are loaded the first time the
+    // scanner is used (opening the tab warms up one worker).  Workers are
+    // kept and reused: a pool that grows on demand up to OCR_POOL_SIZE
+    // (one per spare core, capped since each holds its own model), with
+    // a queue for scans waiting on a free worker.
+    const TESSERACT_SRC = 'https://cdn.jsdelivr.net/npm/tesseract.js@5/dist/tesseract.min.js';
+    const OCR_POOL_SIZE = Math.max(1, Math.min(4, (navigator.hardwareConcurrency || 2) - 1));
+    let scriptPromise = null;
+    const pool = [];      // slots: {worker: Promise<Tesseract worker>, logger}
+    const idle = [];      // slots free for the next scan
+    const waiting = [];   // resolvers of scans queued for a slot
+    const timings = {engine: null, first: null, scans: 0};
+
+    function loadScript(src) {
+        return new Promise((resolve, reject) => {
+            const script = document.createElement('script');
+            script.src = src;
+            script.onload = resolve;
+            script.onerror = () => reject(new Error('could not load ' + src));
+            document.head.appendChild(script);
+        });
+    }
+
+    function loadTesseract() {
+        if (!scriptPromise) {
+            scriptPromise = (window.Tesseract ? Promise.resolve() : loadScript(TESSERACT_SRC))
+                .catch(err => { scriptPromise = null; throw err; });
+        }
+        return scriptPromise;
+    }
+
+    function newSlot() {
+        const slot = {logger: null};
+        const t0 = performance.now();
+        slot.worker = loadTesseract()
+            .then(() => Tesseract.createWorker('eng', 1, {
+                logger: m => { if (slot.logger) slot.logger(m); },
+            }))
+            .then(worker => {
+                if (timings.engine === null) timings.engine = (performance.now() - t0) / 1000;
+                return worker;
+            });
+        slot.worker.catch(() => {});  // reported by the scan that uses it
+        pool.push(slot);
+        return slot;
+    }
+
+    function acquireSlot() {
+        if (idle.length) return Promise.resolve(idle.pop());
+        if (pool.length < OCR_POOL_SIZE) return Promise.resolve(newSlot());
+        return new Promise(resolve => waiting.push(resolve));
+    }
+
+    function releaseSlot(slot) {
+        slot.logger = null;
+        const next = waiting.shift();
+        if (next) next(slot); else idle.push(slot);
+    }
+
+    function dropSlot(slot) {
+        pool.splice(pool.indexOf(slot), 1);
+        const next = waiting.shift();
+        if (next) next(newSlot());
+    }
+
+    // OCR one image on the next free pooled worker; *logger* gets its
+    // Tesseract progress messages.
+    async function recognize(image, logger) {
+        const slot = await acquireSlot();
+        slot.logger = logger;
+        let worker;
+        try {
+            worker = await slot.worker;
+        } catch (err) {
+            dropSlot(slot);
+            throw err;
+        }
+        try {
+            return (await worker.recognize(image)).data;
+        } finally {
+            releaseSlot(slot);
+        }
+    }
+
+    document.querySelector('.tab.scanner').addEventListener('click', () => {
+        if (!pool.length) idle.push(newSlot());
+    });
+
+    // ── Preprocessing ───────────────────────────────────────────────
+    // Photos are downscaled, converted to grayscale and adaptively
+    // binarized (optionally cropped) in a Web Worker with OffscreenCanvas
+    // (ocr-preprocess.js) before OCR.  Browsers without OffscreenCanvas
+    // send the original photo.
+    const OCR_MAX_SIDE = 2000;  // px, long side of the image handed to OCR
+    const canPreprocess = typeof Worker !== 'undefined'
+        && typeof OffscreenCanvas !== 'undefined'
+        && typeof createImageBitmap !== 'undefined';
+    let prepWorker = null;
+    let prepSeq = 0;
+    const prepPending = new Map();
+
+    // Post *msg* to the preprocessing worker; resolves with its reply.
+    function prepCall(msg, transfer) {
+        if (!prepWorker) {
+            prepWorker = new Worker(OCR_PREPROCESS_URL);
+            prepWorker.onmessage = e => {
+                const job = prepPending.get(e.data.id);
+                prepPending.delete(e.data.id);
+                if (job) job(e.data);
+            };
+        }
+        const id = ++prepSeq;
+        return new Promise(resolve => {
+            prepPending.set(id, resolve);
+            prepWorker.postMessage({...msg, id}, transfer || []);
+        });
+    }
+
+    function preprocess(file, crop) {
+        if (!canPreprocess) return Promise.resolve({image: file, note: 'original image'});
+        const t0 = performance.now();
+        return prepCall({image: file, crop, maxSide: OCR_MAX_SIDE}).then(msg => msg.error
+            ? {image: file, note: 'preprocessing failed, original image'}
+            : {image: msg.blob, note: `prep ${Math.round(performance.now() - t0)} ms, ` +
+                                      `${msg.width}×${msg.height}`});
+    }
+
+    // ── Crop selection ──────────────────────────────────────────────
+    // Drag on the preview to select a region (as fractions of the photo);
+    // "Scan selected area" re-runs OCR on just that part.
+    let currentFile = null;
+    let cropStart = null;
+    let crop = null;
+
+    function dragRect(e) {
+        const r = preview.getBoundingClientRect();
+        const x = Math.min(1, Math.max(0, (e.clientX - r.left) / r.width));
+        const y = Math.min(1, Math.max(0, (e.clientY - r.top) / r.height));
+        return {x: Math.min(x, cropStart.x), y: Math.min(y, cropStart.y),
+                w: Math.abs(x - cropStart.x), h: Math.abs(y - cropStart.y)};
+    }
+
+    function drawCrop(rect) {
+        cropBox.style.display = rect ? 'block' : 'none';
+        if (!rect) return;
+        cropBox.style.left = rect.x * 100 + '%';
+        cropBox.style.top = rect.y * 100 + '%';
+        cropBox.style.width = rect.w * 100 + '%';
+        cropBox.style.height = rect.h * 100 + '%';
+    }
+
+    previewWrap.addEventListener('pointerdown', e => {
+        if (!currentFile) return;
+        e.preventDefault();
+        const r = preview.getBoundingClientRect();
+        cropStart = {x: (e.clientX - r.left) / r.width, y: (e.clientY - r.top) / r.height};
+        previewWrap.setPointerCapture(e.pointerId);
+    });
+    previewWrap.addEventListener('pointermove', e => {
+        if (cropStart) drawCrop(dragRect(e));
+    });
+    previewWrap.addEventListener('pointerup', e => {
+        if (!cropStart) return;
+        const rect = dragRect(e);
+        cropStart = null;
+        crop = rect.w > 0.02 && rect.h > 0.02 ? rect : null;
+        drawCrop(crop);
+        cropScanBtn.style.display = crop ? 'inline-block' : 'none';
+    });
+    cropScanBtn.addEventListener('click', () => {
+        if (currentFile && crop) processImage(currentFile, crop);
+    });
+
+    function showTiming(secs, detail) {
+        timings.scans++;
+        if (timings.first === null) timings.first = secs;
+        let text = timings.scans === 1
+            ? `First scan: ${secs.toFixed(1)} s`
+            : `Scan ${timings.scans}: ${secs.toFixed(1)} s (reused worker) · first scan: ${timings.first.toFixed(1)} s`;
+        if (timings.engine !== null) text += ` · OCR engine load: ${timings.engine.toFixed(1)} s, once per visit`;
+        if (detail) text += ` · ${detail}`;
+        scanTiming.textContent = text;
+    }
+
+    // Show camera button on mobile
+    if (/Mobi|Android/i.test(navigator.userAgent)) {
+        cameraBtn.style.display = 'inline-block';
+    }
+    if (canPreprocess && navigator.mediaDevices && navigator.mediaDevices.getUserMedia) {
+        liveBtn.style.display = 'inline-block';
+    }
+
+    // Drop zone events
+    dropZone.addEventListener('click', () => fileInput.click());
+    dropZone.addEventListener('dragover', e => {
+        e.preventDefault(); dropZone.classList.add('dragover');
+    });
+    dropZone.addEventListener('dragleave', () => dropZone.classList.remove('dragover'));
+    dropZone.addEventListener('drop', e => {
+        e.preventDefault(); dropZone.classList.remove('dragover');
+        handleFiles(e.dataTransfer.files);
+    });
+
+    fileInput.addEventListener('change', e => handleFiles(e.target.files));
+
+    cameraBtn.addEventListener('click', () => cameraInput.click());
+    cameraInput.addEventListener('change', e => handleFiles(e.target.files));
+    liveBtn.addEventListener('click', () => { if (live) stopLive(); else startLive(); });
+    document.addEventListener('visibilitychange', () => { if (document.hidden) stopLive(); });
+
+    // Paste support
+    document.addEventListener('paste', e => {
+        const items = e.clipboardData?.items;
+        if (!items) return;
+        const files = [...items].filter(item => item.type.startsWith('image/'))
+                                .map(item => item.getAsFile());
+        if (!files.length) return;
+        e.preventDefault();
+        handleFiles(files);
+        // Switch to scanner tab
+        switchTab('scanner');
+    });
+
+    // One photo gets the preview/crop flow; several go through processBatch.
+    function handleFiles(fileList) {
+        const files = [...(fileList || [])].filter(
+            f => !f.type || f.type.startsWith('image/'));
+        if (files.length === 1) processImage(files[0]);
+        else if (files.length > 1) processBatch(files);
+    }
+
+    async function processImage(file, region) {
+        // Show preview (a new photo clears any crop selection)
+        if (!region) {
+            currentFile = file;
+            crop = null;
+            drawCrop(null);
+            cropScanBtn.style.display = 'none';
+            preview.src = URL.createObjectURL(file);
+            preview.style.display = 'block';
+            cropHint.style.display = 'block';
+            batchList.innerHTML = '';
+        }
+
+        // Reset
+        results.innerHTML = '';
+        ocrTextEl.textContent = '';
+        ocrTextEl.style.display = 'none';
+        toggleOcr.style.display = 'none';
+        progress.style.display = 'block';
+        progressFill.style.width = '0%';
+        progressLabel.textContent = 'Loading OCR engine...';
+
+        const t0 = performance.now();
+        const logger = m => {
+            if (m.status === 'recognizing text') {
+                const pct = Math.round((m.progress || 0) * 100);
+                progressFill.style.width = pct + '%';
+                progressLabel.textContent = `Scanning... ${pct}%`;
+            } else if (m.status) {
+                progressLabel.textContent = m.status;
+            }
+        };
+        try {
+            // Whole-photo scans try a barcode first (a crop means the user
+            // picked text for OCR).
+            const codes = region ? [] : await readBarcodes(file);
+            if (codes.length) {
+                const skus = await barcodeSkus(codes);
+                scanTiming.textContent = `Barcode read in ${Math.round(performance.now() - t0)} ms — OCR skipped`;
+                progress.style.display = 'none';
+                ocrTextEl.textContent = 'Barcode(s): ' + codes.join(', ');
+                toggleOcr.style.display = 'inline';
+                await showSkuResults(skus);
+                return;
+            }
+            progressLabel.textContent = 'No barcode found, running OCR...';
+            const prepared = await preprocess(file, region || null);
+            const data = await recognize(prepared.image, logger);
+            showTiming((performance.now() - t0) / 1000, prepared.note);
+
+            progressFill.style.width = '100%';
+            progressLabel.textContent = 'Done!';
+            setTimeout(() => { progress.style.display = 'none'; }, 1500);
+
+            // Show raw OCR text
+            ocrTextEl.textContent = data.text;
+            toggleOcr.style.display = 'inline';
+
+            // Extract and check SKUs
+            await analyzeText(data.text);
+
+        } catch (err) {
+            progressLabel.textContent = 'OCR failed: ' + err.message;
+            progressFill.style.width = '0%';
+        }
+    }
+
+    // Scan several photos at once: each is preprocessed and queued on the
+    // OCR pool, with its own progress row; SKUs from all photos are merged
+    // into one deduplicated result list noting which photos they came from.
+    async function processBatch(files) {
+        currentFile = null;
+        crop = null;
+        drawCrop(null);
+        preview.style.display = 'none';
+        cropHint.style.display = 'none';
+        cropScanBtn.style.display = 'none';
+        progress.style.display = 'none';
+        results.innerHTML = '';
+        ocrTextEl.textContent = '';
+        ocrTextEl.style.display = 'none';
+        toggleOcr.style.display = 'none';
+        scanTiming.textContent = `Scanning ${files.length} photos...`;
+        batchList.innerHTML = files.map((f, i) => `<div class="batch-item">
+            <span class="name">${esc(f.name || 'Photo ' + (i + 1))}</span>
+            <div class="bar"><div class="fill" id="batchFill${i}"></div></div>
+            <span class="state" id="batchState${i}">queued</span></div>`).join('');
+
+        const t0 = performance.now();
+        const texts = [];
+        const sources = new Map();  // sku -> [photo numbers]
+        await Promise.all(files.map(async (file, i) => {
+            const fill = document.getElementById('batchFill' + i);
+            const state = document.getElementById('batchState' + i);
+            try {
+                state.textContent = 'reading barcode';
+                const codes = await readBarcodes(file);
+                let skus, text;
+                if (codes.length) {
+                    skus = await barcodeSkus(codes);
+                    text = 'Barcode(s): ' + codes.join(', ');
+                } else {
+                    state.textContent = 'preparing';
+                    const prepared = await preprocess(file, null);
+                    state.textContent = 'waiting for OCR';
+                    const data = await recognize(prepared.image, m => {
+                        if (m.status === 'recognizing text') {
+                            const pct = Math.round((m.progress || 0) * 100);
+                            fill.style.width = pct + '%';
+                            state.textContent = `scanning ${pct}%`;
+                        }
+                    });
+                    skus = extractSkus(data.text);
+                    text = data.text;
+                }
+                fill.style.width = '100%';
+                state.textContent = `${skus.length} SKU(s)${codes.length ? ' (barcode)' : ''}`;
+                texts[i] = `--- Photo ${i + 1} ---\\n${text}`;
+                for (const sku of skus) {
+                    if (!sources.has(sku)) sources.set(sku, []);
+                    sources.get(sku).push(i + 1);
+                }
+            } catch (err) {
+                state.textContent = 'failed: ' + err.message;
+            }
+        }));
+
+        const secs = (performance.now() - t0) / 1000;
+        scanTiming.textContent = `${files.length} photos in ${secs.toFixed(1)} s ` +
+            `(${(secs / files.length).toFixed(1)} s/photo) with ${pool.length} OCR ` +
+            `worker(s), up to ${OCR_POOL_SIZE} on this device`;
+        ocrTextEl.textContent = texts.filter(Boolean).join('\\n\\n');
+        toggleOcr.style.display = 'inline';
+        await showSkuResults([...sources.keys()], sources);
+    }
+
+    // ── Live camera ─────────────────────────────────────────────────
+    // "Live scan" streams the rear camera into a <video> and samples
+    // frames from it.  Each sample goes to the preprocessing worker, which
+    // hashes it (64-bit difference hash); a frame within LIVE_SAME_BITS of
+    // the last one scanned is dropped there, so holding the phone on the
+    // same tag costs almost nothing.  New frames are tried as barcodes,
+    // then OCR of the guide box.  The wait before the next sample is
+    // LIVE_IDLE_RATIO times the work the last frame took, so scanning
+    // keeps the device busy at most a third of the time however fast it
+    // is; unchanged frames back off towards LIVE_MAX_INTERVAL.  The
+    // camera turns off when the tab or page is left, or after
+    // LIVE_STOP_AFTER without a new view.  Tracked SKUs collect in a list
+    // as they are seen, penny items first and flashed on arrival.
+    const LIVE_MIN_INTERVAL = 150;   // ms between samples, about 7 fps at most
+    const LIVE_MAX_INTERVAL = 1500;  // ms, backoff cap while the view is unchanged
+    const LIVE_IDLE_RATIO = 2;
+    const LIVE_SAME_BITS = 5;        // of 64; more differing bits is a new view
+    const LIVE_STOP_AFTER = 120000;  // ms
+    const LIVE_CROP = {x: 0.1, y: 0.3, w: 0.8, h: 0.4};  // guide box, fractions of the frame
+    let live = null;  // {stream, timer, hash, delay, changedAt, frames, skipped, seen}
+
+    async function startLive() {
+        let stream;
+        try {
+            stream = await navigator.mediaDevices.getUserMedia({audio: false, video: {
+                facingMode: 'environment', width: {ideal: 1280}, height: {ideal: 720},
+                frameRate: {ideal: 15}}});
+        } catch (err) {
+            scanTiming.textContent = 'Camera unavailable: ' + err.message;
+            return;
+        }
+        if (live) stopLive();
+        live = {stream, timer: null, hash: null, delay: LIVE_MIN_INTERVAL,
+                changedAt: performance.now(), frames: 0, skipped: 0, seen: new Map()};
+        liveVideo.srcObject = stream;
+        await liveVideo.play().catch(() => {});
+        for (const [side, key] of [['left', 'x'], ['top', 'y'], ['width', 'w'], ['height', 'h']]) {
+            liveGuide.style[side] = LIVE_CROP[key] * 100 + '%';
+        }
+        liveWrap.style.display = 'block';
+        liveStatus.textContent = 'Point the camera at a shelf tag or barcode...';
+        liveHits.innerHTML = '';
+        liveBtn.textContent = '⏹ Stop live scan';
+        if (!pool.length) idle.push(newSlot());
+        live.timer = setTimeout(sampleFrame, 0);
+    }
+
+    function stopLive(reason) {
+        if (!live) return;
+        clearTimeout(live.timer);
+        live.stream.getTracks().forEach(track => track.stop());
+        live = null;
+        liveVideo.srcObject = null;
+        liveWrap.style.display = 'none';
+        liveBtn.textContent = '🎥 Live scan';
+        if (reason) scanTiming.textContent = reason;
+    }
+
+    async function sampleFrame() {
+        const run = live;
+        if (!run) return;
+        if (!document.getElementById('tab-scanner').classList.contains('active')) return stopLive();
+        if (performance.now() - run.changedAt > LIVE_STOP_AFTER) {
+            return stopLive('Live scan stopped: the view did not change for ' +
+                            `${LIVE_STOP_AFTER / 60000} minutes`);
+        }
+        const t0 = performance.now();
+        let delay;
+        try {
+            const bitmap = await createImageBitmap(liveVideo);
+            const res = await prepCall({frame: bitmap, prevHash: run.hash, sameBits: LIVE_SAME_BITS},
+                                       [bitmap]);
+            if (res.error) throw new Error(res.error);
+            run.frames++;
+            if (!res.changed) {
+                run.skipped++;
+                delay = Math.min(LIVE_MAX_INTERVAL, run.delay * 1.5);
+            } else {
+                run.hash = res.hash;
+                run.changedAt = performance.now();
+                let skus;
+                try {
+                    skus = live === run ? await frameSkus(res.frame) : [];
+                } finally {
+                    res.frame.close();
+                }
+                if (live === run) await addLiveHits(run, skus);
+                delay = (performance.now() - t0) * LIVE_IDLE_RATIO;
+            }
+        } catch (err) {
+            delay = LIVE_MAX_INTERVAL;
+        }
+        if (live !== run) return;
+        run.delay = Math.max(LIVE_MIN_INTERVAL, delay);
+        const found = [...run.seen.values()].filter(Boolean).length;
+        liveStatus.textContent = `${run.frames} frames, ${run.skipped} unchanged skipped · ` +
+            `next in ${Math.round(run.delay)} ms · ${found} tracked item(s) seen`;
+        run.timer = setTimeout(sampleFrame, run.delay);
+    }
+
+    async function frameSkus(bitmap) {
+        const codes = await readBarcodes(bitmap);
+        if (codes.length) return barcodeSkus(codes);
+        const prepared = await preprocess(bitmap, LIVE_CROP);
+        return extractSkus((await recognize(prepared.image, null)).text);
+    }
+
+    // Record *skus* read from a frame; each is looked up once per session
+    // (misses are kept as null so OCR noise is not fetched again).
+    async function addLiveHits(run, skus) {
+        const fresh = skus.filter(sku => !run.seen.has(sku));
+        if (!fresh.length) return;
+        const known = await lookupSkus(fresh);
+        let penny = false;
+        for (const sku of fresh) {
+            run.seen.set(sku, known[sku] || null);
+            if (known[sku] && PENNY_STATUSES.has(known[sku].status)) penny = true;
+        }
+        if (penny) {
+            liveWrap.classList.add('penny');
+            setTimeout(() => liveWrap.classList.remove('penny'), 1200);
+            if (navigator.vibrate) navigator.vibrate(200);
+        }
+        const hits = [...run.seen].filter(([, info]) => info).reverse();
+        hits.sort((a, b) => PENNY_STATUSES.has(b[1].status) - PENNY_STATUSES.has(a[1].status));
+        liveHits.innerHTML = hits.map(([sku, info]) => matchHtml(sku, info)).join('');
+    }
+
+    // Lookup shards (SKU_SHARDS: sku -> info, UPC_SHARDS: upc -> sku),
+    // fetched on first use and kept for the rest of the visit.
+    const shardCache = {};
+
+    function loadShard(path) {
+        if (!(path in shardCache)) {
+            shardCache[path] = fetch(path)
+                .then(resp => resp.ok ? resp.json() : {})
+                .catch(() => { delete shardCache[path]; return {}; });
+        }
+        return shardCache[path];
+    }
+
+    async function lookupCodes(table, codes) {
+        const paths = [...new Set(codes.map(c => table[c.slice(-SKU_SHARD_DIGITS)]))];
+        const shards = await Promise.all(paths.filter(Boolean).map(loadShard));
+        const found = {};
+        shards.forEach(shard => Object.assign(found, shard));
+        return found;
+    }
+
+    function lookupSkus(skus) {
+        return lookupCodes(SKU_SHARDS, skus);
+    }
+
+    // ── Near matches ────────────────────────────────────────────────
+    // OCR misreads digits (8↔3, 1↔7, 0↔8, ...), so a SKU we track can come
+    // back as "not in our tracker".  For misses, the BK-tree over every
+    // tracked SKU (SKU_TREE_URL, fetched on the first miss) yields the
+    // SKUs within FUZZY_MAX_EDITS edits, pruning by the triangle
+    // inequality.  They are ranked by an edit distance in which swapping
+    // digits Tesseract often confuses costs less than any other edit.
+    // Short digit strings are all close to each other, so a radius-2
+    // query still visits well over half the tree (~1.5 ms for 10k
+    // SKUs); fine for a few reads per photo.
+    const FUZZY_MAX_EDITS = 2;
+    const FUZZY_MAX_COST = 1;     // weighted distance at most one plain edit
+    const FUZZY_MAX_SUGGESTIONS = 3;
+    const OCR_CONFUSION = {};     // digit pair -> substitution cost
+    for (const [pairs, cost] of [['83 17 08', 0.3],
+                                 ['56 68 06 09 89 58 27 49 14 35 25', 0.5]]) {
+        for (const p of pairs.split(' ')) OCR_CONFUSION[p] = OCR_CONFUSION[p[1] + p[0]] = cost;
+    }
+
+    // Levenshtein distance from *code* (< 32 chars) to other strings,
+    // bit-parallel (Myers 1999).  The match masks are built once per code.
+    function distanceFrom(code) {
+        const m = code.length;
+        if (!m) return s => s.length;
+        const peq = {};
+        for (let i = 0; i < m; i++) peq[code[i]] = (peq[code[i]] || 0) | (1 << i);
+        const top = 1 << (m - 1);
+        return s => {
+            let pv = -1, mv = 0, score = m;
+            for (let i = 0; i < s.length; i++) {
+                const eq = peq[s[i]] || 0;
+                const xv = eq | mv;
+                const xh = (((eq & pv) + pv) ^ pv) | eq;
+                let ph = mv | ~(xh | pv);
+                let mh = pv & xh;
+                if (ph & top) score++;
+                else if (mh & top) score--;
+                ph = (ph << 1) | 1;
+                mh <<= 1;
+                pv = mh | ~(xv | ph);
+                mv = ph & xv;
+            }
+            return score;
+        };
+    }
+
+    function ocrCost(read, sku) {
+        let prev = Array.from({length: sku.length + 1}, (_, j) => j);
+        for (let i = 1; i <= read.length; i++) {
+            const cur = [i];
+            for (let j = 1; j <= sku.length; j++) {
+                const a = read[i - 1], b = sku[j - 1];
+                const sub = a === b ? 0 : (OCR_CONFUSION[a + b] || 1);
+                cur.push(Math.min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + sub));
+            }
+            prev = cur;
+        }
+        return prev[sku.length];
+    }
+
+    // Tree nodes are [code, d1, child1, d2, child2, ...] (see _bk_insert).
+    function bkSearch(tree, code, maxEdits) {
+        const distance = distanceFrom(code);
+        const found = [], stack = [tree];
+        while (stack.length) {
+            const node = stack.pop();
+            const d = distance(node[0]);
+            if (d <= maxEdits) found.push(node[0]);
+            for (let k = 1; k < node.length; k += 2) {
+                if (Math.abs(node[k] - d) <= maxEdits) stack.push(node[k + 1]);
+            }
+        }
+        return found;
+    }
+
+    // {read code: [[sku, weighted distance], ...] best first}
+    async function nearMatches(codes) {
+        if (!codes.length || !SKU_TREE_URL) return {};
+        const tree = await loadShard(SKU_TREE_URL);
+        if (!Array.isArray(tree)) return {};
+        const near = {};
+        for (const code of codes) {
+            const ranked = bkSearch(tree, code, FUZZY_MAX_EDITS)
+                .map(sku => [sku, ocrCost(code, sku)])
+                .filter(([, cost]) => cost <= FUZZY_MAX_COST)
+                .sort((x, y) => x[1] - y[1] || (x[0] < y[0] ? -1 : 1))
+                .slice(0, FUZZY_MAX_SUGGESTIONS);
+            if (ranked.length) near[code] = ranked;
+        }
+        return near;
+    }
+
+    function editHint(read, sku) {
+        if (read.length !== sku.length) return read.length < sku.length ? 'digit missed' : 'extra digit';
+        const subs = [];
+        for (let i = 0; i < read.length; i++) {
+            if (read[i] !== sku[i]) subs.push(`${read[i]}→${sku[i]}`);
+        }
+        return subs.join(', ');
+    }
+
+    // ── Barcode fast path ───────────────────────────────────────────
+    // Tried before OCR: the native BarcodeDetector where the browser has
+    // one, else the barcode-detector polyfill (ZXing compiled to WASM),
+    // loaded on first use.  Decoding takes milliseconds; OCR only runs
+    // when no barcode is found.  UPCs map to Store SKUs via UPC_SHARDS.
+    const BARCODE_POLYFILL_SRC = 'https://cdn.jsdelivr.net/npm/barcode-detector@2/dist/iife/polyfill.min.js';
+    const BARCODE_FORMATS = ['upc_a', 'upc_e', 'ean_13', 'ean_8', 'code_128'];
+    let detectorPromise = null;
+
+    function getDetector() {
+        if (!detectorPromise) {
+            detectorPromise = (async () => {
+                if (!('BarcodeDetector' in window)) await loadScript(BARCODE_POLYFILL_SRC);
+                const supported = await BarcodeDetector.getSupportedFormats();
+                const formats = BARCODE_FORMATS.filter(f => supported.includes(f));
+                return formats.length ? new BarcodeDetector({formats}) : null;
+            })().catch(() => null);
+        }
+        return detectorPromise;
+    }
+
+    async function readBarcodes(file) {
+        const detector = await getDetector();
+        if (!detector || typeof createImageBitmap === 'undefined') return [];
+        try {
+            const bitmap = await createImageBitmap(file);
+            const codes = await detector.detect(bitmap);
+            if (bitmap.close) bitmap.close();
+            return [...new Set(codes.map(c => c.rawValue))];
+        } catch (err) {
+            return [];
+        }
+    }
+
+    // 12-digit UPC-A for a UPC-A or leading-zero EAN-13 with a valid
+    // check digit (same rule as normalize_upc in the generator), else null.
+    function normalizeUpc(code) {
+        let c = String(code).replace(/\\D/g, '');
+        if (c.length === 13 && c[0] === '0') c = c.slice(1);
+        if (c.length !== 12) return null;
+        let total = 0;
+        for (let i = 0; i < 11; i++) total += Number(c[i]) * (i % 2 ? 1 : 3);
+        return (10 - total % 10) % 10 === Number(c[11]) ? c : null;
+    }
+
+    // Turn decoded barcodes into numbers to look up: the Store SKU for
+    // UPCs we know, else the UPC itself (its HD search link still works);
+    // other numeric codes that look like SKUs pass through.
+    async function barcodeSkus(codes) {
+        const upcs = codes.map(normalizeUpc);
+        const known = await lookupCodes(UPC_SHARDS, upcs.filter(Boolean));
+        const skus = codes.map((code, i) => upcs[i]
+            ? (known[upcs[i]] || upcs[i])
+            : (/^\\d{6,12}$/.test(code) ? code : null));
+        return [...new Set(skus.filter(Boolean))];
+    }
+
+    async function analyzeText(text) {
+        await showSkuResults(extractSkus(text));
+    }
+
+    function extractSkus(text) {
+        // Extract potential SKUs: 6-12 digit numbers
+        const allNums = text.match(/\\b\\d{6,12}\\b/g) || [];
+        // Also look for explicit SKU/model patterns
+        const skuPattern = /(?:SKU|sku|model|Model|item|Item)[#:\\s]*(\\d{6,9})/g;
+        let m;
+        while ((m = skuPattern.exec(text)) !== null) {
+            if (!allNums.includes(m[1])) allNums.push(m[1]);
+        }
+
+        // Deduplicate
+        return [...new Set(allNums)];
+    }
+
+    // Render lookup results for *skus*; *sources* (batch scans) maps each
+    // SKU to the photo numbers it was read from.
+    async function showSkuResults(skus, sources) {
+        if (skus.length === 0) {
+            results.innerHTML = '<p style="color:#999;">No SKU numbers found in image. ' +
+                'Try a clearer photo of the receipt or shelf tag.</p>';
+            return;
+        }
+
+        const known = await lookupSkus(skus);
+        const near = await nearMatches(skus.filter(sku => !known[sku]));
+        const nearInfo = await lookupSkus(Object.values(near).flat().map(([sku]) => sku));
+        let html = '<h3>Found ' + skus.length + ' potential SKU(s)</h3>';
+        let pennyCount = 0;
+
+        for (const sku of skus) {
+            const info = known[sku];
+            if (info) {
+                if (PENNY_STATUSES.has(info.status)) pennyCount++;
+                html += matchHtml(sku, info, sourceHtml(sources, sku));
+            } else {
+                html += `<div class="sku-result no-match">
+                    <div class="sku-num">❓ ${esc(sku)}</div>
+                    <div class="sku-status">Not in our tracker &nbsp;|&nbsp;
+                        <a href="https://www.homedepot.com/s/${encodeURIComponent(sku)}" target="_blank">Search HD</a>
+                    </div>${nearHtml(sku, near[sku], nearInfo)}${sourceHtml(sources, sku)}
+                </div>`;
+            }
+        }
+
+        if (pennyCount > 0) {
+            html = `<div style="background:#e3f2fd; padding:12px 16px; border-radius:8px;
+                     margin-bottom:15px; font-size:16px;">
+                     🎯 <b>${pennyCount} penny item(s) found!</b></div>` + html;
+        }
+
+        results.innerHTML = html;
+    }
+
+    function matchHtml(sku, info, extra) {
+        const isPenny = PENNY_STATUSES.has(info.status);
+        const statusLabel = info.status.toUpperCase().replace(/_/g, ' ');
+        return `<div class="sku-result ${isPenny ? 'penny-match' : 'match'}">
+            <div class="sku-num">${isPenny ? '🎯 ' : '✅ '}${esc(sku)}</div>
+            <div class="sku-status">
+                <b>${esc(info.name)}</b><br>
+                Status: <span class="${esc(info.status)}">${esc(statusLabel)}</span>
+                &nbsp;|&nbsp; <a href="${esc(info.url)}" target="_blank">View on HD</a>
+                ${info.key ? `&nbsp;|&nbsp; <a href="#row-${esc(info.key)}">Show in table</a>` : ''}
+            </div>${extra || ''}
+        </div>`;
+    }
+
+    function nearHtml(read, ranked, infos) {
+        const rows = (ranked || []).filter(([sku]) => infos[sku]).map(([sku]) => {
+            const info = infos[sku];
+            const statusLabel = info.status.toUpperCase().replace(/_/g, ' ');
+            return `<div>${PENNY_STATUSES.has(info.status) ? '🎯' : '✅'}
+                <a href="${esc(info.url)}" target="_blank"><b>${esc(sku)}</b></a>
+                (${esc(editHint(read, sku))}) ${esc(info.name)} —
+                <span class="${esc(info.status)}">${esc(statusLabel)}</span></div>`;
+        });
+        return rows.length ? `<div class="sku-near">Did you mean:${rows.join('')}</div>` : '';
+    }
+
+    function sourceHtml(sources, sku) {
+        return sources ? `<div class="sku-src">Photo ${sources.get(sku).sort((a, b) => a - b).join(', ')}</div>` : '';
+    }
+})();
+"""
+
+
+# sw.js body; _write_service_worker prepends REPORT_VERSION, PRECACHE and
+# THUMBS for the current report.
+_SERVICE_WORKER_JS = """
+// Service worker for offline use of the report.
+//  - install: precache the shell, current data files and scanner lookups
+//    into a cache named by REPORT_VERSION, plus any missing thumbnails.
+//  - same-origin requests: stale-while-revalidate from that cache, so
+//    repeat loads are instant and the cache refreshes in the background.
+//    A new report ships a new sw.js; activating it drops the old cache.
+//  - thumbnails (content-hashed, never change) and the scanner's OCR /
+//    barcode libraries from their CDNs: cache-first, kept across versions.
+const SHELL_CACHE = 'report-shell-' + REPORT_VERSION;
+const THUMB_CACHE = 'report-thumbs';
+const SCANNER_CACHE = 'report-scanner-libs';
+const SCANNER_HOSTS = ['cdn.jsdelivr.net', 'fastly.jsdelivr.net',
+                       'tessdata.projectnaptha.com'];
+const abs = path => new URL(path, self.registration.scope).href;
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        // Content-hashed URLs already cached by an older version are
+        // copied over instead of downloaded again.
+        const shell = await caches.open(SHELL_CACHE);
+        const fetchList = [];
+        for (const url of PRECACHE.map(abs)) {
+            const old = /[?&]v=|\\.[0-9a-f]{12}\\./.test(url) && await caches.match(url);
+            if (old) await shell.put(url, old);
+            else fetchList.push(new Request(url, {cache: 'reload'}));
+        }
+        await shell.addAll(fetchList);
+        const thumbs = await caches.open(THUMB_CACHE);
+        const cached = new Set((await thumbs.keys()).map(r => r.url));
+        const missing = THUMBS.map(abs).filter(u => !cached.has(u));
+        for (let i = 0; i < missing.length; i += 20) {
+            await Promise.all(missing.slice(i, i + 20).map(u => thumbs.add(u).catch(() => {})));
+        }
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        for (const name of await caches.keys()) {
+            if (name.startsWith('report-shell-') && name !== SHELL_CACHE) await caches.delete(name);
+        }
+        // Drop thumbnails no current row uses (140px ones are cached on view)
+        const keep = new Set(THUMBS.map(t => abs(t).replace(/-70\\.(webp|jpg)$/, '')));
+        const thumbs = await caches.open(THUMB_CACHE);
+        for (const req of await thumbs.keys()) {
+            if (!keep.has(req.url.replace(/-(70|140)\\.(webp|jpg)$/, ''))) await thumbs.delete(req);
+        }
+        await self.clients.claim();
+    })());
+});
+
+async function cacheFirst(req, cacheName) {
+    const cache = await caches.open(cacheName);
+    const cached = await cache.match(req);
+    if (cached) return cached;
+    const resp = await fetch(req);
+    if (resp.ok || resp.type === 'opaque') cache.put(req, resp.clone());
+    return resp;
+}
+
+async function staleWhileRevalidate(event, req) {
+    const url = new URL(req.url);
+    if (url.pathname.endsWith('/')) url.pathname += 'index.html';
+    const key = url.href;
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match(key);
+    const network = fetch(req).then(resp => {
+        if (resp.ok) cache.put(key, resp.clone());
+        return resp;
+    });
+    if (cached) {
+        event.waitUntil(network.catch(() => {}));
+        return cached;
+    }
+    try {
+        return await network;
+    } catch (err) {
+        if (req.mode === 'navigate') {
+            const home = await cache.match(abs('index.html'));
+            if (home) return home;
+        }
+        throw err;
+    }
+}
+
+self.addEventListener('fetch', event => {
+    const req = event.request;
+    if (req.method !== 'GET') return;
+    const url = new URL(req.url);
+    if (SCANNER_HOSTS.includes(url.hostname)) {
+        event.respondWith(cacheFirst(req, SCANNER_CACHE));
+    } else if (url.pathname.endsWith('/changes.json') && !url.search) {
+        return;  // live-update polls: always from the network
+    } else if (url.origin === self.location.origin && req.url.startsWith(self.registration.scope)) {
+        event.respondWith(req.url.startsWith(abs('thumbs/'))
+            ? cacheFirst(req, THUMB_CACHE)
+            : staleWhileRevalidate(event, req));
+    }
+});
+"""
+
+_OCR_PREPROCESS_JS = """
+// Web Worker: prepares a photo for OCR off the main thread.  Crops to the
+// selected region, downscales so the long side is at most maxSide, converts
+// to grayscale and binarizes with a local-mean (Bradley) threshold, which
+// copes with the uneven lighting of shelf-tag and receipt photos.
+// Message in: {id, image: Blob, crop: {x, y, w, h} fractions | null, maxSide}
+// Message out: {id, blob, width, height} or {id, error}
+//
+// Live-scan frames are only hashed (see hashFrame).
+// Message in: {id, frame: ImageBitmap, prevHash: [lo, hi] | null, sameBits}
+// Message out: {id, hash, changed, frame} -- the frame is transferred back
+// only when changed, i.e. more than sameBits bits differ from prevHash.
+const THRESHOLD_PCT = 15;  // pixel is ink if this much darker than its window
+const HASH_W = 9, HASH_H = 8;  // difference hash: 8 comparisons per row, 8 rows
+const HASH_CELL = 4;           // px averaged per hash cell side
+let hashCanvas = null;
+
+self.onmessage = async e => {
+    if (e.data.frame) return hashFrame(e.data);
+    const {id, image, crop, maxSide} = e.data;
+    try {
+        const bitmap = await createImageBitmap(image);
+        const c = crop || {x: 0, y: 0, w: 1, h: 1};
+        const sx = Math.round(c.x * bitmap.width);
+        const sy = Math.round(c.y * bitmap.height);
+        const sw = Math.max(1, Math.round(c.w * bitmap.width));
+        const sh = Math.max(1, Math.round(c.h * bitmap.height));
+        const scale = Math.min(1, maxSide / Math.max(sw, sh));
+        const w = Math.max(1, Math.round(sw * scale));
+        const h = Math.max(1, Math.round(sh * scale));
+
+        const canvas = new OffscreenCanvas(w, h);
+        const ctx = canvas.getContext('2d', {willReadFrequently: true});
+        ctx.imageSmoothingQuality = 'high';
+        ctx.drawImage(bitmap, sx, sy, sw, sh, 0, 0, w, h);
+        bitmap.close();
+        const img = ctx.getImageData(0, 0, w, h);
+        binarize(img.data, w, h);
+        ctx.putImageData(img, 0, 0);
+        const blob = await canvas.convertToBlob({type: 'image/png'});
+        self.postMessage({id, blob, width: w, height: h});
+    } catch (err) {
+        self.postMessage({id, error: String((err && err.message) || err)});
+    }
+};
+
+function hashFrame({id, frame, prevHash, sameBits}) {
+    try {
+        const hash = frameHash(frame);
+        const changed = !prevHash
+            || bitCount(hash[0] ^ prevHash[0]) + bitCount(hash[1] ^ prevHash[1]) > sameBits;
+        if (changed) {
+            self.postMessage({id, hash, changed, frame}, [frame]);
+            return;
+        }
+        frame.close();
+        self.postMessage({id, hash, changed});
+    } catch (err) {
+        frame.close();
+        self.postMessage({id, error: String((err && err.message) || err)});
+    }
+}
+
+// 64-bit difference hash as two 32-bit ints: the frame is shrunk to 9×8
+// cells of mean brightness and each bit says whether a cell is darker than
+// its right neighbour.  Stable under noise and exposure drift, changes
+// when the camera moves to something else.
+function frameHash(frame) {
+    const w = HASH_W * HASH_CELL, h = HASH_H * HASH_CELL;
+    if (!hashCanvas) hashCanvas = new OffscreenCanvas(w, h);
+    const ctx = hashCanvas.getContext('2d', {willReadFrequently: true});
+    ctx.drawImage(frame, 0, 0, w, h);
+    const px = ctx.getImageData(0, 0, w, h).data;
+    const cells = new Uint32Array(HASH_W * HASH_H);
+    for (let y = 0; y < h; y++) {
+        for (let x = 0; x < w; x++) {
+            const j = (y * w + x) * 4;
+            cells[(y / HASH_CELL | 0) * HASH_W + (x / HASH_CELL | 0)] +=
+                px[j] * 77 + px[j + 1] * 150 + px[j + 2] * 29;
+        }
+    }
+    const hash = [0, 0];
+    for (let y = 0; y < HASH_H; y++) {
+        for (let x = 0; x < HASH_W - 1; x++) {
+            const bit = y * (HASH_W - 1) + x;
+            if (cells[y * HASH_W + x] < cells[y * HASH_W + x + 1]) hash[bit >> 5] |= 1 << (bit & 31);
+        }
+    }
+    return hash;
+}
+
+function bitCount(n) {
+    n -= (n >>> 1) & 0x55555555;
+    n = (n & 0x33333333) + ((n >>> 2) & 0x33333333);
+    return Math.imul((n + (n >>> 4)) & 0x0f0f0f0f, 0x01010101) >>> 24;
+}
+
+// In-place grayscale + adaptive threshold of RGBA pixels.  Window sums come
+// from an integral image, so the cost is O(w*h) whatever the window size.
+function binarize(px, w, h) {
+    const gray = new Uint8Array(w * h);
+    for (let i = 0, j = 0; i < gray.length; i++, j += 4) {
+        gray[i] = (px[j] * 77 + px[j + 1] * 150 + px[j + 2] * 29) >> 8;
+    }
+    const stride = w + 1;
+    const integral = new Uint32Array(stride * (h + 1));
+    for (let y = 0; y < h; y++) {
+        let rowSum = 0;
+        for (let x = 0; x < w; x++) {
+            rowSum += gray[y * w + x];
+            integral[(y + 1) * stride + x + 1] = integral[y * stride + x + 1] + rowSum;
+        }
+    }
+    const half = Math.max(4, Math.floor(Math.max(w, h) / 16));  // window ≈ 1/8 of the image
+    for (let y = 0; y < h; y++) {
+        const y1 = Math.max(0, y - half), y2 = Math.min(h, y + half + 1);
+        for (let x = 0; x < w; x++) {
+            const x1 = Math.max(0, x - half), x2 = Math.min(w, x + half + 1);
+            const sum = integral[y2 * stride + x2] - integral[y1 * stride + x2]
+                      - integral[y2 * stride + x1] + integral[y1 * stride + x1];
+            const count = (x2 - x1) * (y2 - y1);
+            const ink = gray[y * w + x] * count * 100 < sum * (100 - THRESHOLD_PCT);
+            const j = (y * w + x) * 4;
+            px[j] = px[j + 1] = px[j + 2] = ink ? 0 : 255;
+            px[j + 3] = 255;
+        }
+    }
+}
+"""
+
+
 def _load_fb_deals(output_dir):
     """Load FB deals from fb_deals.tsv if it exists."""
     fb_tsv = os.path.join(output_dir, "fb_deals.tsv")
@@ -312,319 +2218,1413 @@ def _load_fb_deals(output_dir):
     return deals
 
 
-def generate_html_report(deals, output_path):
-    """Creates a visual HTML report with images, status colors, and timestamps.
-    Includes a second tab for Facebook group deals if fb_deals.tsv exists."""
+# Default report order: penny & OOS first, then blocked/failed, clearance,
+# everything else.
+REPORT_STATUS_PRIORITY = {
+    'penny_new': 0,
+    'penny': 0,
+    'penny_old': 0,
+    'out_of_stock': 0,
+    'blocked': 1,
+    'failure': 2,
+    'error': 3,
+    'clearance': 4,
+    'penny_candidate': 5,
+    'not_penny': 6,
+    'unchecked': 7,
+}
+
+
+def _timestamp_epoch(timestamp):
+    """Seconds since the epoch for a TIMESTAMP_FORMAT string, or None if it
+    is empty or malformed.  Naive timestamps are read as UTC so DST shifts
+    can't reorder rows."""
+    if not timestamp:
+        return None
+    try:
+        return datetime.datetime.strptime(timestamp, TIMESTAMP_FORMAT).replace(
+            tzinfo=datetime.timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+def _price_cents(price):
+    """Integer cents for a price string like "$1,299.00", or None."""
+    m = re.search(r'\d[\d,]*(?:\.\d+)?', price or '')
+    if not m:
+        return None
+    return round(float(m.group(0).replace(',', '')) * 100)
+
+
+def _report_sort_key(d):
+    """Sort key for the report's default order: (status priority, empty
+    department, lowercased department, updated_at).  See
+    _sort_by_report_key for how it is applied."""
+    status = d.get('hd_status', '') or 'unchecked'
+    department = d.get('department', '') or ''
+    return (REPORT_STATUS_PRIORITY.get(status, 99), department == '',
+            department.lower(), d.get('updated_at', '') or '')
+
+
+def _sort_by_report_key(items, sort_key):
+    """Sort *items* in place into the report's default order; *sort_key*
+    returns an item's _report_sort_key().
+
+    Status priority, then department (alphabetical, empty last), then
+    updated_at descending as a plain string: newest first for well-formed
+    timestamps, empty last, and malformed values where string comparison
+    puts them.  That needs a descending pass, so this is two stable sorts
+    rather than one."""
+    items.sort(key=lambda item: sort_key(item)[3], reverse=True)
+    items.sort(key=lambda item: sort_key(item)[:3])
+
+
+def _render_fb_row(deal):
+    """Render one Facebook tab row, escaping every field."""
+    esc = html.escape
+    images = deal.get("images", "").split(",")
+    img_html = ""
+    if images and images[0]:
+        img_html = f'<img class="fb-img" src="{esc(images[0])}" loading="lazy">'
+
+    sku_html = ""
+    for sku in deal.get("skus", "").split(","):
+        sku = esc(sku.strip())
+        if sku:
+            hd_search = f"https://www.homedepot.com/s/{sku}"
+            sku_html += f'<a class="sku" href="{hd_search}" target="_blank">{sku}</a><br>'
+
+    upc_html = ""
+    for upc_val in deal.get("upcs", "").split(","):
+        upc_val = esc(upc_val.strip())
+        if upc_val:
+            upc_html += f'<span class="upc">{upc_val}</span><br>'
+
+    link_html = ""
+    for link in deal.get("hd_links", "").split(","):
+        link = link.strip()
+        if link and "homedepot.com" in link:
+            link_html += f'<a href="{esc(link)}" target="_blank">View</a><br>'
+
+    snippet = deal.get("text_snippet", "")
+    return f"""<tr>
+                <td>{img_html}</td>
+                <td>{sku_html or '—'}</td>
+                <td>{upc_html or '—'}</td>
+                <td>{link_html or '—'}</td>
+                <td class="snippet" title="{esc(snippet)}">{esc(snippet[:100])}</td>
+                <td class="date">{esc(deal.get("post_date", ""))}</td>
+            </tr>"""
+
+
+# Cache: like _row_cache, kept in memory for the run and persisted under
+# REPORT_CACHE_DIR.
+_fb_cache = None        # {"version", "stat", "sha1", "deals", "html"}
+_fb_cache_path = None
+
+
+def _load_fb_tab(output_dir):
+    """Return (FB deals, rendered Facebook tab rows) for fb_deals.tsv,
+    reparsing and re-rendering only when the file has changed.
+
+    An unchanged (mtime, size) reuses the cache without reading the TSV;
+    if only those moved, an unchanged SHA-1 of its content still does."""
+    global _fb_cache, _fb_cache_path
+    fb_tsv = os.path.join(output_dir, "fb_deals.tsv")
+    try:
+        st = os.stat(fb_tsv)
+    except OSError:
+        return [], ""
+    path = os.path.join(output_dir, REPORT_CACHE_DIR, FB_CACHE_FILENAME)
+    if _fb_cache is None or _fb_cache_path != path:
+        _fb_cache, _fb_cache_path = {}, path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("version") == FB_CACHE_VERSION:
+                _fb_cache = cached
+        except (OSError, ValueError):
+            pass
+    stat = [st.st_mtime_ns, st.st_size]
+    if _fb_cache.get("stat") == stat:
+        return _fb_cache["deals"], _fb_cache["html"]
+
+    with open(fb_tsv, "rb") as f:
+        sha1 = hashlib.sha1(f.read()).hexdigest()
+    if _fb_cache.get("sha1") != sha1:
+        deals = _load_fb_deals(output_dir)
+        _fb_cache = {"version": FB_CACHE_VERSION, "sha1": sha1, "deals": deals,
+                     "html": "".join(_render_fb_row(d) for d in deals)}
+        print(f"FB tab: parsed {len(deals)} posts from fb_deals.tsv")
+    _fb_cache["stat"] = stat
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _atomic_write(path) as out:
+        out.write(json.dumps(_fb_cache, ensure_ascii=False,
+                             separators=(",", ":")))
+    return _fb_cache["deals"], _fb_cache["html"]
+
+
+@contextlib.contextmanager
+def _atomic_write(path):
+    """Open *path* for writing through a temp file that replaces it only
+    once the block completes, so a killed run never leaves a half-written
+    report artifact behind."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        yield f
+    os.replace(tmp_path, path)
+
+
+def _deal_key(name):
+    """Stable key for a tracked item: a short hash of its name, which is
+    what the tracker dedupes on (the Internet # in the URL is unreliable).
+    Report rows use it as their id ("row-<key>")."""
+    return hashlib.sha1((name or '').encode("utf-8")).hexdigest()[:12]
+
+
+def _deal_record(d):
+    """Return one deals.json row (values in DEALS_JSON_COLUMNS order)."""
+    url = d.get('url', '') or ''
+    # Prefer the Store SKU read from the HD product page;
+    # fall back to Internet # parsed from the URL.
+    sku = d.get('sku', '') or (extract_sku_from_url(url) if url else '')
+    status = d.get('hd_status', '') or 'unchecked'
+    updated = _timestamp_epoch(d.get('updated_at', ''))
+    added = _timestamp_epoch(d.get('original_timestamp', ''))
+    return [
+        d.get('image', '') or '',
+        d.get('name', '') or 'Unknown',
+        sku or '',
+        d.get('department', '') or '',
+        d.get('price', '') or 'N/A',
+        status,
+        d.get('updated_at', '') or '',
+        d.get('original_timestamp', '') or '',
+        url or '#',
+        # Sort keys (DEALS_JSON_SORT_KEYS); null sorts last in the table
+        _price_cents(d.get('price', '')),
+        REPORT_STATUS_PRIORITY.get(status, 99),
+        None if updated is None else int(updated),
+        None if added is None else int(added),
+        _deal_key(d.get('name', '')),
+    ]
+
+
+# Cache: row fragments survive between generate_html_report() calls in
+# one run; the file under REPORT_CACHE_DIR carries them across runs.
+_row_cache = None       # {key: [row_json, sku, sort_key, search_tokens,
+                        #        added_epoch, updated_epoch, row_key]}
+_row_cache_path = None
+
+
+def _row_cache_key(d):
+    """Content hash of the deal fields that feed _deal_record()."""
+    raw = "\x1f".join(d.get(f, '') or '' for f in DEALS_JSON_FIELDS)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+
+def _load_row_cache(output_dir):
+    """Return the row-fragment cache for *output_dir*, reading it from
+    disk only the first time (or when the output dir changes)."""
+    global _row_cache, _row_cache_path
+    path = os.path.join(output_dir, REPORT_CACHE_DIR, ROW_CACHE_FILENAME)
+    if _row_cache is None or _row_cache_path != path:
+        _row_cache, _row_cache_path = {}, path
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            if cached.get("version") == ROW_CACHE_VERSION:
+                _row_cache = cached.get("rows", {})
+        except (OSError, ValueError):
+            pass
+    return _row_cache
+
+
+def _save_row_cache(rows):
+    """Replace the cache with *rows* (only the rows of this report, so
+    entries for deleted or changed rows don't pile up) and persist it."""
+    global _row_cache
+    _row_cache = rows
+    os.makedirs(os.path.dirname(_row_cache_path), exist_ok=True)
+    with _atomic_write(_row_cache_path) as out:
+        out.write(json.dumps({"version": ROW_CACHE_VERSION, "rows": rows},
+                             ensure_ascii=False, separators=(",", ":")))
+
+
+def _report_rows(deals, output_dir, thumbs):
+    """Return (rows, used_rows, rendered) for *deals*, with images pointing
+    at *thumbs*: rows are (cache key, row cache entry, deal) in the
+    report's default order, used_rows is {cache key: entry} and rendered
+    counts the rows not found in the cache.
+
+    Each row's deals.json fragment, sku, sort key, search tokens,
+    timestamp epochs and row key are cached by a hash of its fields; only
+    new/changed rows go through _deal_record, json.dumps,
+    _report_sort_key and _search_tokens."""
+    row_cache = _load_row_cache(output_dir)
+    used_rows = {}
+    rendered = 0
+    rows = []
+    for d in deals:
+        thumb = thumbs.get(d.get('image', ''))
+        if thumb:
+            d = dict(d, image=thumb)
+        key = _row_cache_key(d)
+        cached = row_cache.get(key)
+        if cached is None:
+            record = _deal_record(d)
+            cached = ["\n" + json.dumps(record, ensure_ascii=False,
+                                        separators=(",", ":")),
+                      record[DEALS_JSON_COLUMNS.index("sku")],
+                      list(_report_sort_key(d)),
+                      _search_tokens(record),
+                      record[DEALS_JSON_COLUMNS.index("added_epoch")],
+                      record[DEALS_JSON_COLUMNS.index("updated_epoch")],
+                      record[DEALS_JSON_COLUMNS.index("key")]]
+            rendered += 1
+        used_rows[key] = cached
+        rows.append((key, cached, d))
+    # On the cached _report_sort_key of each row
+    _sort_by_report_key(rows, lambda r: r[1][2])
+    return rows, used_rows, rendered
+
+
+def _row_pages(d, dept_slugs):
+    """The report pages a deal's row is listed on: "" (index.html), its
+    department's dept/ slug and, for PENNY_STATUSES, the penny page."""
+    pages = ["", dept_slugs[d.get('department', '') or '']]
+    if d.get('hd_status', '') in PENNY_STATUSES:
+        pages.append(PENNY_PAGE_SLUG)
+    return pages
+
+
+def _load_report_base(output_dir):
+    """The base report's state (see _save_report_base), or None if there
+    is none usable: no state, an older ROW_CACHE_VERSION, or deals.json
+    missing."""
+    try:
+        with open(os.path.join(output_dir, REPORT_CACHE_DIR, REPORT_BASE_FILENAME),
+                  "r", encoding="utf-8") as f:
+            base = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (base.get("version") != ROW_CACHE_VERSION
+            or not os.path.isfile(os.path.join(output_dir, DEALS_JSON_FILENAME))):
+        return None
+    return base
+
+
+def _save_report_base(output_dir, base_id, rows, shards):
+    """Record a freshly written deals.json (content hash *base_id*) as the
+    base report: the cache key and row key of each of its *rows*, in
+    order, and the dept/ *shards* written with it.  Rows must be unique by
+    row key for changes.json to address them; otherwise no base is kept
+    and every report is written in full."""
+    path = os.path.join(output_dir, REPORT_CACHE_DIR, REPORT_BASE_FILENAME)
+    row_keys = [cached[6] for _, cached, _ in rows]
+    if len(set(row_keys)) != len(row_keys):
+        if os.path.isfile(path):
+            os.remove(path)
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _atomic_write(path) as out:
+        out.write(json.dumps({
+            "version": ROW_CACHE_VERSION, "id": base_id,
+            "rows": [[key, row_key] for (key, _, _), row_key in zip(rows, row_keys)],
+            "shards": sorted(shards)}, separators=(",", ":")))
+
+
+def _report_delta(rows, base, dept_slugs, max_fraction=None):
+    """Diff report *rows* (from _report_rows) against the *base* report.
+
+    Returns (changed, dropped).  *changed* lists (row fragment, anchors)
+    for every row that is not in the base as is, in report order; anchors
+    maps each page the row is listed on (see _row_pages) to the number of
+    unchanged base rows of that page before it, which is where report.js
+    inserts it.  *dropped* lists the row keys of the base rows that
+    changed or are gone.
+
+    Returns None when the report has to be written in full instead: the
+    unchanged rows are no longer in base order or a row key repeats.  With
+    *max_fraction* (regenerating the report), also when a changed row's
+    department has no page in the base or more than that fraction of the
+    base has changed; without it (the Phase 2 feed), such a row is only
+    listed on the pages that exist."""
+    position = {key: i for i, (key, _) in enumerate(base["rows"])}
+    shards = set(base["shards"])
+    before = {}   # page -> unchanged base rows so far
+    row_keys = set()
+    changed = []
+    last = -1
+    for key, cached, d in rows:
+        if cached[6] in row_keys:
+            return None
+        row_keys.add(cached[6])
+        pages = _row_pages(d, dept_slugs)
+        i = position.pop(key, None)
+        if i is None:
+            if pages[1] not in shards:
+                if max_fraction is not None:
+                    return None
+                del pages[1]
+            changed.append((cached[0], {page: before.get(page, 0) for page in pages}))
+            continue
+        if i < last:
+            return None
+        last = i
+        for page in pages:
+            before[page] = before.get(page, 0) + 1
+    dropped = [base["rows"][i][1] for i in sorted(position.values())]
+    if (max_fraction is not None
+            and max(len(changed), len(dropped)) > max_fraction * len(base["rows"])):
+        return None
+    return changed, dropped
+
+
+def _search_tokens(record):
+    """Distinct lowercase word tokens of a deals.json row's name, SKU and
+    department, for the table's search box (report.js tokenizes queries
+    with the same [a-z0-9]+ rule)."""
+    text = " ".join((record[DEALS_JSON_COLUMNS.index("name")],
+                     record[DEALS_JSON_COLUMNS.index("sku")],
+                     record[DEALS_JSON_COLUMNS.index("department")]))
+    return sorted(set(re.findall(r'[a-z0-9]+', text.lower())))
+
+
+def _search_index_json(token_lists):
+    """Inverted index over rows (token_lists[i] = tokens of row i) as JSON:
+    {"tokens": [...sorted...], "postings": [[row ids, delta-encoded], ...]}.
+    Sorted tokens let report.js answer prefix queries by binary search."""
+    index = {}
+    for row_id, tokens in enumerate(token_lists):
+        for token in tokens:
+            index.setdefault(token, []).append(row_id)
+    tokens = sorted(index)
+    postings = []
+    for token in tokens:
+        ids = index[token]
+        postings.append([ids[0]] + [b - a for a, b in zip(ids, ids[1:])])
+    return json.dumps({"tokens": tokens, "postings": postings},
+                      ensure_ascii=False, separators=(",", ":"))
+
+
+def _filter_index_json(facet_lists):
+    """Bitsets for the table's filter chips (facet_lists[i] = (status,
+    department) of row i) as JSON: {"status": {value: [row count, bits]},
+    "department": {...}}.  Bit i (little-endian, byte i >> 3) is set for
+    the rows with that value; each set is padded to whole 32-bit words
+    and base64-encoded, so report.js filters with word-wide AND/OR."""
+    size = (len(facet_lists) + 31) // 32 * 4
+    facets = ({}, {})
+    for row_id, values in enumerate(facet_lists):
+        for facet, value in zip(facets, values):
+            bits = facet.get(value)
+            if bits is None:
+                bits = facet[value] = [0, bytearray(size)]
+            bits[0] += 1
+            bits[1][row_id >> 3] |= 1 << (row_id & 7)
+    order = list(REPORT_STATUS_PRIORITY)
+    statuses = sorted(facets[0], key=lambda s: (order.index(s) if s in order
+                                                else len(order), s))
+    departments = sorted(facets[1], key=lambda n: (n == '', n.lower()))
+
+    def packed(facet, values):
+        return {v: [facet[v][0], base64.b64encode(facet[v][1]).decode("ascii")]
+                for v in values}
+    return json.dumps({"status": packed(facets[0], statuses),
+                       "department": packed(facets[1], departments)},
+                      ensure_ascii=False, separators=(",", ":"))
+
+
+def _slugify(text):
+    """Lowercase *text* and collapse anything but letters/digits to '-'."""
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def _department_slugs(departments, previous=None):
+    """Map each department name to a unique file name stem under dept/.
+
+    *previous* is the {name: slug} map from the last report's manifest;
+    every name in it keeps its slug, even if the department is gone for a
+    while, so a URL never moves to a different department.  New names that
+    slugify alike ("Bath & Kitchen", "Bath-Kitchen") or to one of the fixed
+    pages there (index, penny-statuses) get the next free -2, -3, ...
+    suffix.  Returns the updated map for the manifest."""
+    slugs = dict(previous or {})
+    taken = {"index", PENNY_PAGE_SLUG} | set(slugs.values())
+    for name in sorted(set(departments) - set(slugs)):
+        base = _slugify(name) or "other"
+        slug, n = base, 1
+        while slug in taken:
+            n += 1
+            slug = f"{base}-{n}"
+        taken.add(slug)
+        slugs[name] = slug
+    return slugs
+
+
+def _load_report_manifest(output_dir):
+    """The previous report's report_manifest.json, or {} if there is none."""
+    try:
+        with open(os.path.join(output_dir, REPORT_MANIFEST_FILENAME),
+                  "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_report_assets(output_dir):
+    """Write the shared CSS/JS under assets/ as <stem>.<hash>.<ext> and
+    return {name: relative path}.
+
+    Every report page links the same files, so browsers download them
+    once, and a file's name only changes when its code does.  Files from
+    older reports are deleted, except the previous report's set (from
+    report_manifest.json), which pages still open in a browser may load."""
+    assets_dir = os.path.join(output_dir, REPORT_ASSETS_DIR)
+    os.makedirs(assets_dir, exist_ok=True)
+    keep = set(_load_report_manifest(output_dir).get("assets", {}).values())
+    paths = {}
+    for name, content in (("report.css", _REPORT_CSS),
+                          ("report.js", _REPORT_JS),
+                          ("scanner.js", _SCANNER_JS),
+                          ("ocr-preprocess.js", _OCR_PREPROCESS_JS)):
+        stem, ext = os.path.splitext(name)
+        version = hashlib.sha1(content.encode("utf-8")).hexdigest()[:12]
+        fname = f"{stem}.{version}{ext}"
+        if not os.path.isfile(os.path.join(assets_dir, fname)):
+            with _atomic_write(os.path.join(assets_dir, fname)) as out:
+                out.write(content)
+        paths[name] = f"{REPORT_ASSETS_DIR}/{fname}"
+    keep.update(paths.values())
+    for fname in os.listdir(assets_dir):
+        base = fname[:-3] if fname.endswith((".gz", ".br")) else fname
+        if f"{REPORT_ASSETS_DIR}/{base}" not in keep:
+            os.remove(os.path.join(assets_dir, fname))
+    return paths
+
+
+def _write_json_rows(path, rows, updated):
+    """Write a deals.json-style file from (row fragment, search tokens,
+    filter facets) tuples and return a versioned URL suffix
+    ("?v=<content hash>") for it."""
+    body = ('{"columns":' + json.dumps(DEALS_JSON_COLUMNS, separators=(",", ":"))
+            + ',"rows":[' + ",".join(frag for frag, _, _ in rows)
+            + '\n],"search":' + _search_index_json([t for _, t, _ in rows])
+            + ',"filters":' + _filter_index_json([f for _, _, f in rows])
+            + ',"updated":' + json.dumps(updated) + '}\n')
+    with _atomic_write(path) as out:
+        out.write(body)
+    return "?v=" + hashlib.sha1(body.encode("utf-8")).hexdigest()[:12]
+
+
+def _write_report_page(out, title, data_url, count, updated, assets,
+                       prefix="", nav_html="", extra_tabs="",
+                       write_extra=None, extra_scripts="", changes_url=None,
+                       base_version=None, changes_scope=""):
+    """Write one report page: header, tab bar and the HD tab, whose table
+    report.js fills from *data_url*.  *prefix* is the relative path back
+    to the report root; *write_extra(out)* writes any further tab panes.
+    With *changes_url*, the page applies that feed's rows for page
+    *changes_scope* (see _row_pages) on load, and polls it for live
+    updates, as long as it is based on report *base_version*."""
+    out.write(f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>{html.escape(title)}</title>
+<link rel="stylesheet" href="{prefix}{assets['report.css']}">
+</head><body>
+    <h2>{html.escape(title)}</h2>
+    <p class="meta">Updated: {updated}
+        <button class="reset-btn" onclick="resetSort()">Reset Sort</button>
+        {nav_html}
+        <span class="live-status" id="live-status"></span>
+    </p>
+
+    <div class="tabs">
+        <div class="tab hd active" onclick="switchTab('hd')">RebelSavings ({count})</div>
+        {extra_tabs}
+    </div>
+
+    <div id="tab-hd" class="tab-content active">
+    <input type="search" class="hd-search" id="hd-search"
+           placeholder="Search name, SKU or department" autocomplete="off">
+    <span class="search-count" id="hd-search-count"></span>
+    <div class="hd-filters" id="hd-filters"></div>
+    <div class="hd-scroll" id="hd-scroll">
+    <table class="hd-table" id="hd-table">
+    <thead><tr>
+        <th>Image</th>
+        <th onclick="sortTable(1)">Name <span class="arrow"></span></th>
+        <th onclick="sortTable(2)">SKU <span class="arrow"></span></th>
+        <th onclick="sortTable(3)">Dept <span class="arrow"></span></th>
+        <th onclick="sortTable(4)">Price <span class="arrow"></span></th>
+        <th onclick="sortTable(5)">Status <span class="arrow"></span></th>
+        <th onclick="sortTable(6)">Updated <span class="arrow"></span></th>
+        <th onclick="sortTable(7)">Added <span class="arrow"></span></th>
+        <th>Link</th>
+    </tr></thead>
+    <tbody><tr><td colspan="9" class="loading">Loading deals…</td></tr></tbody>
+    </table>
+    </div>
+    </div>""")
+    if write_extra:
+        write_extra(out)
+    out.write(f"""
+<script>const DATA_URL = {json.dumps(data_url)}, REPORT_ROOT = {json.dumps(prefix)},
+      CHANGES_URL = {json.dumps(changes_url)}, BASE_VERSION = {json.dumps(base_version)},
+      CHANGES_SCOPE = {json.dumps(changes_scope)},
+      PENNY_STATUSES = new Set({json.dumps(list(PENNY_STATUSES))});</script>
+<script src="{prefix}{assets['report.js']}"></script>
+{extra_scripts}</body></html>
+""")
+
+
+def _write_lookup_shards(output_dir, dir_name, lookup, extra=None):
+    """Write a scanner lookup ({sku: info} or {upc: sku}) as
+    <dir_name>/<digits>.<hash>.json shards keyed by the last
+    SKU_SHARD_DIGITS digits and return {shard key: relative path}.  A
+    shard whose content is unchanged keeps its filename, so browsers keep
+    it cached.  *extra* ({name: data}) is written alongside as
+    <name>.<hash>.json and returned under *name*.
+
+    Shards from older reports are deleted, except the previous report's
+    (from report_manifest.json): a page that is still open, or a shell the
+    service worker serves from its cache, looks SKUs up in those."""
+    shard_dir = os.path.join(output_dir, dir_name)
+    os.makedirs(shard_dir, exist_ok=True)
+    shards = dict(extra or {})
+    for code, info in lookup.items():
+        shards.setdefault(code[-SKU_SHARD_DIGITS:], {})[code] = info
+    paths = {}
+    for key, entries in sorted(shards.items()):
+        body = json.dumps(entries, ensure_ascii=False, sort_keys=True,
+                          separators=(",", ":"))
+        name = f"{key}.{hashlib.sha1(body.encode('utf-8')).hexdigest()[:12]}.json"
+        if not os.path.isfile(os.path.join(shard_dir, name)):
+            with _atomic_write(os.path.join(shard_dir, name)) as out:
+                out.write(body)
+        paths[key] = f"{dir_name}/{name}"
+    keep = set(paths.values())
+    keep.update(p for p in _load_report_manifest(output_dir).get("artifacts", {})
+                if p.startswith(dir_name + "/"))
+    for fname in os.listdir(shard_dir):
+        base = fname[:-3] if fname.endswith((".gz", ".br")) else fname
+        if f"{dir_name}/{base}" not in keep:
+            os.remove(os.path.join(shard_dir, fname))
+    return paths
+
+
+def _edit_distance(a, b):
+    """Levenshtein distance between two short strings, computed a column
+    at a time with bit-parallel operations (Myers 1999)."""
+    if len(a) < len(b):
+        a, b = b, a
+    m = len(b)
+    if not m:
+        return len(a)
+    peq = {}
+    for i, c in enumerate(b):
+        peq[c] = peq.get(c, 0) | (1 << i)
+    mask = (1 << m) - 1
+    top = 1 << (m - 1)
+    pv, mv, score = mask, 0, m
+    for c in a:
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & top:
+            score += 1
+        elif mh & top:
+            score -= 1
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+    return score
+
+
+def _bk_insert(tree, code):
+    """Insert *code* into a BK-tree stored as nested lists
+    [code, d1, child1, d2, child2, ...], where each child subtree holds
+    the codes at edit distance d from its parent's code."""
+    node = tree
+    while True:
+        d = _edit_distance(code, node[0])
+        if d == 0:
+            return
+        for k in range(1, len(node), 2):
+            if node[k] == d:
+                node = node[k + 1]
+                break
+        else:
+            node.extend((d, [code]))
+            return
+
+
+def _sku_bk_tree(output_dir, skus):
+    """Return a BK-tree (see _bk_insert) over *skus* for the scanner's
+    near-match suggestions.  The previous tree is reused from the cache
+    and only new SKUs are inserted; it is rebuilt when SKUs were removed.
+    Codes go in by hash order, which keeps the tree shallow."""
+    path = os.path.join(output_dir, REPORT_CACHE_DIR, SKU_TREE_CACHE_FILENAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = {}
+    codes = set(skus)
+    old = set(cached.get("codes", []))
+    if cached.get("tree") and old <= codes:
+        tree, new = cached["tree"], codes - old
+    else:
+        tree, new = None, codes
+    if not new and tree is not None:
+        return tree
+    for code in sorted(new, key=lambda c: hashlib.sha1(c.encode("utf-8")).digest()):
+        if tree is None:
+            tree = [code]
+        else:
+            _bk_insert(tree, code)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _atomic_write(path) as out:
+        out.write(json.dumps({"codes": sorted(codes), "tree": tree},
+                             separators=(",", ":")))
+    return tree
+
+
+def normalize_upc(code):
+    """Return *code* as a 12-digit UPC-A if it is a valid UPC-A or an
+    EAN-13 with a leading 0 (the same code), else None."""
+    code = re.sub(r'\D', '', code or '')
+    if len(code) == 13 and code.startswith('0'):
+        code = code[1:]
+    if len(code) != 12:
+        return None
+    # GTIN check digit: weights 3,1,3,... from the left for 11 digits
+    total = sum(int(c) * (3 if i % 2 == 0 else 1) for i, c in enumerate(code[:11]))
+    return code if (10 - total % 10) % 10 == int(code[11]) else None
+
+
+def _load_upc_map(output_dir, fb_deals=()):
+    """Return {upc: sku} from upc_skus.tsv (HD pages; later lines win),
+    filling gaps from FB posts that name exactly one SKU and one UPC."""
+    upc_map = {}
+    for deal in fb_deals:
+        skus = [x.strip() for x in deal.get("skus", "").split(",") if x.strip()]
+        upcs = [x.strip() for x in deal.get("upcs", "").split(",") if x.strip()]
+        upc = normalize_upc(upcs[0]) if len(upcs) == 1 else None
+        if upc and len(skus) == 1:
+            upc_map[upc] = skus[0]
+    path = os.path.join(output_dir, UPC_MAP_FILENAME)
+    if os.path.isfile(path):
+        with open(path, "r", encoding="utf-8") as f:
+            f.readline()  # skip header
+            for line in f:
+                parts = line.rstrip("\n").split("\t")
+                if len(parts) >= 2 and normalize_upc(parts[0]) and parts[1]:
+                    upc_map[normalize_upc(parts[0])] = parts[1]
+    return upc_map
+
+
+def record_upc_sku(path, upc, sku, source):
+    """Append one UPC -> SKU pair to upc_skus.tsv (created with a header)."""
+    new_file = not os.path.isfile(path)
+    with open(path, "a", encoding="utf-8") as f:
+        if new_file:
+            f.write("upc\tsku\tsource\tupdated_at\n")
+        ts = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
+        f.write(f"{upc}\t{sku}\t{source}\t{ts}\n")
+
+
+def _write_service_worker(output_dir, precache, thumbs):
+    """Write sw.js with its precache list (paths relative to the report
+    root) and thumbnail list.  REPORT_VERSION hashes the precached files'
+    content, so sw.js changes -- and browsers swap caches -- exactly when
+    the report does."""
+    digest = hashlib.sha1()
+    for url in precache:
+        with open(os.path.join(output_dir, url.split("?")[0]), "rb") as f:
+            digest.update(url.encode("utf-8") + b"\0" + f.read())
+    version = digest.hexdigest()[:12]
+    with _atomic_write(os.path.join(output_dir, REPORT_SW_FILENAME)) as out:
+        out.write(f"const REPORT_VERSION = {json.dumps(version)};\n"
+                  f"const PRECACHE = {json.dumps(precache)};\n"
+                  f"const THUMBS = {json.dumps(sorted(thumbs))};\n")
+        out.write(_SERVICE_WORKER_JS)
+    return version
+
+
+def _write_department_index(path, departments, penny_count, updated, assets):
+    """Write dept/index.html: one line per department page with counts."""
+    rows = "".join(
+        f"""
+        <tr><td><a href="{slug}.html">{html.escape(name)}</a></td>
+            <td>{count}</td><td class="penny_new">{pennies}</td></tr>"""
+        for slug, (name, count, pennies) in sorted(
+            departments.items(), key=lambda kv: (kv[0] == "other", kv[0])))
+    with _atomic_write(path) as out:
+        out.write(f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
+<title>Penny Deal Tracker — Departments</title>
+<link rel="stylesheet" href="../{assets['report.css']}">
+</head><body>
+    <h2>Departments</h2>
+    <p class="meta">Updated: {updated} &nbsp;|&nbsp; <a href="../index.html">All items</a>
+        &nbsp;|&nbsp; <a href="{PENNY_PAGE_SLUG}.html">Penny statuses only ({penny_count})</a></p>
+    <table class="dept-index">
+    <thead><tr><th>Department</th><th>Items</th><th>Penny</th></tr></thead>
+    <tbody>{rows}
+    </tbody>
+    </table>
+</body></html>
+""")
+
+
+_PENNY_MOBILE_CSS = (
+    "body{font:15px Arial,sans-serif;margin:0;padding:8px;background:#f0f2f5}"
+    "h2{margin:4px 0}p{margin:4px 0 8px;color:#666;font-size:13px}"
+    "ul{list-style:none;margin:0;padding:0}"
+    "li{display:flex;gap:8px;align-items:center;background:#fff;"
+    "margin-bottom:4px;padding:6px;border-radius:6px}"
+    "li img{width:56px;height:56px;object-fit:contain;flex:none}"
+    "li a{color:#222;display:block;text-decoration:none}small{color:#666}"
+    ".penny_new{color:#27ae60}.penny{color:#3498db}.penny_candidate{color:#f39c12}"
+    "b{font-size:13px}")
+
+
+def _write_penny_mobile_page(path, deals, updated, budget_kb):
+    """Write penny.html: a script-free list of *deals* (already filtered
+    to PENNY_STATUSES) with thumbnail, SKU and department, for phones.
+
+    Rows are ordered PENNY_NEW, PENNY, PENNY_CANDIDATE; when the gzipped
+    page would exceed *budget_kb*, rows are dropped from the end and a
+    note links to the full report."""
+    deals = sorted(deals, key=lambda d: PENNY_STATUSES.index(d['hd_status']))
+    items = []
+    for d in deals:
+        url = d.get('url', '') or ''
+        sku = d.get('sku', '') or (extract_sku_from_url(url) if url else '')
+        status = d['hd_status']
+        src = d.get('image', '') or ''
+        if src and not re.match(r'[a-z]+:', src, re.I):
+            hi = re.sub(r'-70\.(webp|jpg)$', r'-140.\1', src)
+            img = (f'<img src="{html.escape(src)}" srcset="{html.escape(hi)} 2x"'
+                   ' loading="lazy" alt="">')
+        elif src:
+            img = f'<img src="{html.escape(src)}" loading="lazy" alt="">'
+        else:
+            img = '<img alt="">'
+        department = d.get('department', '') or ''
+        items.append(
+            f'\n<li>{img}<div><a href="{html.escape(url or "#")}">'
+            f'{html.escape(d.get("name", "") or "Unknown")}</a>'
+            f'<b class="{status}">{status.upper().replace("_", " ")}</b> '
+            f'<small>SKU {html.escape(sku or "?")}'
+            f'{" · " + html.escape(department) if department else ""}</small>'
+            f'</div></li>')
+
+    def page(n):
+        more = (f'<p>{len(items) - n} more on the '
+                f'<a href="index.html">full report</a>.</p>'
+                if n < len(items) else '')
+        return (f'<!DOCTYPE html>\n<html><head><meta charset="utf-8">'
+                f'<meta name="viewport" content="width=device-width, initial-scale=1">'
+                f'<title>Penny items</title><style>{_PENNY_MOBILE_CSS}</style>'
+                f'</head><body><h2>Penny items ({len(items)})</h2>'
+                f'<p>Updated: {updated} · <a href="index.html">Full report</a></p>'
+                f'<ul>{"".join(items[:n])}\n</ul>{more}</body></html>\n')
+
+    def fits(n):
+        return len(gzip.compress(page(n).encode("utf-8"))) <= budget_kb * 1024
+
+    # Largest row count that fits the budget (binary search on the prefix)
+    count = len(items)
+    if not fits(count):
+        lo, hi = 0, count - 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if fits(mid):
+                lo = mid
+            else:
+                hi = mid - 1
+        count = lo
+        print(f"   {PENNY_MOBILE_FILENAME}: {len(items) - count} of "
+              f"{len(items)} rows dropped to stay under {budget_kb} KB gzip")
+    with _atomic_write(path) as out:
+        out.write(page(count))
+
+
+def _compress_report_artifacts(output_dir, artifacts, size_budgets=None,
+                               assets=None, dept_slugs=None):
+    """Write max-compression .gz (and .br, if brotli is installed) siblings
+    for each artifact, record sizes in report_manifest.json and check them
+    against the gzip size budgets.  Unchanged artifacts (same SHA-1 as in
+    the previous manifest) are not recompressed; the others are compressed
+    on COMPRESS_WORKERS threads.  *assets* ({name: fingerprinted path}) and
+    *dept_slugs* ({department: dept/ file stem}) are recorded in the
+    manifest as well.
+
+    Returns a list of "path: N KB gzip > budget M KB" strings."""
+    budgets = REPORT_SIZE_BUDGETS_KB if size_budgets is None else size_budgets
+    manifest_path = os.path.join(output_dir, REPORT_MANIFEST_FILENAME)
+    previous = _load_report_manifest(output_dir).get("artifacts", {})
+
+    def compress(rel_path):
+        path = os.path.join(output_dir, rel_path)
+        with open(path, "rb") as f:
+            data = f.read()
+        sha1 = hashlib.sha1(data).hexdigest()
+        entry = previous.get(rel_path, {})
+        if (entry.get("sha1") == sha1 and os.path.isfile(path + ".gz")
+                and (not HAS_BROTLI or os.path.isfile(path + ".br"))):
+            return entry
+        # mtime=0 keeps the .gz byte-identical when the content is
+        # unchanged, so it doesn't show up as a new git diff.
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        with open(path + ".gz", "wb") as f:
+            f.write(gz)
+        entry = {"sha1": sha1, "bytes": len(data), "gzip": len(gz), "br": None}
+        if HAS_BROTLI:
+            br = brotli.compress(data, quality=11)
+            with open(path + ".br", "wb") as f:
+                f.write(br)
+            entry["br"] = len(br)
+        return entry
+
+    with ThreadPoolExecutor(max_workers=COMPRESS_WORKERS) as pool:
+        entries = dict(zip(artifacts, pool.map(compress, artifacts)))
+    over_budget = []
+    for rel_path, entry in entries.items():
+        budget_kb = next((kb for pattern, kb in budgets.items()
+                          if fnmatch.fnmatch(rel_path, pattern)), None)
+        if budget_kb is not None and entry["gzip"] > budget_kb * 1024:
+            over_budget.append(f"{rel_path}: {entry['gzip'] / 1024:.1f} KB gzip "
+                               f"> budget {budget_kb} KB")
+
+    with _atomic_write(manifest_path) as out:
+        json.dump({"budgets_kb": budgets, "assets": assets or {},
+                   "dept_slugs": dept_slugs or {}, "artifacts": entries},
+                  out, indent=1)
+    total_gz = sum(e["gzip"] for e in entries.values())
+    print(f"Compressed {len(entries)} report artifacts "
+          f"({total_gz / 1024:.0f} KB gzip total"
+          f"{'' if HAS_BROTLI else '; brotli not installed, .br skipped'}).")
+    for msg in over_budget:
+        print(f"   !!! Over size budget: {msg}")
+    return over_budget
+
+
+def _make_thumbnails(url, thumb_dir, ext):
+    """Download *url* and write its THUMB_SIZES thumbnails to *thumb_dir*.
+    Returns the smallest thumbnail's filename, or None on failure."""
+    try:
+        resp = requests.get(url, timeout=15,
+                            headers={"User-Agent": random.choice(_USER_AGENTS)})
+        resp.raise_for_status()
+        data = resp.content
+        base = hashlib.sha1(data).hexdigest()[:16]
+        names = [f"{base}-{size}.{ext}" for size in THUMB_SIZES]
+        if all(os.path.isfile(os.path.join(thumb_dir, n)) for n in names):
+            return names[0]
+        img = Image.open(io.BytesIO(data)).convert("RGB")
+        for size, name in zip(THUMB_SIZES, names):
+            thumb = img.copy()
+            thumb.thumbnail((size, size), Image.LANCZOS)
+            path = os.path.join(thumb_dir, name)
+            if ext == "webp":
+                thumb.save(path + ".tmp", "WEBP", quality=80, method=6)
+            else:
+                thumb.save(path + ".tmp", "JPEG", quality=82, optimize=True,
+                           progressive=True)
+            os.replace(path + ".tmp", path)
+        return names[0]
+    except Exception as e:
+        logging.debug("Thumbnail failed for %s: %s", url, e)
+        return None
+
+
+def _build_thumbnails(deals, output_dir):
+    """Make sure every deal image has local thumbnails under thumbs/ and
+    return {image url: "thumbs/<hash>-70.<ext>"}.
+
+    Only URLs not seen before (or whose last download failed more than
+    THUMB_RETRY_HOURS ago) are fetched.  Thumbnails no longer used by any
+    deal are deleted.  Without Pillow, returns {} and rows keep the
+    hotlinked images."""
+    if not HAS_PIL:
+        print("Pillow not installed — report keeps full-size image URLs.")
+        return {}
+    ext = "webp" if pil_features.check("webp") else "jpg"
+    thumb_dir = os.path.join(output_dir, REPORT_THUMB_DIR)
+    cache_path = os.path.join(output_dir, REPORT_CACHE_DIR, THUMB_CACHE_FILENAME)
+    os.makedirs(thumb_dir, exist_ok=True)
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+
+    urls = {d.get('image', '') for d in deals}
+    urls = {u for u in urls if u.startswith(("http://", "https://"))}
+    now = time.time()
+    todo = []
+    for url in urls:
+        entry = cache.get(url)
+        if entry and entry.get("thumb"):
+            if (os.path.isfile(os.path.join(thumb_dir, entry["thumb"]))
+                    and entry["thumb"].endswith("." + ext)):
+                continue
+        elif entry and now - entry.get("at", 0) < THUMB_RETRY_HOURS * 3600:
+            continue
+        todo.append(url)
+
+    if todo:
+        print(f"Making thumbnails for {len(todo)} images...")
+        with ThreadPoolExecutor(max_workers=THUMB_WORKERS) as pool:
+            for url, thumb in zip(todo, pool.map(
+                    lambda u: _make_thumbnails(u, thumb_dir, ext), todo)):
+                cache[url] = {"thumb": thumb, "at": now}
+
+    cache = {url: entry for url, entry in cache.items() if url in urls}
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with _atomic_write(cache_path) as out:
+        json.dump(cache, out, indent=1)
+
+    # Drop thumbnails no deal uses any more (all sizes share the base name)
+    keep = {e["thumb"].rsplit("-", 1)[0] for e in cache.values() if e.get("thumb")}
+    for fname in os.listdir(thumb_dir):
+        if fname.rsplit("-", 1)[0] not in keep:
+            os.remove(os.path.join(thumb_dir, fname))
+
+    thumbs = {url: f"{REPORT_THUMB_DIR}/{e['thumb']}"
+              for url, e in cache.items() if e.get("thumb")}
+    failed = len(urls) - len(thumbs)
+    print(f"Thumbnails: {len(thumbs)} images"
+          f"{f', {failed} unavailable (hotlinked)' if failed else ''}.")
+    return thumbs
+
+
+def _load_phase2_runs(output_dir):
+    """Return (runs, first_penny) from phase2_log.tsv: runs holds
+    [started, items queued, items checked, blocked] per Phase 2 run, and
+    first_penny maps an HD URL to the time a check first found it at $0.01.
+
+    The log is append-only, so the parsed result is cached with the byte
+    offset read so far and later calls parse only the new lines (or start
+    over if the file shrank)."""
+    log_path = os.path.join(output_dir, PHASE2_LOG_FILENAME)
+    cache_path = os.path.join(output_dir, REPORT_CACHE_DIR,
+                              PHASE2_LOG_CACHE_FILENAME)
+    try:
+        size = os.path.getsize(log_path)
+    except OSError:
+        return [], {}
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        cache = {}
+    offset = cache.get("offset", 0)
+    if offset > size:
+        cache, offset = {}, 0
+    runs = cache.get("runs", [])
+    first_penny = cache.get("first_penny", {})
+    if offset == size:
+        return runs, first_penny
+
+    with open(log_path, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b"\n") + 1    # a half-written last line waits for next time
+    for line in data[:end].decode("utf-8", "replace").splitlines():
+        if line.startswith("# Phase 2 started:"):
+            m = re.match(r'# Phase 2 started: (.*?) \| (\d+) items', line)
+            runs.append([m.group(1), int(m.group(2)), 0, 0] if m
+                        else ["", 0, 0, 0])
+            continue
+        fields = line.split("\t")
+        if len(fields) < 6 or fields[0] == "timestamp" or not runs:
+            continue
+        status, url = fields[4], fields[-1]
+        runs[-1][2] += 1
+        runs[-1][3] += status == HDStatus.BLOCKED
+        if status in PENNY_PRICE_STATUSES and url not in first_penny:
+            first_penny[url] = fields[0]
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    with _atomic_write(cache_path) as out:
+        json.dump({"offset": offset + end, "runs": runs,
+                   "first_penny": first_penny}, out, separators=(",", ":"))
+    return runs, first_penny
+
+
+def _dashboard_tally(stats, d, first_penny, added_epoch, updated_epoch):
+    """Add deal *d* to the summary-tab aggregates in *stats* (see
+    _dashboard_json).  The day an item became a penny is its first
+    $0.01 check in phase2_log.tsv, else updated_at for a current one.
+    *added_epoch* / *updated_epoch* are the row's cached deals.json sort
+    keys for original_timestamp / updated_at."""
+    status = d.get('hd_status', '') or 'unchecked'
+    by_status = stats["counts"].setdefault(
+        d.get('department', '') or "No department", {})
+    by_status[status] = by_status.get(status, 0) + 1
+    penny_at = first_penny.get(d.get('url', ''))
+    if penny_at:
+        penny_epoch = _timestamp_epoch(penny_at)
+    elif status in PENNY_PRICE_STATUSES:
+        penny_at, penny_epoch = d.get('updated_at', ''), updated_epoch
+    if not penny_at:
+        return
+    day = penny_at[:10]
+    stats["per_day"][day] = stats["per_day"].get(day, 0) + 1
+    if penny_epoch is not None and added_epoch is not None:
+        stats["days_sum"] += max(penny_epoch - added_epoch, 0) / 86400
+        stats["days_n"] += 1
+
+
+def _dashboard_json(stats, runs, now):
+    """Summary-tab JSON from _dashboard_tally's *stats* and
+    _load_phase2_runs' *runs*, escaped for an inline <script>."""
+    order = list(REPORT_STATUS_PRIORITY)
+    statuses = sorted({s for c in stats["counts"].values() for s in c},
+                      key=lambda s: (order.index(s) if s in order else len(order), s))
+    departments = sorted(stats["counts"],
+                         key=lambda n: (n == "No department", n.lower()))
+    since = (now - datetime.timedelta(days=DASHBOARD_DAYS - 1)).strftime("%Y-%m-%d")
+    return json.dumps({
+        "statuses": statuses,
+        "counts": [[dept] + [stats["counts"][dept].get(s, 0) for s in statuses]
+                   for dept in departments],
+        "pennies_per_day": sorted((day, n) for day, n in stats["per_day"].items()
+                                  if day >= since),
+        "days_to_penny": (round(stats["days_sum"] / stats["days_n"], 1)
+                          if stats["days_n"] else None),
+        "days_to_penny_n": stats["days_n"],
+        "runs": runs[-DASHBOARD_RUNS:],
+    }, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+
+def write_changes_feed(output_dir, deals):
+    """Rewrite changes.json with every deal that differs from the base
+    report (see _update_changes_feed), so pages open during Phase 2 can
+    patch them in place.  Returns True if the feed changed; False also
+    when there is no base report to compare against yet."""
+    base = _load_report_base(output_dir)
+    if base is None:
+        return False
+    try:
+        with open(os.path.join(output_dir, REPORT_CACHE_DIR, THUMB_CACHE_FILENAME),
+                  "r", encoding="utf-8") as f:
+            thumbs = {url: f"{REPORT_THUMB_DIR}/{e['thumb']}"
+                      for url, e in json.load(f).items() if e.get("thumb")}
+    except (OSError, ValueError):
+        thumbs = {}
+    rows, _, _ = _report_rows(deals, output_dir, thumbs)
+    dept_slugs = _department_slugs(
+        {d.get('department', '') or '' for _, _, d in rows},
+        _load_report_manifest(output_dir).get("dept_slugs"))
+    delta = _report_delta(rows, base, dept_slugs)
+    if delta is None or not _update_changes_feed(
+            output_dir, base["id"], delta,
+            datetime.datetime.now().strftime("%Y-%m-%d %H:%M")):
+        return False
+    print(f"Live feed: {len(delta[0])} changed and {len(delta[1])} dropped rows")
+    return True
+
+
+def _update_changes_feed(output_dir, base_id, delta, updated):
+    """Write changes.json for the base report *base_id* from
+    _report_delta's *delta* (None: the base was just written, so nothing
+    has changed since).
+
+    The feed is {"version", "base", "columns", "rows": [[version, row,
+    anchors]], "dropped": [row keys], "updated"}.  It always lists every
+    change since the base, so a page rebuilds its rows from the base plus
+    the whole feed, and a row changed back to its base value simply drops
+    out of it.  Each row keeps the version it first appeared in (pages
+    highlight rows newer than the feed they loaded with); the version
+    only goes up, whenever the feed changes.  Returns True if it did."""
+    path = os.path.join(output_dir, CHANGES_FILENAME)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            feed = json.load(f)
+    except (OSError, ValueError):
+        feed = {}
+    changed, dropped = delta or ([], [])
+    same_base = feed.get("base") == base_id
+    seen = {}
+    if same_base:
+        seen = {json.dumps(row, ensure_ascii=False, separators=(",", ":")): v
+                for v, row, _ in feed.get("rows", [])}
+    version = feed.get("version", 0) + 1
+    rows = []
+    for fragment, anchors in changed:
+        row_json = fragment.lstrip()
+        rows.append([seen.get(row_json, version), json.loads(row_json), anchors])
+    if same_base and rows == feed.get("rows") and dropped == feed.get("dropped"):
+        return False
+    with _atomic_write(path) as out:
+        out.write(json.dumps({"version": version, "base": base_id,
+                              "columns": DEALS_JSON_COLUMNS, "rows": rows,
+                              "dropped": dropped, "updated": updated},
+                             ensure_ascii=False, separators=(",", ":")))
+    return True
+
+
+def generate_html_report(deals, output_path, size_budgets=None,
+                         thumbnails=True):
+    """Writes the report: deals.json with one compact row per deal, and a
+    static index.html shell that fetches it and renders only the visible
+    rows.  The shell also carries the Facebook group deals tab (when
+    fb_deals.tsv exists) and the SKU scanner tab.
+
+    The same pass shards the rows by department into dept/<slug>.html +
+    .json (plus a penny-statuses-only page and a dept/index.html of
+    counts); all pages share the CSS/JS under assets/.  Row fragments are
+    cached by content hash under .report_cache/, so a rerun only renders
+    the rows that changed since the last report.  While fewer than
+    REPORT_REBASE_FRACTION of the rows differ from the last full report
+    (the base), deals.json and the shards are kept and only the changed
+    rows are written, to changes.json (see _report_delta).
+
+    Product images point at local thumbnails under thumbs/ (see
+    _build_thumbnails) unless *thumbnails* is False.
+
+    Every artifact then gets .gz/.br siblings and an entry in
+    report_manifest.json.  Returns the list of artifacts over their size
+    budget (*size_budgets*, default REPORT_SIZE_BUDGETS_KB)."""
     print(f"Generating HTML report with {len(deals)} items → {output_path}")
 
-    # --- DEFAULT SORT ---
-    # Primary: penny & OOS first (by latest updated_at desc),
-    # then blocked/failed, clearance, everything else
-    status_priority = {
-        'penny_new': 0,
-        'penny': 0,
-        'penny_old': 0,
-        'out_of_stock': 0,
-        'blocked': 1,
-        'failure': 2,
-        'error': 3,
-        'clearance': 4,
-        'penny_candidate': 5,
-        'not_penny': 6,
-        'unchecked': 7,
-    }
-
-    def _sort_key(d):
-        s = d.get('hd_status', '') or 'unchecked'
-        pri = status_priority.get(s, 99)
-        # Within same priority, sort by updated_at descending (newest first)
-        updated = d.get('updated_at', '') or ''
-        # Invert for descending: use a large string minus the timestamp
-        return (pri, updated == '', updated)
-
-    deals_sorted = sorted(deals, key=_sort_key)
-    # Reverse updated_at within each priority group (newest first)
-    # We do this by sorting with a tuple that puts newest first
-    def _sort_key_final(d):
-        s = d.get('hd_status', '') or 'unchecked'
-        pri = status_priority.get(s, 99)
-        updated = d.get('updated_at', '') or '0000'
-        # Negate by using reverse string trick — just use negative approach
-        return (pri, updated)
-
-    # Sort: priority asc, then department asc, then updated_at desc within group
-    from itertools import groupby
-    final_order = []
-    deals_sorted = sorted(deals, key=lambda d: status_priority.get(
-        d.get('hd_status', '') or 'unchecked', 99))
-    for _, group in groupby(deals_sorted, key=lambda d: status_priority.get(
-            d.get('hd_status', '') or 'unchecked', 99)):
-        group_list = list(group)
-        # Secondary: group by department (items with a department first,
-        # empty department last, each department alphabetical).
-        # Tertiary: newest updated_at first within the same department.
-        group_list.sort(
-            key=lambda d: (
-                (d.get('department', '') or '') == '',   # empty depts last
-                (d.get('department', '') or '').lower(),  # dept alphabetical
-                # invert updated_at for desc by using reverse on a str key
-            )
-        )
-        # Stable-sort by updated_at desc within each department bucket.
-        reordered = []
-        for _dept, dept_group in groupby(
-                group_list,
-                key=lambda d: (d.get('department', '') or '').lower()):
-            dg = list(dept_group)
-            dg.sort(key=lambda d: d.get('updated_at', '') or '', reverse=True)
-            reordered.extend(dg)
-        final_order.extend(reordered)
-    deals = final_order
-
-    # Load FB deals
     output_dir = os.path.dirname(output_path) or "."
-    fb_deals = _load_fb_deals(output_dir)
-    has_fb = len(fb_deals) > 0
-
-    now_str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M")
-
-    # --- Build rows with sort index ---
-    rows_html = ""
-    for idx, d in enumerate(deals):
-        status = d.get('hd_status', 'unchecked') or 'unchecked'
-        image_src = d.get('image', '')
-        name = d.get('name', 'Unknown')
-        price = d.get('price', 'N/A')
-        url = d.get('url', '#')
-        updated = d.get('updated_at', '')
-        added = d.get('original_timestamp', '')
-        # Prefer the Store SKU read from the HD product page;
-        # fall back to Internet # parsed from the URL.
-        sku = d.get('sku', '') or (extract_sku_from_url(url) if url and url != '#' else '')
-        department = d.get('department', '') or ''
-
-        rows_html += f"""<tr data-idx="{idx}">
-            <td><img src="{image_src}" loading="lazy"></td>
-            <td>{name}</td>
-            <td class="sku">{sku}</td>
-            <td class="dept">{department}</td>
-            <td>{price}</td>
-            <td class="{status}">{status.upper()}</td>
-            <td>{updated}</td>
-            <td>{added}</td>
-            <td><a href="{url}" target="_blank">Link</a></td>
-        </tr>"""
-
-    # --- Build penny SKU lookup for the scanner tab ---
-    import json as _json
-    penny_skus = {}
-    for d in deals:
-        status = d.get('hd_status', '') or ''
-        url = d.get('url', '')
-        if not url or 'homedepot.com' not in url:
-            continue
-        # Use Store SKU if available, otherwise fall back to Internet # from URL
-        sku = d.get('sku', '') or extract_sku_from_url(url)
-        if not sku:
-            continue
-        penny_skus[sku] = {
-            "name": d.get('name', '')[:80],
-            "status": status,
-            "url": url,
-        }
-    penny_skus_json = _json.dumps(penny_skus)
-
-    html = f"""<!DOCTYPE html>
-<html><head><meta charset="utf-8"><meta name="viewport" content="width=device-width, initial-scale=1">
-<title>Penny Deal Tracker</title>
-<style>
-    body {{ font-family: Arial, sans-serif; background: #f0f2f5; padding: 20px; }}
-    h2 {{ color: #333; margin-bottom: 5px; }}
-    .tabs {{ display: flex; gap: 0; margin-bottom: 0; }}
-    .tab {{ padding: 12px 24px; cursor: pointer; border: 1px solid #ddd;
-            border-bottom: none; border-radius: 8px 8px 0 0; background: #e8e8e8;
-            font-weight: bold; font-size: 15px; color: #555; user-select: none; }}
-    .tab:hover {{ background: #f5f5f5; }}
-    .tab.active {{ background: white; color: #333; border-bottom: 2px solid white;
-                   margin-bottom: -1px; position: relative; z-index: 1; }}
-    .tab.hd.active {{ color: #f96302; }}
-    .tab.fb.active {{ color: #1877f2; }}
-    .tab-content {{ display: none; border: 1px solid #ddd; border-radius: 0 8px 8px 8px;
-                    background: white; padding: 0; }}
-    .tab-content.active {{ display: block; }}
-    table {{ width: 100%; border-collapse: collapse; background: white; }}
-    th, td {{ padding: 10px 12px; border: 1px solid #eee; text-align: left; vertical-align: middle; }}
-    th {{ color: white; font-weight: bold; position: sticky; top: 0; z-index: 2; }}
-    .hd-table th {{ background: #f96302; cursor: pointer; user-select: none; }}
-    .hd-table th:hover {{ background: #e05800; }}
-    .hd-table th .arrow {{ font-size: 10px; margin-left: 4px; }}
-    .fb-table th {{ background: #1877f2; }}
-    tr:nth-child(even) {{ background-color: #f9f9f9; }}
-    img {{ width: 70px; height: auto; border-radius: 4px; object-fit: cover; }}
-    .penny_new {{ color: #27ae60; font-weight: bold; }}
-    .penny {{ color: #3498db; font-weight: bold; }}
-    .penny_old {{ color: #7f8c8d; font-weight: bold; font-style: italic; }}
-    .not_penny {{ color: #e74c3c; font-weight: bold; }}
-    .penny_candidate {{ color: #f39c12; font-weight: bold; }}
-    .clearance {{ color: #2ecc71; font-weight: bold; }}
-    .error {{ color: #8e44ad; font-weight: bold; }}
-    .failure {{ color: #95a5a6; font-style: italic; }}
-    .out_of_stock {{ color: #7f8c8d; font-weight: bold; font-style: italic; }}
-    .blocked {{ color: #c0392b; font-weight: bold; text-decoration: underline; }}
-    .unchecked {{ color: #3498db; font-style: italic; }}
-    .sku {{ font-weight: bold; color: #e67e22; }}
-    .dept {{ color: #555; font-size: 13px; }}
-    .upc {{ font-weight: bold; color: #27ae60; }}
-    .snippet {{ max-width: 300px; overflow: hidden; text-overflow: ellipsis;
-                white-space: nowrap; font-size: 13px; color: #555; }}
-    .date {{ white-space: nowrap; color: #888; }}
-    .fb-img {{ max-width: 120px; max-height: 90px; }}
-    a {{ color: #1877f2; text-decoration: none; }}
-    a:hover {{ text-decoration: underline; }}
-    .meta {{ color: #888; font-size: 13px; margin: 4px 0 12px 0; }}
-    .reset-btn {{ background: #f96302; color: white; border: none; padding: 6px 14px;
-                  border-radius: 4px; cursor: pointer; font-size: 13px; margin-left: 12px; }}
-    .reset-btn:hover {{ background: #e05800; }}
-    /* Scanner tab */
-    .scanner-container {{ max-width: 800px; margin: 0 auto; padding: 20px; }}
-    .drop-zone {{ border: 3px dashed #ccc; border-radius: 12px; padding: 40px 20px;
-                   text-align: center; cursor: pointer; transition: all 0.3s;
-                   background: #fafafa; margin-bottom: 20px; }}
-    .drop-zone:hover, .drop-zone.dragover {{ border-color: #f96302; background: #fff5ee; }}
-    .drop-zone p {{ margin: 8px 0; color: #666; }}
-    .drop-zone .icon {{ font-size: 48px; }}
-    .scanner-btn {{ background: #f96302; color: white; border: none; padding: 10px 20px;
-                     border-radius: 6px; cursor: pointer; font-size: 14px; margin: 5px; }}
-    .scanner-btn:hover {{ background: #e05800; }}
-    .scanner-btn:disabled {{ background: #ccc; cursor: not-allowed; }}
-    .scanner-preview {{ max-width: 100%; max-height: 300px; border-radius: 8px;
-                         margin: 10px 0; display: none; }}
-    .scanner-progress {{ display: none; margin: 15px 0; }}
-    .scanner-progress .bar {{ height: 6px; background: #eee; border-radius: 3px; overflow: hidden; }}
-    .scanner-progress .fill {{ height: 100%; background: #f96302; transition: width 0.3s; width: 0%; }}
-    .scanner-progress .label {{ font-size: 13px; color: #888; margin-top: 4px; }}
-    .scanner-results {{ margin-top: 20px; }}
-    .scanner-results h3 {{ margin-bottom: 10px; }}
-    .sku-result {{ padding: 12px 16px; margin: 8px 0; border-radius: 8px; border: 1px solid #eee; }}
-    .sku-result.match {{ background: #e8f5e9; border-color: #4caf50; }}
-    .sku-result.penny-match {{ background: #e3f2fd; border-color: #2196f3; }}
-    .sku-result.no-match {{ background: #fff3e0; border-color: #ff9800; }}
-    .sku-result .sku-num {{ font-weight: bold; font-size: 16px; font-family: monospace; }}
-    .sku-result .sku-status {{ font-size: 13px; margin-top: 4px; }}
-    .ocr-text {{ background: #f5f5f5; padding: 12px; border-radius: 6px; font-family: monospace;
-                  font-size: 12px; max-height: 200px; overflow-y: auto; white-space: pre-wrap;
-                  margin: 10px 0; display: none; }}
-    .toggle-link {{ color: #1877f2; cursor: pointer; font-size: 13px; }}
-</style>
-</head><body>
-    <h2>Penny Deal Tracker</h2>
-    <p class="meta">Updated: {now_str}
-        <button class="reset-btn" onclick="resetSort()">Reset Sort</button>
-    </p>
 
-    <div class="tabs">
-        <div class="tab hd active" onclick="switchTab('hd')">RebelSavings ({len(deals)})</div>
-        {('<div class="tab fb" onclick="switchTab(&#39;fb&#39;)">Facebook Group (' + str(len(fb_deals)) + ')</div>') if has_fb else ''}
-        <div class="tab scanner" onclick="switchTab('scanner')">📷 SKU Scanner</div>
-    </div>
+    # --- ROW CACHE ---
+    thumbs = _build_thumbnails(deals, output_dir) if thumbnails else {}
+    rows, used_rows, rendered = _report_rows(deals, output_dir, thumbs)
+    if rendered or len(used_rows) != len(_row_cache):
+        _save_row_cache(used_rows)
+    print(f"Rows: {len(deals) - rendered} reused from cache, {rendered} rendered")
 
-    <div id="tab-hd" class="tab-content active">
-    <table class="hd-table" id="hd-table">
-    <thead><tr>
-        <th>Image</th>
-        <th onclick="sortTable(1)">Name <span class="arrow"></span></th>
-        <th onclick="sortTable(2)">SKU <span class="arrow"></span></th>
-        <th onclick="sortTable(3)">Dept <span class="arrow"></span></th>
-        <th onclick="sortTable(4)">Price <span class="arrow"></span></th>
-        <th onclick="sortTable(5)">Status <span class="arrow"></span></th>
-        <th onclick="sortTable(6)">Updated <span class="arrow"></span></th>
-        <th onclick="sortTable(7)">Added <span class="arrow"></span></th>
-        <th>Link</th>
-    </tr></thead>
-    <tbody>
-    {rows_html}
-    </tbody>
-    </table>
-    </div>"""
-
-    # --- Facebook Tab ---
-    if has_fb:
-        fb_rows = ""
-        for deal in fb_deals:
-            images = deal.get("images", "").split(",")
-            img_html = ""
-            if images and images[0]:
-                img_html = f'<img class="fb-img" src="{images[0]}" loading="lazy">'
-
-            skus = deal.get("skus", "")
-            sku_html = ""
-            if skus:
-                for sku in skus.split(","):
-                    sku = sku.strip()
-                    if sku:
-                        hd_search = f"https://www.homedepot.com/s/{sku}"
-                        sku_html += f'<a class="sku" href="{hd_search}" target="_blank">{sku}</a><br>'
-
-            upcs = deal.get("upcs", "")
-            upc_html = ""
-            if upcs:
-                for upc_val in upcs.split(","):
-                    upc_val = upc_val.strip()
-                    if upc_val:
-                        upc_html += f'<span class="upc">{upc_val}</span><br>'
-
-            hd_links = deal.get("hd_links", "")
-            link_html = ""
-            if hd_links:
-                for link in hd_links.split(","):
-                    link = link.strip()
-                    if link and "homedepot.com" in link:
-                        link_html += f'<a href="{link}" target="_blank">View</a><br>'
-
-            snippet = deal.get("text_snippet", "")
-            date_val = deal.get("post_date", "")
-
-            fb_rows += f"""<tr>
-                <td>{img_html}</td>
-                <td>{sku_html or '—'}</td>
-                <td>{upc_html or '—'}</td>
-                <td>{link_html or '—'}</td>
-                <td class="snippet" title="{snippet}">{snippet[:100]}</td>
-                <td class="date">{date_val}</td>
-            </tr>"""
+    # Load FB deals (parsed and rendered again only when fb_deals.tsv changes)
+    fb_deals, fb_rows_html = _load_fb_tab(output_dir)
+    has_fb = len(fb_deals) > 0
 
-        html += f"""
+    now = datetime.datetime.now()
+    now_str = now.strftime("%Y-%m-%d %H:%M")
+    assets = _write_report_assets(output_dir)
+    dept_dir = os.path.join(output_dir, REPORT_DEPT_DIR)
+    os.makedirs(dept_dir, exist_ok=True)
+    dept_slugs = _department_slugs(
+        {d.get('department', '') or '' for _, _, d in rows},
+        _load_report_manifest(output_dir).get("dept_slugs"))
+    shard_cache_path = os.path.join(output_dir, REPORT_CACHE_DIR,
+                                    DEPT_SHARD_CACHE_FILENAME)
+    try:
+        with open(shard_cache_path, "r", encoding="utf-8") as f:
+            previous_shards = json.load(f)
+    except (OSError, ValueError):
+        previous_shards = {}
+
+    # --- Base report or changes ---
+    # While few rows differ from the base report, deals.json and the dept/
+    # shards (and their search/filter indexes) are left as they are and
+    # only the changed rows are written, to changes.json.
+    base = _load_report_base(output_dir)
+    delta = None
+    if base and all(slug in previous_shards for slug in base["shards"]):
+        delta = _report_delta(rows, base, dept_slugs, REPORT_REBASE_FRACTION)
+
+    # --- deals.json ---
+    # Streamed one row per line; its content hash versions the data URL
+    # so browsers never pair a new shell with a cached old data file.
+    # Each row fragment is also filed under its department shard.
+    penny_skus = {}
+    token_lists = []      # search tokens per deals.json row
+    facet_lists = []      # (status, department) per deals.json row
+    dept_fragments = {}   # slug -> [(row fragment, search tokens, facets)]
+    dept_names = {}       # slug -> display name
+    dept_pennies = {}     # slug -> penny-status row count
+    penny_fragments = []
+    penny_deals = []      # for penny.html
+    penny_digest = hashlib.sha1(str(ROW_CACHE_VERSION).encode("utf-8"))
+    phase2_runs, first_penny = _load_phase2_runs(output_dir)
+    dashboard = {"counts": {}, "per_day": {}, "days_sum": 0.0, "days_n": 0}
+    digest = hashlib.sha1()
+    with (contextlib.nullcontext() if delta else
+          _atomic_write(os.path.join(output_dir, DEALS_JSON_FILENAME))) as out:
+        if out:
+            out.write('{"columns":' + json.dumps(
+                DEALS_JSON_COLUMNS, separators=(",", ":")) + ',"rows":[')
+        for idx, (key, cached, d) in enumerate(rows):
+            row_json, sku, _, tokens, added, updated, _ = cached
+            if out:
+                fragment = ("," if idx else "") + row_json
+                out.write(fragment)
+                digest.update(fragment.encode("utf-8"))
+            token_lists.append(tokens)
+
+            department = d.get('department', '') or ''
+            facets = (d.get('hd_status', '') or 'unchecked', department)
+            facet_lists.append(facets)
+            slug = dept_slugs[department]
+            dept_names.setdefault(slug, department or "No department")
+            dept_fragments.setdefault(slug, []).append((row_json, tokens, facets))
+            is_penny = d.get('hd_status', '') in PENNY_STATUSES
+            dept_pennies[slug] = dept_pennies.get(slug, 0) + is_penny
+            if is_penny:
+                penny_fragments.append((row_json, tokens, facets))
+                penny_deals.append(d)
+                penny_digest.update(key.encode("utf-8"))
+            _dashboard_tally(dashboard, d, first_penny, added, updated)
+
+            # Penny SKU lookup for the scanner tab, built in the same pass
+            url = d.get('url', '')
+            if sku and url and 'homedepot.com' in url:
+                penny_skus[sku] = {
+                    "name": (d.get('name', '') or 'Unknown')[:80],
+                    "status": d.get('hd_status', '') or '',
+                    "url": url,
+                    "key": _deal_key(d.get('name', '')),
+                }
+        if out:
+            out.write('\n],"search":' + _search_index_json(token_lists)
+                      + ',"filters":' + _filter_index_json(facet_lists)
+                      + ',"updated":' + json.dumps(now_str) + '}\n')
+    if delta:
+        base_id = base["id"]
+        print(f"Rows: {len(delta[0])} changed and {len(delta[1])} dropped since "
+              f"the base report; deals.json and dept/ shards kept")
+    else:
+        base_id = digest.hexdigest()[:12]
+        _save_report_base(output_dir, base_id, rows,
+                          set(dept_fragments) | {PENNY_PAGE_SLUG})
+    data_url = f"{DEALS_JSON_FILENAME}?v={base_id}"
+    _update_changes_feed(output_dir, base_id, delta, now_str)
+    with open(os.path.join(output_dir, CHANGES_FILENAME), "rb") as f:
+        changes_url = f"{CHANGES_FILENAME}?v={hashlib.sha1(f.read()).hexdigest()[:12]}"
+
+    # --- Department shards ---
+    # dept/<slug>.html + dept/<slug>.json per department, plus the
+    # penny-statuses-only page and an index of counts.  Pages for
+    # departments that no longer exist are removed.  A shard whose rows
+    # are unchanged keeps its files, and its page keeps the time its data
+    # last changed, so neither is rewritten or recompressed.  With changes
+    # since the base, every base shard is kept and its page (which applies
+    # changes.json) gets the current count and time.
+    shards = {slug: (dept_names[slug], frags) for slug, frags in dept_fragments.items()}
+    shards[PENNY_PAGE_SLUG] = ("Penny statuses only", penny_fragments)
+    if delta:
+        shard_names = {slug: name or "No department" for name, slug in dept_slugs.items()}
+        shards = {slug: shards.get(slug, (shard_names.get(slug, slug), []))
+                  for slug in base["shards"]}
+    shard_state = dict(previous_shards) if delta else {}
+    written = {"index.html"}
+    for slug, (name, frags) in shards.items():
+        if delta:
+            entry = previous_shards[slug][:2] + [now_str]
+        else:
+            rows_digest = hashlib.sha1(str(ROW_CACHE_VERSION).encode("utf-8"))
+            for frag, _, _ in frags:
+                rows_digest.update(frag.encode("utf-8"))
+            entry = previous_shards.get(slug)
+            json_path = os.path.join(dept_dir, slug + ".json")
+            if not (entry and entry[0] == rows_digest.hexdigest()
+                    and os.path.isfile(json_path)):
+                entry = [rows_digest.hexdigest(),
+                         _write_json_rows(json_path, frags, now_str), now_str]
+            shard_state[slug] = entry
+        _, version, updated = entry
+        if slug == PENNY_PAGE_SLUG:
+            penny_data_url = f"{REPORT_DEPT_DIR}/{slug}.json{version}"
+        with _atomic_write(os.path.join(dept_dir, slug + ".html")) as out:
+            _write_report_page(
+                out, f"Penny Deal Tracker — {name}", f"{slug}.json{version}",
+                len(frags), updated, assets, prefix="../",
+                nav_html='<a href="index.html">Departments</a>'
+                         ' &nbsp;|&nbsp; <a href="../index.html">All items</a>',
+                changes_url=changes_url, base_version=base_id, changes_scope=slug)
+        written.update((slug + ".json", slug + ".html"))
+    _write_department_index(
+        os.path.join(dept_dir, "index.html"),
+        {slug: (dept_names[slug], len(frags), dept_pennies[slug])
+         for slug, frags in dept_fragments.items()},
+        len(penny_fragments), now_str, assets)
+    for fname in os.listdir(dept_dir):
+        base_name = fname[:-3] if fname.endswith((".gz", ".br")) else fname
+        if base_name not in written:
+            os.remove(os.path.join(dept_dir, fname))
+
+    # --- penny.html ---
+    # Rewritten only when its rows change (tracked with the shards).
+    penny_path = os.path.join(output_dir, PENNY_MOBILE_FILENAME)
+    entry = previous_shards.get(PENNY_MOBILE_FILENAME)
+    if not (entry and entry[0] == penny_digest.hexdigest()
+            and os.path.isfile(penny_path)):
+        _write_penny_mobile_page(penny_path, penny_deals, now_str,
+                                 PENNY_MOBILE_BUDGET_KB)
+        entry = [penny_digest.hexdigest(), "", now_str]
+    shard_state[PENNY_MOBILE_FILENAME] = entry
+    os.makedirs(os.path.dirname(shard_cache_path), exist_ok=True)
+    with _atomic_write(shard_cache_path) as out:
+        out.write(json.dumps(shard_state, separators=(",", ":")))
+
+    # --- index.html shell ---
+    dashboard_json = _dashboard_json(dashboard, phase2_runs, now)
+
+    def _write_extra_tabs(out):
+        # --- Facebook Tab ---
+        if has_fb:
+            out.write("""
     <div id="tab-fb" class="tab-content">
     <table class="fb-table"><tr><th>Image</th><th>SKU</th><th>UPC</th><th>HD Link</th>
         <th>Post Snippet</th><th>Date</th></tr>
-    {fb_rows}
-    </table></div>"""
+""")
+            out.write(fb_rows_html)
+            out.write("""
+    </table></div>""")
 
-    # --- Scanner Tab ---
-    html += f"""
+        # --- Scanner Tab ---
+        out.write("""
     <div id="tab-scanner" class="tab-content">
     <div class="scanner-container">
         <h3>SKU Scanner</h3>
         <p style="color:#666; margin-bottom:15px;">
             Upload a receipt, shelf tag, or price scanner photo.
-            OCR runs in your browser — nothing is uploaded to any server.
+            Barcodes are read first, OCR otherwise — all in your browser,
+            nothing is uploaded to any server.
         </p>
 
         <div class="drop-zone" id="dropZone">
             <div class="icon">📷</div>
             <p><b>Drop image here</b> or click to upload</p>
-            <p style="font-size:12px; color:#999;">Also supports Ctrl+V paste</p>
+            <p style="font-size:12px; color:#999;">Several photos at once are scanned in parallel. Also supports Ctrl+V paste</p>
         </div>
-        <input type="file" id="fileInput" accept="image/*" style="display:none;">
+        <input type="file" id="fileInput" accept="image/*" multiple style="display:none;">
         <button class="scanner-btn" id="cameraBtn" style="display:none;">📱 Use Camera</button>
         <input type="file" id="cameraInput" accept="image/*" capture="environment" style="display:none;">
+        <button class="scanner-btn" id="liveBtn" style="display:none;">🎥 Live scan</button>
+        <div class="live-wrap" id="liveWrap">
+            <div class="live-view">
+                <video id="liveVideo" playsinline muted></video>
+                <div class="live-guide" id="liveGuide"></div>
+            </div>
+            <div class="live-scan-status" id="liveStatus">Starting camera...</div>
+        </div>
+        <div class="live-hits" id="liveHits"></div>
 
-        <img id="scannerPreview" class="scanner-preview">
+        <div class="preview-wrap" id="previewWrap">
+            <img id="scannerPreview" class="scanner-preview">
+            <div class="crop-box" id="cropBox"></div>
+        </div>
+        <p class="crop-hint" id="cropHint">Drag on the photo to select just the SKU / barcode area.</p>
+        <button class="scanner-btn" id="cropScanBtn" style="display:none;">🔍 Scan selected area</button>
 
         <div class="scanner-progress" id="scannerProgress">
             <div class="bar"><div class="fill" id="progressFill"></div></div>
             <div class="label" id="progressLabel">Initializing OCR...</div>
         </div>
+        <div class="scan-timing" id="scanTiming"></div>
+        <div class="batch-list" id="batchList"></div>
 
         <div class="scanner-results" id="scannerResults"></div>
 
@@ -636,250 +3636,66 @@ def generate_html_report(deals, output_path):
         </span>
     </div>
     </div>
+""")
 
-    <script>const PENNY_SKUS = {penny_skus_json};</script>
-    """
-
-    # --- JavaScript: tab switching + column sorting ---
-    html += """
-<script>
-function switchTab(tab) {
-    document.querySelectorAll('.tab-content').forEach(el => el.classList.remove('active'));
-    document.querySelectorAll('.tab').forEach(el => el.classList.remove('active'));
-    document.getElementById('tab-' + tab).classList.add('active');
-    document.querySelector('.tab.' + tab).classList.add('active');
-}
-
-// Column sorting state
-let currentSortCol = -1;
-let currentSortDir = 0; // 0=default, 1=asc, 2=desc
-
-function sortTable(col) {
-    const table = document.getElementById('hd-table');
-    const tbody = table.querySelector('tbody');
-    const rows = Array.from(tbody.querySelectorAll('tr'));
-    const headers = table.querySelectorAll('thead th');
-
-    // Cycle: default → asc → desc → default
-    if (currentSortCol === col) {
-        currentSortDir = (currentSortDir + 1) % 3;
-    } else {
-        currentSortCol = col;
-        currentSortDir = 1; // start with asc
-    }
-
-    // Clear all arrows
-    headers.forEach(th => {
-        const arrow = th.querySelector('.arrow');
-        if (arrow) arrow.textContent = '';
-    });
-
-    if (currentSortDir === 0) {
-        // Reset to default order
-        rows.sort((a, b) => parseInt(a.dataset.idx) - parseInt(b.dataset.idx));
-        currentSortCol = -1;
-    } else {
-        const arrow = headers[col].querySelector('.arrow');
-        if (arrow) arrow.textContent = currentSortDir === 1 ? ' ▲' : ' ▼';
-
-        rows.sort((a, b) => {
-            let A = a.cells[col].textContent.trim();
-            let B = b.cells[col].textContent.trim();
-            // Try numeric comparison for price
-            let nA = parseFloat(A.replace(/[^0-9.-]/g, ''));
-            let nB = parseFloat(B.replace(/[^0-9.-]/g, ''));
-            if (!isNaN(nA) && !isNaN(nB)) {
-                return currentSortDir === 1 ? nA - nB : nB - nA;
-            }
-            // String comparison
-            let cmp = A.localeCompare(B, undefined, {numeric: true, sensitivity: 'base'});
-            return currentSortDir === 1 ? cmp : -cmp;
-        });
-    }
-
-    rows.forEach(r => tbody.appendChild(r));
-}
-
-function resetSort() {
-    currentSortCol = -1;
-    currentSortDir = 0;
-    const table = document.getElementById('hd-table');
-    const tbody = table.querySelector('tbody');
-    const rows = Array.from(tbody.querySelectorAll('tr'));
-    const headers = table.querySelectorAll('thead th');
-    headers.forEach(th => {
-        const arrow = th.querySelector('.arrow');
-        if (arrow) arrow.textContent = '';
-    });
-    rows.sort((a, b) => parseInt(a.dataset.idx) - parseInt(b.dataset.idx));
-    rows.forEach(r => tbody.appendChild(r));
-}
-</script>
-
-<!-- Tesseract.js for client-side OCR -->
-<script src="https://cdn.jsdelivr.net/npm/tesseract.js@5/dist/tesseract.min.js"></script>
-<script>
-(function() {
-    const dropZone = document.getElementById('dropZone');
-    const fileInput = document.getElementById('fileInput');
-    const cameraBtn = document.getElementById('cameraBtn');
-    const cameraInput = document.getElementById('cameraInput');
-    const preview = document.getElementById('scannerPreview');
-    const progress = document.getElementById('scannerProgress');
-    const progressFill = document.getElementById('progressFill');
-    const progressLabel = document.getElementById('progressLabel');
-    const results = document.getElementById('scannerResults');
-    const ocrTextEl = document.getElementById('ocrText');
-    const toggleOcr = document.getElementById('toggleOcr');
-
-    // Show camera button on mobile
-    if (/Mobi|Android/i.test(navigator.userAgent)) {
-        cameraBtn.style.display = 'inline-block';
-    }
-
-    // Drop zone events
-    dropZone.addEventListener('click', () => fileInput.click());
-    dropZone.addEventListener('dragover', e => {
-        e.preventDefault(); dropZone.classList.add('dragover');
-    });
-    dropZone.addEventListener('dragleave', () => dropZone.classList.remove('dragover'));
-    dropZone.addEventListener('drop', e => {
-        e.preventDefault(); dropZone.classList.remove('dragover');
-        if (e.dataTransfer.files.length) processImage(e.dataTransfer.files[0]);
-    });
-
-    fileInput.addEventListener('change', e => {
-        if (e.target.files.length) processImage(e.target.files[0]);
-    });
-
-    cameraBtn.addEventListener('click', () => cameraInput.click());
-    cameraInput.addEventListener('change', e => {
-        if (e.target.files.length) processImage(e.target.files[0]);
-    });
-
-    // Paste support
-    document.addEventListener('paste', e => {
-        const items = e.clipboardData?.items;
-        if (!items) return;
-        for (const item of items) {
-            if (item.type.startsWith('image/')) {
-                e.preventDefault();
-                processImage(item.getAsFile());
-                // Switch to scanner tab
-                switchTab('scanner');
-                return;
-            }
-        }
-    });
-
-    async function processImage(file) {
-        // Show preview
-        const url = URL.createObjectURL(file);
-        preview.src = url;
-        preview.style.display = 'block';
-
-        // Reset
-        results.innerHTML = '';
-        ocrTextEl.textContent = '';
-        ocrTextEl.style.display = 'none';
-        toggleOcr.style.display = 'none';
-        progress.style.display = 'block';
-        progressFill.style.width = '0%';
-        progressLabel.textContent = 'Loading OCR engine...';
-
-        try {
-            const { data } = await Tesseract.recognize(file, 'eng', {
-                logger: m => {
-                    if (m.status === 'recognizing text') {
-                        const pct = Math.round((m.progress || 0) * 100);
-                        progressFill.style.width = pct + '%';
-                        progressLabel.textContent = `Scanning... ${pct}%`;
-                    } else if (m.status) {
-                        progressLabel.textContent = m.status;
-                    }
-                }
-            });
-
-            progressFill.style.width = '100%';
-            progressLabel.textContent = 'Done!';
-            setTimeout(() => { progress.style.display = 'none'; }, 1500);
-
-            // Show raw OCR text
-            ocrTextEl.textContent = data.text;
-            toggleOcr.style.display = 'inline';
-
-            // Extract and check SKUs
-            analyzeText(data.text);
-
-        } catch (err) {
-            progressLabel.textContent = 'OCR failed: ' + err.message;
-            progressFill.style.width = '0%';
-        }
-    }
-
-    function analyzeText(text) {
-        // Extract potential SKUs: 6-12 digit numbers
-        const allNums = text.match(/\\b\\d{6,12}\\b/g) || [];
-        // Also look for explicit SKU/model patterns
-        const skuPattern = /(?:SKU|sku|model|Model|item|Item)[#:\\s]*(\\d{6,9})/g;
-        let m;
-        while ((m = skuPattern.exec(text)) !== null) {
-            if (!allNums.includes(m[1])) allNums.push(m[1]);
-        }
-
-        // Deduplicate
-        const skus = [...new Set(allNums)];
-
-        if (skus.length === 0) {
-            results.innerHTML = '<p style="color:#999;">No SKU numbers found in image. ' +
-                'Try a clearer photo of the receipt or shelf tag.</p>';
-            return;
-        }
-
-        let html = '<h3>Found ' + skus.length + ' potential SKU(s)</h3>';
-        let pennyCount = 0;
-
-        for (const sku of skus) {
-            const info = PENNY_SKUS[sku];
-            if (info) {
-                const isPenny = info.status.includes('penny');
-                const cssClass = isPenny ? 'penny-match' : 'match';
-                if (isPenny) pennyCount++;
-                const statusLabel = info.status.toUpperCase().replace(/_/g, ' ');
-                html += `<div class="sku-result ${cssClass}">
-                    <div class="sku-num">${isPenny ? '🎯 ' : '✅ '}${sku}</div>
-                    <div class="sku-status">
-                        <b>${info.name}</b><br>
-                        Status: <span class="${info.status}">${statusLabel}</span>
-                        &nbsp;|&nbsp; <a href="${info.url}" target="_blank">View on HD</a>
-                    </div>
-                </div>`;
-            } else {
-                html += `<div class="sku-result no-match">
-                    <div class="sku-num">❓ ${sku}</div>
-                    <div class="sku-status">Not in our tracker &nbsp;|&nbsp;
-                        <a href="https://www.homedepot.com/s/${sku}" target="_blank">Search HD</a>
-                    </div>
-                </div>`;
-            }
-        }
-
-        if (pennyCount > 0) {
-            html = `<div style="background:#e3f2fd; padding:12px 16px; border-radius:8px;
-                     margin-bottom:15px; font-size:16px;">
-                     🎯 <b>${pennyCount} penny item(s) found!</b></div>` + html;
-        }
-
-        results.innerHTML = html;
-    }
-})();
-</script>
-</body></html>"""
-
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(html)
+        # --- Summary Tab ---
+        out.write(f"""
+    <div id="tab-summary" class="tab-content">
+    <div class="dashboard" id="dashboard"></div>
+    <script type="application/json" id="dashboard-data">{dashboard_json}</script>
+    </div>
+""")
+
+    sku_shards = _write_lookup_shards(
+        output_dir, SKU_SHARD_DIR, penny_skus,
+        extra={"tree": _sku_bk_tree(output_dir, penny_skus)})
+    sku_tree_url = sku_shards.pop("tree")
+    upc_shards = _write_lookup_shards(output_dir, UPC_SHARD_DIR,
+                                      _load_upc_map(output_dir, fb_deals))
+    fb_tab = ('<div class="tab fb" onclick="switchTab(&#39;fb&#39;)">'
+              f'Facebook Group ({len(fb_deals)})</div>') if has_fb else ''
+    with _atomic_write(output_path) as out:
+        _write_report_page(
+            out, "Penny Deal Tracker", data_url, len(deals), now_str, assets,
+            nav_html=f'<a href="{REPORT_DEPT_DIR}/index.html">By department</a>'
+                     f' &nbsp;|&nbsp; <a href="{PENNY_MOBILE_FILENAME}">'
+                     f'Penny items (phone)</a>',
+            extra_tabs=fb_tab + """
+        <div class="tab scanner" onclick="switchTab('scanner')">📷 SKU Scanner</div>
+        <div class="tab summary" onclick="switchTab('summary')">📊 Summary</div>""",
+            write_extra=_write_extra_tabs, changes_url=changes_url,
+            base_version=base_id,
+            extra_scripts=f"""<script>const SKU_SHARDS = {json.dumps(sku_shards, separators=(",", ":"))}, SKU_SHARD_DIGITS = {SKU_SHARD_DIGITS},
+      SKU_TREE_URL = {json.dumps(sku_tree_url)},
+      UPC_SHARDS = {json.dumps(upc_shards, separators=(",", ":"))},
+      OCR_PREPROCESS_URL = {json.dumps(assets['ocr-preprocess.js'])};</script>
+<script src="{assets['scanner.js']}"></script>
+""")
     print(f"\nVisual report created: {output_path}")
 
+    # --- Offline cache ---
+    # The shell, its data, the penny pages and the scanner
+    # lookups are precached; other department pages are cached on visit.
+    page_path = os.path.relpath(output_path, output_dir)
+    precache = [page_path, data_url, changes_url, PENNY_MOBILE_FILENAME,
+                f"{REPORT_DEPT_DIR}/index.html",
+                f"{REPORT_DEPT_DIR}/{PENNY_PAGE_SLUG}.html", penny_data_url]
+    precache += list(assets.values())
+    precache += sorted(sku_shards.values()) + sorted(upc_shards.values())
+    precache.append(sku_tree_url)
+    _write_service_worker(output_dir, precache, set(thumbs.values()))
+
+    artifacts = [page_path, DEALS_JSON_FILENAME, REPORT_SW_FILENAME,
+                 PENNY_MOBILE_FILENAME]
+    artifacts += list(assets.values())
+    artifacts += [f"{REPORT_DEPT_DIR}/{name}" for name in sorted(written)]
+    artifacts += sorted(sku_shards.values()) + sorted(upc_shards.values())
+    artifacts.append(sku_tree_url)
+    if os.path.isfile(os.path.join(output_dir, FB_REPORT_FILENAME)):
+        artifacts.append(FB_REPORT_FILENAME)
+    return _compress_report_artifacts(output_dir, artifacts, size_budgets,
+                                      assets, dept_slugs)
+
 
 def is_within_x_days(timestamp1, timestamp2, days=3):
     if timestamp1 is None or timestamp2 is None:
@@ -949,6 +3765,26 @@ def extract_sku_from_hd_page(driver):
     return extract_sku_from_url(driver.current_url)
 
 
+def extract_upc_from_hd_page(driver):
+    """Extract the product's UPC from the current Home Depot product page.
+
+    HD embeds schema.org product data in the page source with the barcode
+    as "gtin12" (UPC-A) or "gtin13"; the spec table sometimes lists it as
+    "UPC".  Returns a 12-digit UPC-A (see normalize_upc) or None.
+    """
+    try:
+        source = driver.page_source
+        for pattern in (r'"gtin1[23]"\s*:\s*"(\d{12,13})"',
+                        r'\bUPC\b[^0-9]{0,40}(\d{12,13})'):
+            for m in re.finditer(pattern, source):
+                upc = normalize_upc(m.group(1))
+                if upc:
+                    return upc
+    except Exception:
+        pass
+    return None
+
+
 def extract_department_from_hd_page(driver):
     """Extract the product department/category from the current HD page.
 
@@ -1132,8 +3968,9 @@ def navigate_hd_via_github_pages(driver, hd_url, name=''):
     Pages report.  This gives a legitimate Referer from github.io.
     Skips if the report is stale (>10 minutes old).
 
-    Matches the row by product NAME (not the URL number) because the number
-    in the URL is the Internet #, which is unreliable for lookup.
+    Finds the row by its key, a hash of the product NAME (not the URL
+    number, which is the unreliable Internet #): the page scrolls row
+    "row-<key>" into view and the link is looked up by id.
     """
     if not name:
         return False
@@ -1148,15 +3985,24 @@ def navigate_hd_via_github_pages(driver, hd_url, name=''):
         if not _is_github_pages_fresh(driver):
             return False
 
-        # Find the table row whose text matches the product name, then click
-        # the Home Depot link inside that row.
+        # Find the item's table row, then click the Home Depot link inside it.
         wait = WebDriverWait(driver, 12)
-        # Escape quotes in the name for the XPath string literal
-        safe_name = name.replace('"', '')[:60]
-        xpath = (f"//tr[td[contains(normalize-space(.), \"{safe_name}\")]]"
-                 f"//a[contains(@href, 'homedepot.com')]")
+        key = _deal_key(name)
         try:
-            link = wait.until(EC.element_to_be_clickable((By.XPATH, xpath)))
+            # The report only renders the rows inside its scroll window,
+            # so have the page scroll the matching row into view first.
+            # This waits for deals.json to finish loading, but no longer:
+            # once it has, a missing row stays missing.
+            found = wait.until(lambda drv: drv.execute_script(
+                "const found = window.revealRowByKey"
+                "  && window.revealRowByKey(arguments[0]);"
+                "return found == null ? null : found ? 'found' : 'missing';",
+                key))
+            if found == 'missing':
+                print(f"   > '{name[:40]}' not found on GitHub Pages report")
+                return False
+            link = wait.until(EC.element_to_be_clickable(
+                (By.CSS_SELECTOR, f"#row-{key} a[href*='homedepot.com']")))
             driver.execute_script(
                 "arguments[0].scrollIntoView({block: 'center'});", link)
             time.sleep(random.uniform(0.5, 1.5))
@@ -2203,21 +5049,171 @@ def warm_up_hd_session(driver, zip_code=DEFAULT_ZIP, hd_login=False):
     return True
 
 
+def _row_crc(data):
+    """Return the "#xxxxxxxx" CRC32 tag stored at the end of a TSV record."""
+    return f"#{zlib.crc32(data.encode('utf-8')):08x}"
+
+
 def pad_row(input_list, target_char_length=ROW_SIZE, pad_char=" "):
     target_char_length -= 1
+    crc = ""
     if isinstance(input_list, dict):
-        # Ensure field order matches FIELDNAMES
-        input_list = [str(input_list.get(f, "")) for f in FIELDNAMES]
+        # Ensure field order matches FIELDNAMES.  The padding column is
+        # rebuilt here (any stale value is dropped) and ends with a CRC of
+        # the data fields — see verify_tsv() / repair_tsv().
+        input_list = [str(input_list.get(f, "")) for f in FIELDNAMES[:-1]]
+        crc = _row_crc("\t".join(input_list))
+        input_list.append("")
     tsv_string = "\t".join(str(item) for item in input_list)
-    current_len = len(tsv_string)
+    current_len = len(tsv_string) + len(crc)
 
     if current_len < target_char_length:
-        return tsv_string.ljust(target_char_length, pad_char)
+        return tsv_string.ljust(target_char_length - len(crc), pad_char) + crc
     elif current_len > target_char_length:
         # Don't truncate data fields — only trim the padding column
         # This prevents rows from being corrupted
-        return tsv_string
-    return tsv_string
+        return tsv_string + crc
+    return tsv_string + crc
+
+
+def verify_tsv(tsv_path):
+    """Scan *tsv_path* once and check every record's CRC.
+
+    Returns (damaged, checked): *damaged* is a list of
+    (line_no, byte_offset, raw_line) for rows whose CRC does not match, plus
+    an unterminated last line with no CRC (a row torn by a killed run).
+    Complete rows without a CRC are legacy rows and are not reported.
+    *checked* counts rows with a valid CRC; 0 means a legacy file written
+    before checksums existed.
+    """
+    damaged = []
+    checked = 0
+    offset = 0
+    with open(tsv_path, "rb") as f:
+        for line_no, raw in enumerate(f, start=1):
+            start = offset
+            offset += len(raw)
+            line = raw.rstrip(b"\r\n")
+            if line_no == 1 or not line.strip():
+                continue  # header / blank line
+            match = _ROW_CRC_RE.match(line)
+            if match is None:
+                if not raw.endswith(b"\n"):
+                    damaged.append((line_no, start, raw))
+            elif zlib.crc32(match.group(1)) != int(match.group(2), 16):
+                damaged.append((line_no, start, raw))
+            else:
+                checked += 1
+    return damaged, checked
+
+
+def _salvage_row(raw):
+    """Recover an intact record from the tail of a damaged line.
+
+    When a run is killed mid-write, the next append lands on the same line
+    as the torn row.  The appended record still carries its own CRC, so
+    find the suffix of the line that matches it."""
+    match = _ROW_CRC_RE.match(raw.rstrip(b"\r\n"))
+    if match is None:
+        return None
+    data = match.group(1)
+    expected = int(match.group(2), 16)
+    for start in range(1, len(data)):
+        candidate = data[start:]
+        if (candidate.count(b"\t") == len(FIELDNAMES) - 2
+                and zlib.crc32(candidate) == expected):
+            return raw[start:].rstrip(b"\r\n") + NEWLINE.encode()
+    return None
+
+
+def _load_backup_rows(backup_path):
+    """Return {name: row_dict} for every intact row of a backup TSV."""
+    rows = {}
+    if not backup_path or not os.path.isfile(backup_path):
+        return rows
+    with open(backup_path, "rb") as f:
+        f.readline()  # skip header
+        for raw in f:
+            line = raw.rstrip(b"\r\n")
+            match = _ROW_CRC_RE.match(line)
+            if match and zlib.crc32(match.group(1)) != int(match.group(2), 16):
+                continue
+            parts = [p.strip() for p in
+                     line.decode("utf-8", errors="replace").split("\t")]
+            if parts and parts[0] and parts[0] != "name":
+                rows[parts[0]] = dict(zip(FIELDNAMES[:-1], parts))
+    return rows
+
+
+def repair_tsv(tsv_path, damaged, backup_path=BACKUP_TSV_FILENAME):
+    """Rewrite only the *damaged* rows reported by verify_tsv().
+
+    Each damaged row is replaced by the same item (matched by name) from
+    *backup_path*, plus any intact record appended on the same line after
+    a torn write.  Rows with no good copy (e.g. edited by hand) are left in
+    place with a warning.  The original bytes of every replaced row are
+    appended to *tsv_path* + DAMAGED_ROWS_SUFFIX first, so nothing is lost.
+    Replacements of the same byte length are written in place; otherwise
+    the file is rewritten from the first such row onward, leaving every row
+    before it untouched.  Returns the number of rows restored.
+    """
+    backup_rows = None
+    fixes = []  # (offset, old_length, new_bytes)
+    replaced = []
+    restored = 0
+    for line_no, offset, raw in damaged:
+        salvaged = _salvage_row(raw)
+        if backup_rows is None:
+            backup_rows = _load_backup_rows(backup_path)
+        name = raw.split(b"\t", 1)[0].decode("utf-8", errors="replace").strip()
+        new = b""
+        if name in backup_rows:
+            new = (pad_row(backup_rows[name]) + NEWLINE).encode("utf-8")
+            restored += 1
+            print(f"   Line {line_no}: restored from backup")
+        if salvaged is not None:
+            new += salvaged
+            restored += 1
+            print(f"   Line {line_no}: kept intact record appended after it")
+        if new:
+            replaced.append(raw if raw.endswith(b"\n") else raw + b"\n")
+        else:
+            # Keep the row as is, but end it so the next append does not
+            # land on the same line.
+            new = raw if raw.endswith(b"\n") else raw + NEWLINE.encode()
+            print(f"   Line {line_no}: WARNING: no intact copy, left in place")
+        fixes.append((offset, len(raw), new))
+
+    if replaced:
+        with open(tsv_path + DAMAGED_ROWS_SUFFIX, "ab") as f:
+            f.writelines(replaced)
+        print(f"   Original damaged rows saved to {tsv_path + DAMAGED_ROWS_SUFFIX}")
+
+    with open(tsv_path, "r+b") as f:
+        tail_from = None
+        for n, (offset, old_length, new) in enumerate(fixes):
+            if len(new) != old_length:
+                tail_from = n
+                break
+            f.seek(offset)
+            f.write(new)
+        if tail_from is not None:
+            # Sizes differ — splice the remaining fixes into the tail of
+            # the file starting at the first row that changes length.
+            start = fixes[tail_from][0]
+            f.seek(start)
+            rest = f.read()
+            out = bytearray()
+            pos = start
+            for offset, old_length, new in fixes[tail_from:]:
+                out += rest[pos - start:offset - start]
+                out += new
+                pos = offset + old_length
+            out += rest[pos - start:]
+            f.seek(start)
+            f.write(out)
+            f.truncate()
+    return restored
 
 
 def process_tracker_items(driver, deal_list, tsv_output_path):
@@ -2233,15 +5229,20 @@ def process_tracker_items(driver, deal_list, tsv_output_path):
         url = "https://shenghuanjie.github.io/penny-tracker/"
         driver.get(url)
 
-        # 1. Wait for the table to load
+        # 1. Wait for the report to load its rows.  The table only renders
+        # the visible window, so read the row data (deals.json plus
+        # changes.json) from the page instead of scraping table cells.
         wait = WebDriverWait(driver, 10)
-        wait.until(EC.presence_of_element_located((By.TAG_NAME, "table")))
+        wait.until(lambda drv: drv.execute_script(
+            "return typeof reportRows === 'function'"
+            " && reportRows().length > 0;"))
+        column = {c: i for i, c in enumerate(DEALS_JSON_COLUMNS)}
 
         # Store the ID of the main window so we can return to it
         main_window_handle = driver.current_window_handle
 
-        # 2. Find all rows (skipping the first header row)
-        rows = driver.find_elements(By.XPATH, "//table//tr")[1:]
+        # 2. Fetch all rows
+        rows = driver.execute_script("return reportRows();")
 
         print(f"Found {len(rows)} items in the table.")
 
@@ -2250,22 +5251,9 @@ def process_tracker_items(driver, deal_list, tsv_output_path):
 
         for row in rows:
             try:
-                # Re-locate cells to avoid StaleElementReferenceException
-                cells = row.find_elements(By.TAG_NAME, "td")
-
-                if not cells:
-                    continue
-
-                # Column 1: Image, 2: Name, 3: Price, 4: Status, 5: Timestamp, 6: Link
-                # (Indices are 0-based: Name=1, Status=3, Link=4)
-                name_element = cells[1]
-                status_element = cells[3]
-                timestamp_element = cells[4]
-                link_container = cells[5]
-
-                item_name = name_element.text
-                status_text = status_element.text
-                update_timestamp = timestamp_element.text
+                item_name = row[column["name"]]
+                status_text = row[column["hd_status"]].upper()
+                update_timestamp = row[column["updated_at"]]
 
                 timestamp = datetime.datetime.fromtimestamp(time.time()).strftime(TIMESTAMP_FORMAT)
 
@@ -2307,13 +5295,7 @@ def process_tracker_items(driver, deal_list, tsv_output_path):
                 else:
                     f_out.seek(line_start_index)
 
-                # Extract the HD URL from the link element
-                try:
-                    link_element = link_container.find_element(By.XPATH, ".//a")
-                except Exception:
-                    link_element = link_container.find_element(By.TAG_NAME, "a")
-
-                hd_url = link_element.get_attribute("href")
+                hd_url = row[column["url"]]
                 print(f"   HD URL: {hd_url}")
 
                 # Open HD tab if it doesn't exist, otherwise reuse it
@@ -2877,7 +5859,8 @@ def collect_rebel_items(driver, deal_list, seen_ids, tsv_output_path,
 def check_hd_status_phase(driver, deal_list, tsv_output_path,
                           chrome_profile=None, profile_dir=None,
                           remote_debug=None, zip_code=DEFAULT_ZIP,
-                          hd_login=False, recheck=False, hours=8):
+                          hd_login=False, recheck=False, hours=8,
+                          on_batch=None):
     """Phase 2: Check HD status using random-sized batches (1-10 tabs).
 
     Work is spread uniformly over *hours* hours so traffic looks natural.
@@ -2886,7 +5869,8 @@ def check_hd_status_phase(driver, deal_list, tsv_output_path,
     Items updated within the last 24 hours are skipped.
 
     If *recheck* is True, items with 'blocked' or 'error' status are also
-    re-checked.
+    re-checked.  *on_batch(deal_list)*, if given, is called after each
+    batch is saved to the TSV.
     """
     # Find items that need HD checking
     now_ts = datetime.datetime.fromtimestamp(
@@ -2982,13 +5966,18 @@ def check_hd_status_phase(driver, deal_list, tsv_output_path,
 
     # Per-batch log file for debugging block patterns
     log_path = os.path.join(os.path.dirname(tsv_output_path) or ".",
-                            "phase2_log.tsv")
+                            PHASE2_LOG_FILENAME)
     with open(log_path, 'a', encoding='utf-8') as logf:
         logf.write(f"\n# Phase 2 started: "
                    f"{datetime.datetime.now().strftime(TIMESTAMP_FORMAT)} "
                    f"| {len(browser_queue)} items | {hours}h window\n")
         logf.write("timestamp\tbatch\tsize\titem\tstatus\tnav_source\turl\n")
 
+    # UPC -> Store SKU pairs read from product pages (scanner barcode path)
+    upc_path = os.path.join(os.path.dirname(tsv_output_path) or ".",
+                            UPC_MAP_FILENAME)
+    upc_map = _load_upc_map(os.path.dirname(tsv_output_path) or ".")
+
     def _log_item(batch_n, size, name, status, url):
         ts = datetime.datetime.now().strftime(TIMESTAMP_FORMAT)
         try:
@@ -3089,6 +6078,11 @@ def check_hd_status_phase(driver, deal_list, tsv_output_path,
                     if page_sku:
                         deal_list[idx]['sku'] = page_sku
                         print(f"   Store SKU: {page_sku}")
+                        page_upc = extract_upc_from_hd_page(driver)
+                        if page_upc and upc_map.get(page_upc) != page_sku:
+                            upc_map[page_upc] = page_sku
+                            record_upc_sku(upc_path, page_upc, page_sku, "hd")
+                            print(f"   UPC: {page_upc}")
                     # Read the department (breadcrumb) for grouping/sorting.
                     page_dept = extract_department_from_hd_page(driver)
                     if page_dept:
@@ -3127,6 +6121,8 @@ def check_hd_status_phase(driver, deal_list, tsv_output_path,
 
         # ── Save TSV after each batch ──────────────────────────────
         _save_tsv()
+        if on_batch:
+            on_batch(deal_list)
 
         # ── Track consecutive blocks (only BLOCKED status, not transient errors) ──
         if batch_blocked > 0 and batch_blocked >= batch_checked:
@@ -3210,6 +6206,45 @@ def check_hd_status_phase(driver, deal_list, tsv_output_path,
     print(f"Detailed log: {log_path}")
 
 
+def _parse_size_budgets(specs):
+    """Turn --size-budget PATTERN=KB *specs* into the budgets dict for
+    generate_html_report: command-line patterns first (first match wins),
+    then REPORT_SIZE_BUDGETS_KB.  Raises ValueError on a malformed spec."""
+    size_budgets = {}
+    for spec in specs:
+        pattern, sep, kb = spec.rpartition("=")
+        try:
+            if not sep or not pattern:
+                raise ValueError
+            size_budgets[pattern] = float(kb)
+        except ValueError:
+            raise ValueError(f"--size-budget expects PATTERN=KB, got {spec!r}") from None
+    for pattern, kb in REPORT_SIZE_BUDGETS_KB.items():
+        size_budgets.setdefault(pattern, kb)
+    return size_budgets
+
+
+def _git_publish(output_dir, message, paths=("-A",)):
+    """git add *paths*, commit with *message* and push from *output_dir*.
+    Returns False (after printing why) if any step fails; publishing is
+    best-effort and never stops a run."""
+    try:
+        subprocess.run(["git", "add", *paths], cwd=output_dir, check=True)
+        subprocess.run(["git", "commit", "-m", message],
+                       cwd=output_dir, check=True)
+        subprocess.run(
+            ["git", "push"], cwd=output_dir,
+            env={**os.environ,
+                 "GIT_SSH_COMMAND":
+                     "ssh -i ~/.ssh/id_rsa_public_github"
+                     " -o IdentitiesOnly=yes"},
+            check=True)
+        return True
+    except subprocess.CalledProcessError as e:
+        print(f"Git push failed (non-fatal): {e}")
+        return False
+
+
 def main():
     parser = argparse.ArgumentParser(description="RebelSavings Scraper & Reporter")
     parser.add_argument("-n", "--max-items", type=int, default=None,
@@ -3251,8 +6286,21 @@ def main():
                              "hours (default: 8). Work is distributed "
                              "uniformly with random jitter.")
 
+    parser.add_argument("--size-budget", action="append", default=[],
+                        metavar="PATTERN=KB",
+                        help="Max gzip size in KB for report artifacts matching "
+                             "PATTERN (e.g. 'index.html=80', '*.json=2048'). "
+                             "Repeatable; overrides the defaults "
+                             f"{REPORT_SIZE_BUDGETS_KB}. The run exits with "
+                             "status 1 if the final report is over budget.")
+
     args = parser.parse_args()
 
+    try:
+        size_budgets = _parse_size_budgets(args.size_budget)
+    except ValueError as e:
+        parser.error(str(e))
+
     # Handle opt-out flag
     if args.no_chrome_profile:
         args.chrome_profile = None
@@ -3298,6 +6346,15 @@ def main():
 
     # --- LOAD EXISTING DATA ---
     if os.path.isfile(args.from_tsv):
+        # Locate rows torn by a killed run via their CRCs and rewrite only
+        # those, instead of rebuilding the whole file on every start.
+        damaged, checked = verify_tsv(args.from_tsv)
+        if damaged:
+            print(f"Found {len(damaged)} damaged row(s) in {args.from_tsv}. "
+                  f"Repairing...")
+            restored = repair_tsv(args.from_tsv, damaged,
+                                  backup_path=backuptsv_output_path)
+            print(f"TSV repaired: {restored}/{len(damaged)} rows restored.")
         print(f"Reading data from {args.from_tsv}...")
         skipped = 0
         try:
@@ -3333,13 +6390,13 @@ def main():
         print(f"Loaded {len(deal_list)} items from TSV."
               f"{f' (skipped {skipped} bad rows)' if skipped else ''}")
 
-        # Rewrite TSV to fix any previously truncated rows
-        if deal_list:
+        # Legacy file without row CRCs — rewrite it once to add them
+        if deal_list and not checked:
             with open(args.from_tsv, "w", encoding="utf-8") as f_out:
                 print(pad_row(FIELDNAMES), file=f_out)
                 for deal in deal_list:
                     print(pad_row(deal), file=f_out)
-            print(f"TSV repaired: {len(deal_list)} rows written.")
+            print(f"TSV upgraded: {len(deal_list)} rows written with CRCs.")
 
     # --- CLEANING OLD DATA ---
     if args.mode in [RunningMode.CLEAN] and deal_list:
@@ -3425,23 +6482,11 @@ def main():
 
                 # Git push after collection
                 print("\n=== Pushing collected data ===")
-                generate_html_report(deal_list, report_path)
-                try:
-                    subprocess.run(["git", "add", "-A"],
-                                   cwd=args.output_dir, check=True)
-                    subprocess.run(["git", "commit", "-m",
-                                    "update data (collection)"],
-                                   cwd=args.output_dir, check=True)
-                    subprocess.run(
-                        ["git", "push"], cwd=args.output_dir,
-                        env={**os.environ,
-                             "GIT_SSH_COMMAND":
-                                 "ssh -i ~/.ssh/id_rsa_public_github"
-                                 " -o IdentitiesOnly=yes"},
-                        check=True)
+                if generate_html_report(deal_list, report_path,
+                                        size_budgets=size_budgets):
+                    print("!!! Report over size budget — not pushed.")
+                elif _git_publish(args.output_dir, "update data (collection)"):
                     print("Collection data pushed.")
-                except subprocess.CalledProcessError as e:
-                    print(f"Git push failed (non-fatal): {e}")
             else:
                 print(f"\nSkipping Phase 1 (--phase {args.phase})")
 
@@ -3451,6 +6496,19 @@ def main():
                 print(f"PHASE 2: HD checks"
                       f"{' (re-checking blocked/error)' if args.recheck else ''}")
                 print(f"{'='*60}")
+                # Publish changes.json every CHANGES_PUSH_MINUTES so open
+                # report pages pick up results before the final push.
+                last_live_push = 0.0
+
+                def _publish_live_changes(deals):
+                    nonlocal last_live_push
+                    if time.time() - last_live_push < CHANGES_PUSH_MINUTES * 60:
+                        return
+                    last_live_push = time.time()
+                    if write_changes_feed(args.output_dir, deals):
+                        _git_publish(args.output_dir, "update data (live changes)",
+                                     paths=[CHANGES_FILENAME])
+
                 try:
                     check_hd_status_phase(hd_driver, deal_list, tsv_output_path,
                                           chrome_profile=args.chrome_profile,
@@ -3459,7 +6517,8 @@ def main():
                                           zip_code=args.zip,
                                           hd_login=False,
                                           recheck=args.recheck,
-                                          hours=args.hours)
+                                          hours=args.hours,
+                                          on_batch=_publish_live_changes)
                 except KeyboardInterrupt:
                     # User pressed Ctrl-C: stop checking but still publish
                     # whatever we have so far (report + commit + push below).
@@ -3480,28 +6539,17 @@ def main():
         # Git push after HD checks (or after phase 1 if phase 2 skipped)
         if run_phase2:
             print("\n=== Pushing HD check results ===")
-            generate_html_report(deal_list, report_path)
-            try:
-                subprocess.run(["git", "add", "-A"],
-                               cwd=args.output_dir, check=True)
-                subprocess.run(["git", "commit", "-m",
-                                "update data (HD checks)"],
-                               cwd=args.output_dir, check=True)
-                subprocess.run(
-                    ["git", "push"], cwd=args.output_dir,
-                    env={**os.environ,
-                         "GIT_SSH_COMMAND":
-                             "ssh -i ~/.ssh/id_rsa_public_github"
-                             " -o IdentitiesOnly=yes"},
-                    check=True)
+            if generate_html_report(deal_list, report_path,
+                                    size_budgets=size_budgets):
+                print("!!! Report over size budget — not pushed.")
+            elif _git_publish(args.output_dir, "update data (HD checks)"):
                 print("HD check data pushed.")
-            except subprocess.CalledProcessError as e:
-                print(f"Git push failed (non-fatal): {e}")
 
     # --- REPORT ONLY MODE ---
     elif args.mode == RunningMode.REPORT:
         print("Generating report from existing TSV...")
-        generate_html_report(deal_list, report_path)
+        generate_html_report(deal_list, report_path,
+                             size_budgets=size_budgets)
 
     elif args.mode == RunningMode.CHECK:
 
@@ -3540,8 +6588,12 @@ def main():
                 if not row_dict.get("updated_at"):
                     row_dict["updated_at"] = ""
                 deal_list.append(row_dict)
-    generate_html_report(deal_list, report_path)
+    over_budget = generate_html_report(deal_list, report_path,
+                                       size_budgets=size_budgets)
     print(f"Report written to {report_path} ({len(deal_list)} items)")
+    if over_budget:
+        print(f"!!! {len(over_budget)} report artifact(s) over size budget.")
+        sys.exit(1)
 
 
 if __name__ == "__main__":
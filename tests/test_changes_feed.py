@@ -0,0 +1,131 @@
+"""changes.json: every change since the base report, kept across reruns."""
+import json
+
+import pytest
+
+import rebelsavings
+from rebelsavings import (CHANGES_FILENAME, DEALS_JSON_COLUMNS, DEALS_JSON_FILENAME,
+                          HDStatus, PHASE2_LOG_FILENAME, _load_phase2_runs,
+                          generate_html_report, write_changes_feed)
+
+KEY = DEALS_JSON_COLUMNS.index("key")
+STATUS = DEALS_JSON_COLUMNS.index("hd_status")
+
+
+def deal(i, status="unchecked", department="Tools"):
+    return {"name": f"Item {i}", "price": "$1.00", "url": f"https://example.com/p/{i}",
+            "image": "", "original_timestamp": "2026-01-01 00:00:00",
+            "hd_status": status, "updated_at": f"2026-01-02 00:00:{i % 60:02d}",
+            "sku": str(1000 + i), "department": department}
+
+
+@pytest.fixture
+def report(tmp_path):
+    rebelsavings._row_cache = None
+    deals = [deal(i, department=("Tools", "Bath")[i % 2]) for i in range(40)]
+    generate_html_report(deals, str(tmp_path / "index.html"), thumbnails=False)
+    return tmp_path, deals
+
+
+def feed(path):
+    return json.loads((path / CHANGES_FILENAME).read_text())
+
+
+def test_rerun_without_changes_keeps_feed_and_deals_json(report):
+    path, deals = report
+    before = (path / CHANGES_FILENAME).read_bytes(), (path / DEALS_JSON_FILENAME).read_bytes()
+    generate_html_report(deals, str(path / "index.html"), thumbnails=False)
+    assert ((path / CHANGES_FILENAME).read_bytes(),
+            (path / DEALS_JSON_FILENAME).read_bytes()) == before
+    assert feed(path)["rows"] == [] and feed(path)["dropped"] == []
+
+
+def test_phase2_change_survives_the_next_report(report):
+    path, deals = report
+    base = feed(path)
+    deals[3] = dict(deals[3], hd_status=HDStatus.PENNY_NEW)
+    assert write_changes_feed(str(path), deals)
+    assert not write_changes_feed(str(path), deals)
+    live = feed(path)
+    assert live["base"] == base["base"] and live["version"] == base["version"] + 1
+    [(version, row, anchors)] = live["rows"]
+    assert row[STATUS] == HDStatus.PENNY_NEW and version == live["version"]
+    assert set(anchors) == {"", "bath", rebelsavings.PENNY_PAGE_SLUG}
+    assert live["dropped"] == [row[KEY]]
+
+    # The next report keeps the base and the row's version: pages that
+    # already applied it don't see it as new again.
+    deals_json = (path / DEALS_JSON_FILENAME).read_bytes()
+    generate_html_report(deals, str(path / "index.html"), thumbnails=False)
+    assert (path / DEALS_JSON_FILENAME).read_bytes() == deals_json
+    assert feed(path)["rows"] == live["rows"]
+    assert feed(path)["version"] == live["version"]
+
+
+def test_reverted_row_leaves_the_feed(report):
+    path, deals = report
+    changed = deals[:3] + [dict(deals[3], hd_status=HDStatus.PENNY_NEW)] + deals[4:]
+    assert write_changes_feed(str(path), changed)
+    version = feed(path)["version"]
+    assert write_changes_feed(str(path), deals)
+    assert feed(path)["rows"] == [] and feed(path)["dropped"] == []
+    assert feed(path)["version"] == version + 1
+
+
+def test_added_and_removed_rows(report):
+    path, deals = report
+    removed = json.loads((path / DEALS_JSON_FILENAME).read_text())["rows"]
+    removed_key = next(r[KEY] for r in removed if r[1] == "Item 5")
+    new = deals[:5] + deals[6:] + [deal(99, department="Garden")]
+    assert write_changes_feed(str(path), new)
+    live = feed(path)
+    assert live["dropped"] == [removed_key]
+    [(_, row, anchors)] = live["rows"]
+    # Garden has no dept/ page in the base, so the row is only on the index.
+    assert row[1] == "Item 99" and list(anchors) == [""]
+
+    # A full report is needed for the new department's page.
+    generate_html_report(new, str(path / "index.html"), thumbnails=False)
+    assert feed(path)["base"] != live["base"]
+    assert feed(path)["rows"] == [] and (path / "dept" / "garden.json").exists()
+
+
+def test_many_changes_start_a_new_base(report):
+    path, deals = report
+    base = feed(path)["base"]
+    changed = [dict(d, hd_status=HDStatus.CLEARANCE) for d in deals[:10]] + deals[10:]
+    generate_html_report(changed, str(path / "index.html"), thumbnails=False)
+    assert feed(path)["base"] != base
+    assert feed(path)["rows"] == [] and feed(path)["dropped"] == []
+    assert feed(path)["version"] > 1
+
+
+def log_lines(*items):
+    return "".join("\t".join(fields) + "\n" for fields in items)
+
+
+def test_phase2_runs_are_parsed_incrementally(tmp_path):
+    header = ["timestamp", "batch", "size", "item", "status", "nav_source", "url"]
+    log = tmp_path / PHASE2_LOG_FILENAME
+    log.write_text(
+        "\n# Phase 2 started: 2026-01-01 10:00:00 | 3 items | 8h window\n"
+        + log_lines(header,
+                    ["2026-01-01 10:01:00", "1", "2", "A", HDStatus.PENNY, "u/a"],
+                    ["2026-01-01 10:02:00", "1", "2", "B", HDStatus.BLOCKED, "u/b"])
+        + "2026-01-01 10:03:00\t2\t1\tC\tpen")   # still being written
+    runs, first_penny = _load_phase2_runs(str(tmp_path))
+    assert runs == [["2026-01-01 10:00:00", 3, 2, 1]]
+    assert first_penny == {"u/a": "2026-01-01 10:01:00"}
+
+    with open(log, "a") as f:
+        f.write("ny\tu/c\n"
+                "\n# Phase 2 started: 2026-01-02 10:00:00 | 1 items | 8h window\n"
+                + log_lines(header,
+                            ["2026-01-02 10:01:00", "1", "1", "A", HDStatus.PENNY, "u/a"]))
+    runs, first_penny = _load_phase2_runs(str(tmp_path))
+    assert runs == [["2026-01-01 10:00:00", 3, 3, 1], ["2026-01-02 10:00:00", 1, 1, 0]]
+    assert first_penny == {"u/a": "2026-01-01 10:01:00", "u/c": "2026-01-01 10:03:00"}
+
+    # A rewritten (shorter) log is parsed from the start.
+    log.write_text(log_lines(header))
+    assert _load_phase2_runs(str(tmp_path)) == ([], {})
@@ -0,0 +1,29 @@
+"""Department shard names are unique and never move to another department."""
+from rebelsavings import PENNY_PAGE_SLUG, _department_slugs
+
+
+def test_colliding_names_get_distinct_slugs():
+    slugs = _department_slugs({"Bath-Kitchen", "Bath & Kitchen", "Index",
+                               "Penny Statuses", "", "Tools"})
+    assert len(set(slugs.values())) == len(slugs)
+    assert "index" not in slugs.values()
+    assert PENNY_PAGE_SLUG not in slugs.values()
+    assert slugs["Tools"] == "tools"
+    assert slugs[""] == "other"
+
+
+def test_new_colliding_name_does_not_take_an_existing_url():
+    first = _department_slugs({"Bath-Kitchen", "Tools"})
+    assert first["Bath-Kitchen"] == "bath-kitchen"
+
+    # "Bath & Kitchen" sorts first, but the URL already belongs to Bath-Kitchen.
+    second = _department_slugs({"Bath & Kitchen", "Bath-Kitchen", "Tools"}, first)
+    assert second["Bath-Kitchen"] == "bath-kitchen"
+    assert second["Bath & Kitchen"] == "bath-kitchen-2"
+
+
+def test_departments_that_disappear_keep_their_slug():
+    first = _department_slugs({"Bath-Kitchen"})
+    second = _department_slugs({"Bath & Kitchen"}, first)
+    assert second["Bath & Kitchen"] == "bath-kitchen-2"
+    assert _department_slugs({"Bath-Kitchen"}, second)["Bath-Kitchen"] == "bath-kitchen"
@@ -0,0 +1,109 @@
+"""deals.json's search and filter indexes, and the row cache behind them."""
+import base64
+import json
+import random
+
+import pytest
+
+import rebelsavings
+from rebelsavings import (REPORT_CACHE_DIR, REPORT_STATUS_PRIORITY, ROW_CACHE_FILENAME,
+                          _filter_index_json, _search_index_json, generate_html_report)
+
+
+def postings(index):
+    """{token: [row ids]} from _search_index_json's delta-encoded lists."""
+    decoded = {}
+    for token, deltas in zip(index["tokens"], index["postings"]):
+        ids, row_id = [], 0
+        for delta in deltas:
+            row_id += delta
+            ids.append(row_id)
+        decoded[token] = ids
+    return decoded
+
+
+def rows_with_bit(packed):
+    bits = base64.b64decode(packed)
+    return [i for i in range(len(bits) * 8) if bits[i >> 3] >> (i & 7) & 1]
+
+
+def test_search_index_matches_brute_force():
+    rng = random.Random(27)
+    words = ["drill", "dr", "drywall", "10", "100", "a", "zz"]
+    token_lists = [sorted(set(rng.sample(words, rng.randint(0, 4)))) for _ in range(300)]
+    index = json.loads(_search_index_json(token_lists))
+    assert index["tokens"] == sorted(index["tokens"])
+    assert postings(index) == {
+        token: [i for i, tokens in enumerate(token_lists) if token in tokens]
+        for token in set(words) if any(token in tokens for tokens in token_lists)}
+
+
+def test_search_index_of_no_rows():
+    assert json.loads(_search_index_json([])) == {"tokens": [], "postings": []}
+
+
+@pytest.mark.parametrize("n", [0, 1, 31, 32, 33, 100])
+def test_filter_bits_match_rows(n):
+    rng = random.Random(n)
+    facet_lists = [(rng.choice(["penny", "not_penny", "mystery"]),
+                    rng.choice(["Tools", "bath", "", "Zoo"])) for _ in range(n)]
+    index = json.loads(_filter_index_json(facet_lists))
+    for column, facet in enumerate(("status", "department")):
+        for value, (count, packed) in index[facet].items():
+            expected = [i for i, values in enumerate(facet_lists) if values[column] == value]
+            assert count == len(expected)
+            assert rows_with_bit(packed) == expected
+            assert len(base64.b64decode(packed)) == (n + 31) // 32 * 4
+
+
+def test_filter_chips_are_in_report_order():
+    facet_lists = [("mystery", ""), ("not_penny", "Zoo"), ("penny", "bath"),
+                   ("blocked", "Tools")]
+    index = json.loads(_filter_index_json(facet_lists))
+    assert list(index["status"]) == sorted(
+        ["mystery", "not_penny", "penny", "blocked"],
+        key=lambda s: REPORT_STATUS_PRIORITY.get(s, len(REPORT_STATUS_PRIORITY)))
+    assert list(index["department"]) == ["bath", "Tools", "Zoo", ""]
+
+
+def deal(i, status="unchecked"):
+    return {"name": f"Item {i}", "price": "$1.00", "url": f"https://example.com/p/{i}",
+            "image": "", "original_timestamp": "2026-01-01 00:00:00",
+            "hd_status": status, "updated_at": "", "sku": str(1000 + i),
+            "department": "Tools"}
+
+
+def rendered(capsys):
+    line = next(line for line in capsys.readouterr().out.splitlines()
+                if line.startswith("Rows:") and "rendered" in line)
+    return int(line.split(", ")[1].split()[0])
+
+
+def test_row_cache_renders_only_changed_rows(tmp_path, capsys):
+    out = str(tmp_path / "index.html")
+    deals = [deal(i) for i in range(5)]
+    rebelsavings._row_cache = None
+    generate_html_report(deals, out, thumbnails=False)
+    assert rendered(capsys) == 5
+
+    # The next run reads the cache from disk; only the edited row is new,
+    # and the old version of it leaves the cache.
+    rebelsavings._row_cache = None
+    deals[2] = deal(2, status="penny")
+    generate_html_report(deals, out, thumbnails=False)
+    assert rendered(capsys) == 1
+    cache = json.loads((tmp_path / REPORT_CACHE_DIR / ROW_CACHE_FILENAME).read_text())
+    assert len(cache["rows"]) == 5
+
+
+def test_row_cache_is_dropped_when_its_version_changes(tmp_path, capsys, monkeypatch):
+    out = str(tmp_path / "index.html")
+    deals = [deal(i) for i in range(5)]
+    rebelsavings._row_cache = None
+    generate_html_report(deals, out, thumbnails=False)
+    capsys.readouterr()
+
+    monkeypatch.setattr(rebelsavings, "ROW_CACHE_VERSION", rebelsavings.ROW_CACHE_VERSION + 1)
+    rebelsavings._row_cache = None
+    generate_html_report(deals, out, thumbnails=False)
+    assert rendered(capsys) == 5
@@ -0,0 +1,62 @@
+"""The report's default order must match the original multi-pass sort."""
+import random
+from itertools import groupby
+
+from rebelsavings import REPORT_STATUS_PRIORITY, _report_sort_key, _sort_by_report_key
+
+STATUSES = list(REPORT_STATUS_PRIORITY) + ["", "mystery"]
+DEPARTMENTS = ["Bath", "bath", "Tools", "Electrical", "", "Zoo"]
+MALFORMED = ["n/a", "2026-13-45 99:99:99", "2026-3-5 1:02:03", "yesterday",
+             "2026-03-05", "  2026-03-05 10:00:00", "0000", "Z"]
+
+
+def baseline_order(deals):
+    """The sort generate_html_report used before _report_sort_key."""
+    def priority(d):
+        return REPORT_STATUS_PRIORITY.get(d.get('hd_status', '') or 'unchecked', 99)
+
+    final_order = []
+    for _, group in groupby(sorted(deals, key=priority), key=priority):
+        group_list = list(group)
+        group_list.sort(key=lambda d: ((d.get('department', '') or '') == '',
+                                       (d.get('department', '') or '').lower()))
+        for _dept, dept_group in groupby(
+                group_list, key=lambda d: (d.get('department', '') or '').lower()):
+            dg = list(dept_group)
+            dg.sort(key=lambda d: d.get('updated_at', '') or '', reverse=True)
+            final_order.extend(dg)
+    return final_order
+
+
+def random_deals(rng, n):
+    deals = []
+    for i in range(n):
+        roll = rng.random()
+        if roll < 0.15:
+            updated = ""
+        elif roll < 0.35:
+            updated = rng.choice(MALFORMED)
+        else:
+            # few distinct values so ties are common
+            updated = f"2026-0{rng.randint(1, 3)}-1{rng.randint(0, 2)} 0{rng.randint(0, 2)}:00:00"
+        deals.append({"name": f"item {i}", "hd_status": rng.choice(STATUSES),
+                      "department": rng.choice(DEPARTMENTS), "updated_at": updated})
+    return deals
+
+
+def test_matches_baseline_on_mixed_timestamps():
+    rng = random.Random(28)
+    for _ in range(500):
+        deals = random_deals(rng, rng.randint(0, 60))
+        ordered = list(deals)
+        _sort_by_report_key(ordered, _report_sort_key)
+        assert [d["name"] for d in ordered] == [d["name"] for d in baseline_order(deals)]
+
+
+def test_missing_fields_sort_like_baseline():
+    deals = [{"name": "a"}, {"name": "b", "updated_at": "2026-01-01 00:00:00"},
+             {"name": "c", "hd_status": "penny", "updated_at": "bad"},
+             {"name": "d", "hd_status": "penny", "updated_at": "2026-01-02 00:00:00"}]
+    ordered = list(deals)
+    _sort_by_report_key(ordered, _report_sort_key)
+    assert [d["name"] for d in ordered] == [d["name"] for d in baseline_order(deals)]
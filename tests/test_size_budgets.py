@@ -0,0 +1,41 @@
+"""--size-budget parsing and which budget each report artifact falls under."""
+import fnmatch
+
+import pytest
+
+from rebelsavings import REPORT_SIZE_BUDGETS_KB, _parse_size_budgets
+
+
+def budget_for(budgets, rel_path):
+    return next((kb for pattern, kb in budgets.items()
+                 if fnmatch.fnmatch(rel_path, pattern)), None)
+
+
+def test_command_line_patterns_come_first():
+    budgets = _parse_size_budgets(["index.html=80", "*.json=2048.5"])
+    assert list(budgets)[:2] == ["index.html", "*.json"]
+    assert budgets["*.json"] == 2048.5
+    assert budget_for(budgets, "deals.json") == 2048.5
+    assert budget_for(budgets, "index.html") == 80
+
+
+def test_defaults_fill_in_the_rest():
+    assert _parse_size_budgets([]) == REPORT_SIZE_BUDGETS_KB
+    budgets = _parse_size_budgets(["a=1=2"])  # pattern may contain '='
+    assert budgets["a=1"] == 2
+
+
+@pytest.mark.parametrize("spec", ["80", "=80", "index.html=", "index.html=big"])
+def test_malformed_specs_are_rejected(spec):
+    with pytest.raises(ValueError, match="PATTERN=KB"):
+        _parse_size_budgets([spec])
+
+
+def test_deals_json_is_budgeted_for_large_trackers():
+    # ~72 bytes gzip per row; 20k rows must not fail the build.
+    assert budget_for(REPORT_SIZE_BUDGETS_KB, "deals.json") * 1024 > 20000 * 72 * 4
+    assert budget_for(REPORT_SIZE_BUDGETS_KB, "dept/tools.json") == \
+        budget_for(REPORT_SIZE_BUDGETS_KB, "deals.json")
+    assert budget_for(REPORT_SIZE_BUDGETS_KB, "skus/12.0123abcd.json") == 1024
+    assert budget_for(REPORT_SIZE_BUDGETS_KB, "penny.html") < \
+        budget_for(REPORT_SIZE_BUDGETS_KB, "index.html")
@@ -0,0 +1,87 @@
+"""Edit distance and the BK-tree behind the scanner's "Did you mean" list."""
+import json
+import random
+
+from rebelsavings import (REPORT_CACHE_DIR, SKU_TREE_CACHE_FILENAME, _bk_insert,
+                          _edit_distance, _sku_bk_tree)
+
+
+def levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1,
+                               previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def bk_search(tree, code, max_distance):
+    """Codes within *max_distance* of *code*, the way scanner.js walks the tree."""
+    found, stack = [], [tree]
+    while stack:
+        node = stack.pop()
+        d = _edit_distance(code, node[0])
+        if d <= max_distance:
+            found.append(node[0])
+        for k in range(1, len(node), 2):
+            if d - max_distance <= node[k] <= d + max_distance:
+                stack.append(node[k + 1])
+    return sorted(found)
+
+
+def codes_in(tree):
+    codes, stack = [], [tree]
+    while stack:
+        node = stack.pop()
+        codes.append(node[0])
+        stack.extend(node[2::2])
+    return sorted(codes)
+
+
+def random_code(rng, n=None):
+    return "".join(rng.choice("0123456789") for _ in range(n or rng.randint(0, 12)))
+
+
+def test_edit_distance_matches_dynamic_programming():
+    rng = random.Random(27)
+    for _ in range(2000):
+        a, b = random_code(rng), random_code(rng)
+        assert _edit_distance(a, b) == levenshtein(a, b)
+    long_a, long_b = random_code(rng, 80), random_code(rng, 70)
+    assert _edit_distance(long_a, long_b) == levenshtein(long_a, long_b)
+    assert _edit_distance("", "123") == _edit_distance("123", "") == 3
+
+
+def test_bk_tree_finds_every_code_in_range():
+    rng = random.Random(1)
+    codes = {random_code(rng, 6) for _ in range(400)}
+    tree = None
+    for code in codes:
+        if tree is None:
+            tree = [code]
+        else:
+            _bk_insert(tree, code)
+    _bk_insert(tree, next(iter(codes)))   # duplicates are ignored
+    assert codes_in(tree) == sorted(codes)
+    for _ in range(50):
+        query = random_code(rng, 6)
+        for max_distance in (1, 2):
+            assert bk_search(tree, query, max_distance) == sorted(
+                c for c in codes if levenshtein(query, c) <= max_distance)
+
+
+def test_sku_tree_cache_adds_new_codes_and_rebuilds_on_removal(tmp_path):
+    first = _sku_bk_tree(str(tmp_path), ["1001", "1002", "2002"])
+    assert codes_in(first) == ["1001", "1002", "2002"]
+
+    grown = _sku_bk_tree(str(tmp_path), ["1001", "1002", "2002", "3003"])
+    assert codes_in(grown) == ["1001", "1002", "2002", "3003"]
+    # Existing codes keep their place; the new one is only inserted.
+    assert grown[0] == first[0]
+
+    shrunk = _sku_bk_tree(str(tmp_path), ["1002", "3003"])
+    assert codes_in(shrunk) == ["1002", "3003"]
+    cached = json.loads((tmp_path / REPORT_CACHE_DIR / SKU_TREE_CACHE_FILENAME).read_text())
+    assert cached["codes"] == ["1002", "3003"]
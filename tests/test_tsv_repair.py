@@ -0,0 +1,89 @@
+"""verify_tsv() finds damaged rows; repair_tsv() fixes them without losing any."""
+from rebelsavings import (DAMAGED_ROWS_SUFFIX, FIELDNAMES, NEWLINE, pad_row,
+                          repair_tsv, verify_tsv)
+
+
+def deal(name, status="unchecked"):
+    return {"name": name, "price": "$0.01", "url": f"https://example.com/{name}",
+            "image": "", "original_timestamp": "2026-01-01 00:00:00",
+            "hd_status": status, "updated_at": "", "sku": "1001", "department": "Tools"}
+
+
+def write_tsv(path, lines):
+    path.write_bytes("".join(lines).encode("utf-8"))
+
+
+def row(d):
+    return pad_row(d) + NEWLINE
+
+
+def header():
+    return pad_row(FIELDNAMES) + NEWLINE
+
+
+def names(path):
+    return [line.split("\t", 1)[0] for line in path.read_text().splitlines()[1:]]
+
+
+def test_torn_append_keeps_the_record_written_after_it(tmp_path):
+    tsv = tmp_path / "report.tsv"
+    torn = row(deal("a"))[:300]  # run killed mid-write, no newline
+    write_tsv(tsv, [header(), row(deal("x")), torn + row(deal("b")), row(deal("c"))])
+
+    damaged, checked = verify_tsv(tsv)
+    assert [line_no for line_no, _, _ in damaged] == [3]
+    assert checked == 2
+
+    assert repair_tsv(str(tsv), damaged, backup_path=str(tmp_path / "none.tsv")) == 1
+    assert names(tsv) == ["x", "b", "c"]
+    assert verify_tsv(tsv) == ([], 3)
+    assert (tmp_path / ("report.tsv" + DAMAGED_ROWS_SUFFIX)).read_text() == torn + row(deal("b"))
+
+
+def test_mismatch_with_backup_copy_is_restored(tmp_path):
+    tsv = tmp_path / "report.tsv"
+    backup = tmp_path / "backup.tsv"
+    good = row(deal("a", "penny"))
+    bad = good.replace("penny", "pXnny", 1)
+    write_tsv(tsv, [header(), row(deal("x")), bad, row(deal("c"))])
+    write_tsv(backup, [header(), good])
+
+    damaged, _ = verify_tsv(tsv)
+    assert len(damaged) == 1
+    assert repair_tsv(str(tsv), damaged, backup_path=str(backup)) == 1
+    assert tsv.read_text() == header() + row(deal("x")) + good + row(deal("c"))
+    assert (tmp_path / ("report.tsv" + DAMAGED_ROWS_SUFFIX)).read_text() == bad
+
+
+def test_mismatch_without_copy_is_left_in_place(tmp_path):
+    tsv = tmp_path / "report.tsv"
+    edited = row(deal("a")).replace("unchecked", "penny_new", 1)  # hand edit
+    before = header() + row(deal("x")) + edited + row(deal("c"))
+    write_tsv(tsv, [before])
+
+    damaged, _ = verify_tsv(tsv)
+    assert len(damaged) == 1
+    assert repair_tsv(str(tsv), damaged, backup_path=str(tmp_path / "none.tsv")) == 0
+    assert tsv.read_text() == before
+    assert not (tmp_path / ("report.tsv" + DAMAGED_ROWS_SUFFIX)).exists()
+
+
+def test_unterminated_last_row_is_ended_not_dropped(tmp_path):
+    tsv = tmp_path / "report.tsv"
+    torn = row(deal("a"))[:300]
+    write_tsv(tsv, [header(), row(deal("x")), torn])
+
+    damaged, _ = verify_tsv(tsv)
+    assert repair_tsv(str(tsv), damaged, backup_path=str(tmp_path / "none.tsv")) == 0
+    assert tsv.read_text() == header() + row(deal("x")) + torn + NEWLINE
+
+
+def test_legacy_rows_without_crcs_are_not_damaged(tmp_path):
+    tsv = tmp_path / "report.tsv"
+    legacy = "\t".join(deal("a").values()) + "\t" + " " * 40 + NEWLINE
+    write_tsv(tsv, [header(), legacy, legacy.replace("a", "b", 1)])
+    assert verify_tsv(tsv) == ([], 0)
+
+    # A file upgraded part-way keeps its untagged rows too.
+    write_tsv(tsv, [header(), legacy, row(deal("c"))])
+    assert verify_tsv(tsv) == ([], 1)
@@ -0,0 +1,37 @@
+"""UPC normalization and the UPC -> SKU map the scanner's barcode path uses."""
+import pytest
+
+from rebelsavings import UPC_MAP_FILENAME, _load_upc_map, normalize_upc, record_upc_sku
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("036000291452", "036000291452"),
+    ("0036000291452", "036000291452"),      # EAN-13 with a leading 0
+    ("0 36000 29145 2", "036000291452"),
+    ("036000291453", None),                 # bad check digit
+    ("1036000291452", None),                # EAN-13 outside UPC-A
+    ("03600029145", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_upc(code, expected):
+    assert normalize_upc(code) == expected
+
+
+def test_hd_pairs_win_over_fb_posts(tmp_path):
+    path = str(tmp_path / UPC_MAP_FILENAME)
+    record_upc_sku(path, "036000291452", "1001", "hd")
+    record_upc_sku(path, "036000291453", "1002", "hd")   # not a valid UPC
+    record_upc_sku(path, "0036000291452", "1003", "hd")  # same UPC, later line wins
+    assert open(path).readline() == "upc\tsku\tsource\tupdated_at\n"
+
+    fb_deals = [{"skus": "2001", "upcs": "036000291452"},
+                {"skus": "2002", "upcs": "012345678905"},
+                {"skus": "2003, 2004", "upcs": "042100005264"},   # two SKUs: ambiguous
+                {"skus": "2005", "upcs": "042100005264, 012345678905"}]
+    assert _load_upc_map(str(tmp_path), fb_deals) == {
+        "036000291452": "1003", "012345678905": "2002"}
+
+
+def test_no_map_file(tmp_path):
+    assert _load_upc_map(str(tmp_path)) == {}
@@ -1,3 +1,11 @@
+set -e
+# Stops here (nothing is published) if the report fails or is over budget.
 python rebelsavings.py -m report
-git commit -am "update data"
+# Report files with content-hashed names are new on each change; stage them
+# (and the deletions of the old ones), plus every .gz/.br sibling, before
+# committing.
+for p in index.html* fb_deals.html* assets dept skus upcs thumbs sw.js* deals.json* penny.html* changes.json report_manifest.json; do
+    if [ -e "$p" ]; then git add -A "$p"; fi
+done
+git commit -am "update data" || echo "Nothing new to commit."
 GIT_SSH_COMMAND='ssh -i ~/.ssh/id_rsa_public_github -o IdentitiesOnly=yes' git push